@@ -4,6 +4,7 @@ import argparse
 
 from src.v2x_sim.simulation import Simulation
 from src.v2x_sim.models.vehicle import Vehicle
+from src.v2x_sim.demand import Ids, poisson_arrivals
 
 
 def build_scenario(
@@ -52,6 +53,43 @@ def build_scenario(
         vid += 1
 
 
+def build_demand(
+    sim: Simulation,
+    duration: float,
+    rate_ew: float = 0.2,
+    rate_ns: float = 0.2,
+    ew_start_s: float = -220.0,
+    ns_start_s: float = -200.0,
+    v_ew: float = 12.0,
+    v_ns: float = 11.0,
+    v_jitter: float = 2.0,
+    min_headway: float = 2.0,
+    seed: int = 42,
+):
+    # Poisson arrivals (veh/s) per approach, each from its own seeded stream.
+    # Vehicles are generated lazily as they become due.
+    ids = Ids(1)
+    sim.add_demand(poisson_arrivals("EW", rate_ew, duration, seed=seed, ids=ids, s0=ew_start_s, v0=v_ew,
+                                   v_jitter=v_jitter, min_headway=min_headway))
+    sim.add_demand(poisson_arrivals("NS", rate_ns, duration, seed=seed, ids=ids, s0=ns_start_s, v0=v_ns,
+                                   v_jitter=v_jitter, min_headway=min_headway))
+
+
+def run_checkpointed(sim: Simulation, duration: float, path: str, every: float, fast_forward: bool = False):
+    # Run until sim.t reaches duration, saving a snapshot every `every` s and at the end
+    from src.v2x_sim import snapshot
+
+    remaining = int(duration / sim.dt) - round(sim.t / sim.dt)
+    chunk = max(1, int(every / sim.dt)) if every > 0 else max(1, remaining)
+    while remaining > 0:
+        n = min(chunk, remaining)
+        sim.run_steps(n, fast_forward=fast_forward)
+        remaining -= n
+        if path:
+            snapshot.save(sim, path)
+    return sim.metrics
+
+
 def main():
     parser = argparse.ArgumentParser(description="Run V2X simulation scenario")
     parser.add_argument("--duration", type=float, default=60.0, help="Simulation duration (s)")
@@ -67,35 +105,158 @@ def main():
     parser.add_argument("--max-green", type=float, default=25.0, help="Signal max green (s)")
     parser.add_argument("--yellow", type=float, default=3.0, help="Signal yellow (s)")
     parser.add_argument("--all-red", type=float, default=1.0, help="Signal all-red (s)")
+    parser.add_argument("--arrivals", choices=("platoon", "poisson"), default="platoon", help="Demand model")
+    parser.add_argument("--rate-ew", type=float, default=0.2, help="Poisson arrival rate EW (veh/s)")
+    parser.add_argument("--rate-ns", type=float, default=0.2, help="Poisson arrival rate NS (veh/s)")
+    parser.add_argument("--engine", choices=("object", "vectorized"), default="object", help="Simulation engine")
+    parser.add_argument("--check-engine", action="store_true", help="Run both engines and compare metrics")
+    parser.add_argument("--fast-forward", action="store_true", help="Skip quiet stretches (object engine)")
+    parser.add_argument("--checkpoint", type=str, default="", help="Snapshot file written during and at the end of the run")
+    parser.add_argument("--checkpoint-every", type=float, default=300.0, help="Simulated seconds between checkpoints")
+    parser.add_argument("--resume", type=str, default="", help="Continue from a snapshot until --duration is reached")
+    parser.add_argument("--profile", action="store_true", help="Print per-phase step timings (object engine)")
+    parser.add_argument("--profile-trace", type=str, default="", help="Also write a Chrome trace JSON of every step")
+    parser.add_argument("--kpi", type=str, default="",
+                        help="Write travel-time/stop-delay percentiles, queues and per-interval stats to this JSON file")
+    parser.add_argument("--kpi-interval", type=float, default=60.0, help="KPI interval length (s)")
+    parser.add_argument("--messages", action="store_true", help="Controllers act on simulated V2X messages (object engine)")
+    parser.add_argument("--msg-rate", type=float, default=10.0, help="BSM/SPaT broadcast rate (Hz)")
+    parser.add_argument("--msg-latency", type=float, default=0.1, help="Message latency (s)")
+    parser.add_argument("--msg-loss", type=float, default=0.0, help="Per-receiver message loss probability")
+    parser.add_argument("--signal-control", choices=("adaptive", "predictive"), default="adaptive",
+                        help="Signal controller: reactive rule or look-ahead rollouts (object engine)")
+    parser.add_argument("--mpc-horizon", type=float, default=20.0, help="Predictive control look-ahead (s)")
+    parser.add_argument("--swept", action="store_true",
+                        help="Check collisions and near-misses over whole ticks, for coarse --dt (object engine)")
+    parser.add_argument("--lod", action="store_true",
+                        help="Step far, free-flowing vehicles and the signal at coarse rates (object engine)")
+    parser.add_argument("--lod-every", type=int, default=10, help="Ticks per coarse vehicle update")
+    parser.add_argument("--signal-every", type=int, default=5, help="Ticks per signal decision with --lod")
+    parser.add_argument("--check-lod", action="store_true",
+                        help="Run at full rate and with --lod, and report the differences")
 
     args = parser.parse_args()
+    if args.engine == "vectorized" and (args.checkpoint or args.resume):
+        parser.error("--checkpoint and --resume need the object engine (snapshots hold a Simulation)")
+    if args.engine == "vectorized" and args.kpi:
+        parser.error("--kpi needs the object engine")
+
+    signal_params = {
+        "min_green": args.min_green,
+        "max_green": args.max_green,
+        "yellow": args.yellow,
+        "all_red": args.all_red,
+    }
+
+    def setup(sim):
+        if args.arrivals == "poisson":
+            build_demand(
+                sim,
+                args.duration,
+                rate_ew=args.rate_ew,
+                rate_ns=args.rate_ns,
+                v_ew=args.v_ew,
+                v_ns=args.v_ns,
+                seed=args.seed,
+            )
+            return
+        build_scenario(
+            sim,
+            ew_count=args.ew_count,
+            ns_count=args.ns_count,
+            spawn_gap_ew=args.spawn_gap_ew,
+            spawn_gap_ns=args.spawn_gap_ns,
+            v_ew=args.v_ew,
+            v_ns=args.v_ns,
+            seed=args.seed,
+        )
+
+    if args.check_engine:
+        from src.v2x_sim.vectorized import compare_engines
+
+        diffs = compare_engines(setup, args.duration, dt=args.dt, signal_params=signal_params)
+        for name, (ref, vec) in diffs.items():
+            print(f"MISMATCH {name}: object={ref} vectorized={vec}")
+        print("Engines agree within tolerance" if not diffs else "Engines disagree")
+        return
+
+    if args.check_lod:
+        from src.v2x_sim.lod import compare_lod
+
+        report = compare_lod(setup, args.duration, dt=args.dt, signal_params=signal_params,
+                             every=args.lod_every, signal_every=args.signal_every)
+        for name, (full, lod) in report["metrics"].items():
+            print(f"{name}: full={full:.6g} lod={lod:.6g}")
+        err = report["exit_time_error"]
+        print(f"Exit time error (s): max {err['max']:.2f} | p95 {err['p95']:.2f} | mean {err['mean']:.2f} "
+              f"over {err['compared']} vehicles, {err['unmatched']} exited in one run only")
+        print(f"Vehicle updates saved: {report['updates_saved']:.1%} | speedup {report['speedup']:.2f}x")
+        return
+
+    if args.engine == "vectorized":
+        from src.v2x_sim.vectorized import VectorizedSimulation
+
+        sim = VectorizedSimulation(dt=args.dt, signal_params=signal_params)
+    elif args.resume:
+        from src.v2x_sim import snapshot
+
+        sim = snapshot.load(args.resume)
+    else:
+        sim = Simulation(dt=args.dt, signal_params=signal_params, swept=args.swept)
+    if not args.resume:
+        setup(sim)
+    if args.engine == "object" and (args.profile or args.profile_trace):
+        from src.v2x_sim.profiling import Profiler
 
-    sim = Simulation(
-        dt=args.dt,
-        signal_params={
-            "min_green": args.min_green,
-            "max_green": args.max_green,
-            "yellow": args.yellow,
-            "all_red": args.all_red,
-        },
-    )
-    build_scenario(
-        sim,
-        ew_count=args.ew_count,
-        ns_count=args.ns_count,
-        spawn_gap_ew=args.spawn_gap_ew,
-        spawn_gap_ns=args.spawn_gap_ns,
-        v_ew=args.v_ew,
-        v_ns=args.v_ns,
-        seed=args.seed,
-    )
-
-    metrics = sim.run(args.duration)
+        sim.profiler = Profiler(trace=bool(args.profile_trace))
+    if args.engine == "object" and args.kpi and getattr(sim, "kpi", None) is None:
+        from src.v2x_sim.kpi import TrafficKPIs
+
+        sim.kpi = TrafficKPIs(interval=args.kpi_interval, keep=max(1, int(args.duration / args.kpi_interval) + 1))
+    if args.engine == "object" and args.messages and not args.resume:
+        from src.v2x_sim.comm import MessageBus
+
+        sim.comm = MessageBus(rate=args.msg_rate, latency=args.msg_latency, loss=args.msg_loss,
+                              spat_rate=args.msg_rate, seed=args.seed)
+    if args.engine == "object" and args.signal_control == "predictive" and not args.resume:
+        from src.v2x_sim.controllers.signal_mpc import PredictiveSignal
+
+        sim.signal = PredictiveSignal.from_signal(sim.signal, road=sim.road, horizon=args.mpc_horizon)
+
+    if args.engine == "object" and args.lod and not args.resume:
+        from src.v2x_sim.lod import LevelOfDetail
+
+        sim.lod = LevelOfDetail(every=args.lod_every, signal_every=args.signal_every)
+
+    fast_forward = args.fast_forward and args.engine == "object"
+    if args.engine == "object" and (args.checkpoint or args.resume):
+        metrics = run_checkpointed(sim, args.duration, args.checkpoint, args.checkpoint_every, fast_forward)
+    elif fast_forward:
+        metrics = sim.run(args.duration, fast_forward=True)
+    else:
+        metrics = sim.run(args.duration)
 
     print("--- Simulation Complete ---")
     print(f"Time: {sim.t:.1f}s | Vehicles exited: {metrics.total_vehicles_exited}")
     print(f"Collisions: {metrics.collisions} | Near-misses: {metrics.near_misses}")
     print(f"Total delay (veh*m/s*s): {metrics.total_delay:.2f}")
+    if getattr(sim, "kpi", None) is not None:
+        tt = sim.kpi.travel_time.summary()
+        print(f"Travel time p50/p95/p99 (s): {tt['p50']:.1f} / {tt['p95']:.1f} / {tt['p99']:.1f}")
+    if args.kpi and getattr(sim, "kpi", None) is not None:
+        # KPIs restored from a snapshot are only written out when asked for again
+        import json
+
+        with open(args.kpi, "w", encoding="utf-8") as f:
+            json.dump({"summary": sim.kpi.summary(), "intervals": sim.kpi.interval_rows()}, f, indent=2)
+        print(f"KPIs written to: {args.kpi}")
+    if getattr(sim, "comm", None) is not None:
+        print(f"Messages sent: {sim.comm.sent} | delivered: {sim.comm.delivered} | lost: {sim.comm.lost}")
+    if getattr(sim, "profiler", None) is not None:
+        print(sim.profiler.format_table())
+        if args.profile_trace:
+            sim.profiler.write_trace(args.profile_trace)
+            print(f"Trace written to: {args.profile_trace}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,291 @@
+from __future__ import annotations
+import sys
+import json
+import time
+import random
+import platform
+import argparse
+import subprocess
+import multiprocessing as mp
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+# Ensure project root on path
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from src.v2x_sim.simulation import Simulation
+from src.v2x_sim.models.vehicle import Vehicle
+from main import build_scenario, build_demand
+
+
+SIZES = (10, 100, 1_000, 10_000, 100_000)
+QUICK_SIZES = (10, 100, 1_000)
+DTS = (0.05, 0.1, 0.2)
+DEMAND_RATES = (0.05, 0.2, 0.5)  # veh/s per approach
+# Gated metrics: name -> +1 if higher is worse, -1 if lower is worse
+GATED = {"p50_us": +1, "throughput": -1, "peak_rss_mb": +1}
+
+
+def populate(sim, n: int, seed: int = 42) -> None:
+    """n vehicles spread over both lanes and directions, about 8 m apart.
+
+    The road is lengthened with n so density stays realistic, and every
+    vehicle is scheduled at t=0 (steady-state population, no spawn churn).
+    """
+    rng = random.Random(seed)
+    per_approach = max(1, n // 4)
+    sim.road.exit_distance = max(250.0, per_approach * 8.0 / 2.0 + 10.0)
+    span = sim.road.exit_distance - 5.0
+    approaches = [("EW", +1), ("EW", -1), ("NS", +1), ("NS", -1)]
+    for i in range(n):
+        lane, direction = approaches[i % 4]
+        k = i // 4
+        s = -direction * (span - k * (2.0 * span / per_approach))
+        sim.schedule_vehicle(0.0, Vehicle(id=i + 1, lane=lane, direction=direction, s=s, v=rng.uniform(8.0, 14.0)))
+
+
+def _ticks_for(n: int, budget: int = 200_000, lo: int = 5, hi: int = 300) -> int:
+    # Aim for a fixed number of vehicle-steps per case
+    return max(lo, min(hi, budget // max(1, n)))
+
+
+def _timed(fn, repeats: int) -> List[float]:
+    samples = []
+    clock = time.perf_counter
+    for _ in range(repeats):
+        t0 = clock()
+        fn()
+        samples.append(clock() - t0)
+    return samples
+
+
+def _new_sim(engine: str, dt: float):
+    if engine == "vectorized":
+        from src.v2x_sim.vectorized import VectorizedSimulation
+
+        return VectorizedSimulation(dt=dt)
+    return Simulation(dt=dt)
+
+
+def bench_step(n: int, dt: float = 0.1, engine: str = "object") -> Tuple[List[float], int]:
+    sim = _new_sim(engine, dt)
+    populate(sim, n)
+    sim.step()  # spawn everything
+    return _timed(sim.step, _ticks_for(n)), n
+
+
+def bench_query(kind: str, n: int) -> Tuple[List[float], int]:
+    sim = Simulation()
+    populate(sim, n)
+    sim.step()
+    road, vehicles = sim.road, sim.vehicles
+    probes = vehicles[:: max(1, len(vehicles) // 50)]
+    if kind == "lead_scan":
+        fn = lambda: [road.get_lead_vehicle(vehicles, v) for v in probes]
+    elif kind == "lead_indexed":
+        fn = lambda: [road.get_indexed_lead(v) for v in probes]
+    elif kind == "approaching":
+        fn = lambda: road.get_approaching_by_lane(vehicles, radius=120.0)
+    elif kind == "signal_update":
+        approaching = road.get_approaching_by_lane(vehicles, radius=120.0)
+        fn = lambda: sim.signal.update(sim.dt, approaching)
+    else:
+        raise ValueError(kind)
+    per_call = len(probes) if kind.startswith("lead") else 1
+    repeats = _ticks_for(n * per_call, budget=2_000_000, lo=5, hi=500)
+    return [s / per_call for s in _timed(fn, repeats)], n
+
+
+def bench_run(setup: str, level: float, duration: float, dt: float = 0.1) -> Tuple[List[float], int]:
+    sim = Simulation(dt=dt)
+    if setup == "demand":
+        build_demand(sim, duration, rate_ew=level, rate_ns=level, seed=42)
+    else:
+        build_scenario(sim, ew_count=int(level), ns_count=int(level))
+    vehicle_steps = 0
+
+    def tick():
+        nonlocal vehicle_steps
+        vehicle_steps += len(sim.vehicles)
+        sim.step()
+
+    # The whole run; per-tick samples give the latency distribution
+    samples = _timed(tick, int(duration / dt))
+    return samples, vehicle_steps / max(1, len(samples))
+
+
+def cases(quick: bool = False, engines=("object", "vectorized")) -> List[dict]:
+    sizes = QUICK_SIZES if quick else SIZES
+    out = []
+    for engine in engines:
+        for n in sizes:
+            out.append({"name": f"step/{engine}/n={n}", "kind": "step", "n": n, "engine": engine})
+    for dt in DTS:
+        out.append({"name": f"step/object/n=1000/dt={dt}", "kind": "step", "n": 1000, "dt": dt})
+    for kind in ("lead_scan", "lead_indexed", "approaching", "signal_update"):
+        for n in sizes:
+            if kind == "lead_scan" and n > 10_000:
+                continue  # O(n) per call; 100k probes would dominate the suite
+            out.append({"name": f"{kind}/n={n}", "kind": kind, "n": n})
+    duration = 60.0 if quick else 300.0
+    for rate in DEMAND_RATES:
+        out.append({"name": f"run/demand={rate}", "kind": "run", "setup": "demand", "level": rate, "duration": duration})
+    out.append({"name": "run/scenario=default", "kind": "run", "setup": "scenario", "level": 6, "duration": 60.0})
+    return out
+
+
+def _peak_rss_mb() -> Optional[float]:
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024.0 * 1024.0) if sys.platform == "darwin" else peak / 1024.0
+
+
+def _percentile(sorted_samples: List[float], q: float) -> float:
+    i = min(len(sorted_samples) - 1, max(0, int(round(q * (len(sorted_samples) - 1)))))
+    return sorted_samples[i]
+
+
+def run_case(case: dict) -> dict:
+    kind = case["kind"]
+    if kind == "step":
+        samples, per_sample = bench_step(case["n"], case.get("dt", 0.1), case.get("engine", "object"))
+        unit = "vehicle-steps/s"
+    elif kind == "run":
+        samples, per_sample = bench_run(case["setup"], case["level"], case["duration"])
+        unit = "vehicle-steps/s"
+    else:
+        samples, per_sample = bench_query(kind, case["n"])
+        unit = "calls/s"
+        per_sample = 1
+    ordered = sorted(samples)
+    mean = sum(samples) / len(samples)
+    return {
+        **case,
+        "samples": len(samples),
+        "mean_us": mean * 1e6,
+        "p50_us": _percentile(ordered, 0.50) * 1e6,
+        "p90_us": _percentile(ordered, 0.90) * 1e6,
+        "p99_us": _percentile(ordered, 0.99) * 1e6,
+        "throughput": per_sample / mean if mean > 0 else 0.0,
+        "unit": unit,
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+
+
+def run_suite(selected: List[dict], isolate: bool = True, progress: bool = True) -> dict:
+    """Run cases (each in a fresh process when isolate, so peak RSS is per case)."""
+    results = {}
+    pool = mp.get_context().Pool(1, maxtasksperchild=1) if isolate else None
+    try:
+        for case in selected:
+            t0 = time.time()
+            res = pool.apply(run_case, (case,)) if pool is not None else run_case(case)
+            results[case["name"]] = res
+            if progress:
+                print(f"{case['name']:<34} p50={res['p50_us']:>12.1f}us  {res['throughput']:>14.0f} {res['unit']}"
+                      f"  ({time.time() - t0:.1f}s)", file=sys.stderr)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    return {"meta": _meta(), "cases": results}
+
+
+def _meta() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                                text=True, timeout=10).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        commit = ""
+    return {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+    }
+
+
+def compare(baseline: dict, current: dict, threshold: float = 0.15, rss_threshold: float = 0.25):
+    """Rows of (case, metric, base, current, change) and the list of regressions.
+
+    A change counts as a regression when the metric moves in its bad
+    direction by more than the threshold (relative). Cases missing from
+    either side are reported but not gated.
+    """
+    rows, regressions = [], []
+    base_cases, cur_cases = baseline["cases"], current["cases"]
+    for name in list(base_cases) + [n for n in cur_cases if n not in base_cases]:
+        b, c = base_cases.get(name), cur_cases.get(name)
+        if b is None or c is None:
+            rows.append((name, "-", None, None, "only in " + ("current" if b is None else "baseline")))
+            continue
+        for metric, worse in GATED.items():
+            bv, cv = b.get(metric), c.get(metric)
+            if not bv or cv is None:
+                continue
+            change = (cv - bv) / bv
+            limit = rss_threshold if metric == "peak_rss_mb" else threshold
+            rows.append((name, metric, bv, cv, change))
+            if worse * change > limit:
+                regressions.append((name, metric, bv, cv, change))
+    return rows, regressions
+
+
+def _print_rows(rows) -> None:
+    for name, metric, bv, cv, change in rows:
+        if bv is None:
+            print(f"{name:<34} {change}")
+        else:
+            print(f"{name:<34} {metric:<12} {bv:>14.2f} -> {cv:>14.2f}  {change * 100:+7.1f}%")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scaling benchmarks with baseline comparison")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_run = sub.add_parser("run", help="Run the suite and write a results JSON")
+    p_run.add_argument("--quick", action="store_true", help="Sizes up to 1k and short runs")
+    p_run.add_argument("--filter", type=str, default="", help="Only cases whose name contains this text")
+    p_run.add_argument("--engines", type=str, default="object,vectorized")
+    p_run.add_argument("--no-isolate", action="store_true", help="Run all cases in this process")
+    p_run.add_argument("--out", type=str, default="", help="Results file (default artifacts/benchmarks/<time>.json)")
+
+    p_cmp = sub.add_parser("compare", help="Compare results to a baseline; exit 1 on regression")
+    p_cmp.add_argument("baseline")
+    p_cmp.add_argument("current")
+    p_cmp.add_argument("--threshold", type=float, default=0.15, help="Allowed relative slowdown")
+    p_cmp.add_argument("--rss-threshold", type=float, default=0.25, help="Allowed relative peak RSS growth")
+
+    args = parser.parse_args()
+
+    if args.command == "run":
+        engines = [e for e in args.engines.split(",") if e]
+        if "vectorized" in engines:
+            try:
+                import numpy  # noqa: F401
+            except ImportError:
+                print("NumPy not installed: skipping vectorized cases", file=sys.stderr)
+                engines.remove("vectorized")
+        selected = [c for c in cases(args.quick, engines) if args.filter in c["name"]]
+        result = run_suite(selected, isolate=not args.no_isolate)
+        out = Path(args.out) if args.out else ROOT / "artifacts" / "benchmarks" / (time.strftime("%Y%m%d_%H%M%S") + ".json")
+        out.parent.mkdir(parents=True, exist_ok=True)
+        out.write_text(json.dumps(result, indent=2), encoding="utf-8")
+        print(f"{len(selected)} cases written to: {out}")
+    else:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        with open(args.current, encoding="utf-8") as f:
+            current = json.load(f)
+        rows, regressions = compare(baseline, current, args.threshold, args.rss_threshold)
+        _print_rows(rows)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond threshold:")
+            _print_rows(regressions)
+            sys.exit(1)
+        print("\nNo regressions beyond threshold")
@@ -0,0 +1,85 @@
+from __future__ import annotations
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+
+# Ensure project root on path
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from src.v2x_sim.calibration import BOUNDS, DEFAULTS, ScheduleRecorder, calibrate, load_counts
+from main import build_demand, build_scenario
+from scripts.optimize import SCENARIO_FIELDS, parse_range
+from scripts.sweep import derive_seed
+
+
+def schedule(scenario: dict, duration: float, seed: int) -> list:
+    # Arrivals of the scenario (main.py flags) for one demand seed, drained once
+    rec = ScheduleRecorder()
+    if scenario["arrivals"] == "poisson":
+        build_demand(rec, duration, rate_ew=scenario["rate_ew"], rate_ns=scenario["rate_ns"],
+                     v_ew=scenario["v_ew"], v_ns=scenario["v_ns"], seed=seed)
+    else:
+        build_scenario(rec, ew_count=int(scenario["ew_count"]), ns_count=int(scenario["ns_count"]),
+                       spawn_gap_ew=scenario["spawn_gap_ew"], spawn_gap_ns=scenario["spawn_gap_ns"],
+                       v_ew=scenario["v_ew"], v_ns=scenario["v_ns"], seed=seed)
+    return rec.arrivals
+
+
+def parse_fixed(text: str) -> dict:
+    out = {}
+    for item in filter(None, text.split(",")):
+        name, value = item.split("=")
+        out[name.strip()] = float(value)
+    return out
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fit vehicle and signal parameters to observed exit counts")
+    parser.add_argument("counts", type=str, help="CSV with t and cumulative vehicles_exited (vehicles_exited_over_time.csv)")
+    parser.add_argument("--interval", type=float, default=60.0, help="Count interval compared (s)")
+    for name, default in SCENARIO_FIELDS.items():
+        kwargs = {"choices": ("platoon", "poisson")} if name == "arrivals" else {"type": type(default)}
+        parser.add_argument("--" + name.replace("_", "-"), default=default, help=f"Scenario (default {default})", **kwargs)
+    parser.add_argument("--fit", type=str, default=",".join(BOUNDS), help="Parameters to fit")
+    parser.add_argument("--fix", type=str, default="", help="Fixed values, e.g. yellow=3,all_red=1")
+    for name, (lo, hi) in BOUNDS.items():
+        parser.add_argument("--" + name.replace("_", "-"), type=parse_range, default=(lo, hi),
+                            help=f"Search range lo:hi (default {lo:g}:{hi:g})")
+    parser.add_argument("--seeds", type=int, default=2, help="Demand seeds averaged per candidate")
+    parser.add_argument("--batch", type=int, default=32, help="Candidates per generation")
+    parser.add_argument("--generations", type=int, default=8)
+    parser.add_argument("--prune", type=float, default=2.0,
+                        help="Stop a candidate whose error so far exceeds this multiple of the best")
+    parser.add_argument("--check-every", type=float, default=600.0, help="Simulated seconds between early-stop checks")
+    parser.add_argument("--seed", type=int, default=42, help="Master seed for the search and demand seeds")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--out", type=str, default=str(ROOT / "artifacts" / "calibration.json"))
+
+    args = parser.parse_args()
+    observed = load_counts(Path(args.counts), args.interval)
+    duration = len(observed) * args.interval
+    scenario = {k: getattr(args, k) for k in SCENARIO_FIELDS}
+    n_seeds = args.seeds
+    if args.arrivals == "platoon" and n_seeds > 1:
+        print("Platoon arrivals do not depend on the seed: averaging over one seed", file=sys.stderr)
+        n_seeds = 1
+    seeds = [derive_seed(args.seed, f"calibrate:{i}") for i in range(n_seeds)]
+    t0 = time.time()
+    result = calibrate(
+        observed, [schedule(scenario, duration, s) for s in seeds], interval=args.interval, dt=scenario["dt"],
+        fit=[k for k in args.fit.split(",") if k], fixed=parse_fixed(args.fix),
+        bounds={k: getattr(args, k) for k in BOUNDS}, batch=args.batch, generations=args.generations,
+        prune=args.prune, check_every=args.check_every, seed=args.seed, workers=args.workers,
+    )
+    result.update({"scenario": scenario, "seeds": seeds, "elapsed_s": time.time() - t0})
+
+    out = Path(args.out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(result, indent=2), encoding="utf-8")
+    print(f"RMSE {result['error']:.2f} veh per {args.interval:g} s (default parameters {result['default_error']:.2f})")
+    for k, v in result["params"].items():
+        print(f"  {k:<10}{v:>8.3g}   default {DEFAULTS[k]:g}")
+    print(f"{result['evaluations']} candidates, {result['pruned']} stopped early, {result['elapsed_s']:.0f}s -> {out}")
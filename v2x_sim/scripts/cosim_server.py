@@ -0,0 +1,30 @@
+from __future__ import annotations
+import sys
+import asyncio
+import argparse
+from pathlib import Path
+
+# Ensure project root on path
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from src.v2x_sim.cosim import serve
+
+
+async def main(args) -> None:
+    server = await serve(args.host, args.port, args.unix)
+    where = args.unix or "%s:%d" % server.sockets[0].getsockname()[:2]
+    print(f"Co-simulation server listening on {where}", flush=True)
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve simulations to external controllers over a binary protocol")
+    parser.add_argument("--host", type=str, default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=7878)
+    parser.add_argument("--unix", type=str, default="", help="Listen on this Unix socket path instead of TCP")
+    try:
+        asyncio.run(main(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
@@ -12,7 +12,22 @@ ROOT = Path(__file__).resolve().parents[1]
 sys.path.insert(0, str(ROOT))
 
 from src.v2x_sim.simulation import Simulation
-from main import build_scenario
+from src.v2x_sim.telemetry import Recorder, MemorySink, CsvSink, NpySink, BinarySink
+from src.v2x_sim.tracks import TrackWriter
+from src.v2x_sim.profiling import Profiler
+from src.v2x_sim.store import ResultStore
+from main import build_demand, build_scenario
+
+
+def build(sim, duration: float, arrivals: str = "platoon", rate_ew: float = 0.2, rate_ns: float = 0.2,
+          seed: int = 42, **scenario) -> None:
+    # Seeded Poisson demand over `duration`, or the fixed platoons of build_scenario
+    # (which do not depend on the seed)
+    if arrivals == "poisson":
+        build_demand(sim, duration, rate_ew=rate_ew, rate_ns=rate_ns, v_ew=scenario["v_ew"],
+                     v_ns=scenario["v_ns"], seed=seed)
+    else:
+        build_scenario(sim, seed=seed, **scenario)
 
 
 def run_and_collect(
@@ -26,54 +41,133 @@ def run_and_collect(
     v_ns: float = 11.0,
     seed: int = 42,
     signal_params: dict | None = None,
+    arrivals: str = "platoon",
+    rate_ew: float = 0.2,
+    rate_ns: float = 0.2,
 ):
     sim = Simulation(dt=dt, signal_params=signal_params)
-    build_scenario(
-        sim,
-        ew_count=ew_count,
-        ns_count=ns_count,
-        spawn_gap_ew=spawn_gap_ew,
-        spawn_gap_ns=spawn_gap_ns,
-        v_ew=v_ew,
-        v_ns=v_ns,
-        seed=seed,
-    )
+    build(sim, duration, arrivals, rate_ew, rate_ns, seed, ew_count=ew_count, ns_count=ns_count,
+          spawn_gap_ew=spawn_gap_ew, spawn_gap_ns=spawn_gap_ns, v_ew=v_ew, v_ns=v_ns)
 
-    timeline = []
-    exited_over_time = []
-
-    steps = int(duration / dt)
-    for _ in range(steps):
-        sim.step()
-        # Record signal state and basic counts each tick
-        approaching = sim.road.get_approaching_by_lane(sim.vehicles, radius=120.0)
-        timeline.append({
-            "t": round(sim.t, 2),
-            "signal_state": sim.signal.state,
-            "EW_approaching": len(approaching.get("EW", [])),
-            "NS_approaching": len(approaching.get("NS", [])),
-        })
-        exited_over_time.append({
-            "t": round(sim.t, 2),
-            "vehicles_exited": sim.metrics.total_vehicles_exited,
-        })
+    sink = MemorySink()
+    sim.recorder = Recorder([sink])
+    sim.run(duration)
+    sim.recorder.close()
+    sim.recorder = None
+
+    # Record signal state and basic counts each tick
+    timeline = [
+        {k: row[k] for k in ("t", "signal_state", "EW_approaching", "NS_approaching")} for row in sink.rows
+    ]
+    exited_over_time = [{"t": row["t"], "vehicles_exited": row["vehicles_exited"]} for row in sink.rows]
 
     return sim, timeline, exited_over_time
 
 
-def write_artifacts(out_dir: Path, sim: Simulation, timeline, exited_over_time, config: dict):
+def run_ensemble_and_collect(
+    seeds,
+    duration: float = 60.0,
+    dt: float = 0.1,
+    ew_count: int = 6,
+    ns_count: int = 6,
+    spawn_gap_ew: float = 2.5,
+    spawn_gap_ns: float = 2.2,
+    v_ew: float = 12.0,
+    v_ns: float = 11.0,
+    signal_params=None,
+    arrivals: str = "platoon",
+    rate_ew: float = 0.2,
+    rate_ns: float = 0.2,
+):
+    """Batched equivalent of calling run_and_collect once per seed.
+
+    `signal_params` is one dict shared by all replicas or a list with one dict
+    per seed. Each replica draws its own Poisson demand from its seed with
+    arrivals="poisson"; platoon replicas only differ by their signal_params.
+    Returns (metrics_list, timelines) where timelines[k] is the
+    (timeline, exited_over_time) pair of replica k.
+    """
+    from src.v2x_sim.ensemble import EnsembleSimulation
+
+    seeds = list(seeds)
+    if arrivals != "poisson" and len(seeds) > 1 and not isinstance(signal_params, list):
+        raise ValueError("platoon arrivals do not depend on the seed; "
+                         "seed replicas need arrivals='poisson' (or one signal plan each)")
+    ens = EnsembleSimulation(len(seeds), dt=dt, signal_params=signal_params, record=True)
+    for k, seed in enumerate(seeds):
+        build(ens.replica(k), duration, arrivals, rate_ew, rate_ns, seed, ew_count=ew_count, ns_count=ns_count,
+              spawn_gap_ew=spawn_gap_ew, spawn_gap_ns=spawn_gap_ns, v_ew=v_ew, v_ns=v_ns)
+    metrics = ens.run(duration)
+    return metrics, ens.timelines()
+
+
+def write_ensemble_summary(out_dir: Path, seeds, metrics, config: dict):
     out_dir.mkdir(parents=True, exist_ok=True)
+    with (out_dir / "ensemble_metrics.csv").open("w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["seed", "collisions", "near_misses", "vehicles_exited", "total_delay"])
+        for seed, m in zip(seeds, metrics):
+            writer.writerow([seed, m.collisions, m.near_misses, m.total_vehicles_exited, m.total_delay])
+    with (out_dir / "config_used.json").open("w", encoding="utf-8") as f:
+        json.dump(config, f, indent=2)
 
-    # Metrics JSON
-    metrics_path = out_dir / "metrics.json"
-    with metrics_path.open("w", encoding="utf-8") as f:
-        json.dump({
-            "time": sim.t,
-            "collisions": sim.metrics.collisions,
-            "near_misses": sim.metrics.near_misses,
-            "vehicles_exited": sim.metrics.total_vehicles_exited,
-            "total_delay": sim.metrics.total_delay,
-        }, f, indent=2)
+
+def stream_sinks(out_dir: Path, fmt: str = "csv"):
+    """Sinks for the per-tick and trajectory channels of a streamed run."""
+    if fmt == "csv":
+        steps = [
+            CsvSink(out_dir / "signal_timeline.csv", ["t", "signal_state", "EW_approaching", "NS_approaching"]),
+            CsvSink(out_dir / "vehicles_exited_over_time.csv", ["t", "vehicles_exited"]),
+        ]
+        return steps, [CsvSink(out_dir / "trajectories.csv")]
+    if fmt == "npy":
+        return [NpySink(out_dir / "steps", "steps")], [NpySink(out_dir / "trajectories", "trajectories")]
+    return [BinarySink(out_dir / "steps.bin")], [BinarySink(out_dir / "trajectories.bin")]
+
+
+def run_and_stream(
+    out_dir: Path,
+    duration: float = 60.0,
+    dt: float = 0.1,
+    ew_count: int = 6,
+    ns_count: int = 6,
+    spawn_gap_ew: float = 2.5,
+    spawn_gap_ns: float = 2.2,
+    v_ew: float = 12.0,
+    v_ns: float = 11.0,
+    seed: int = 42,
+    signal_params: dict | None = None,
+    arrivals: str = "platoon",
+    rate_ew: float = 0.2,
+    rate_ns: float = 0.2,
+    fmt: str = "csv",
+    every: int = 1,
+    trajectories: bool = False,
+    profiler: Profiler | None = None,
+    sinks=None,
+    tracks: bool = False,
+):
+    """Like run_and_collect, but streams telemetry to out_dir in constant memory.
+
+    `sinks` = (step sinks, trajectory sinks) replaces the files in out_dir.
+    `tracks` also writes out_dir/tracks.trk (see src/v2x_sim/tracks.py).
+    """
+    sim = Simulation(dt=dt, signal_params=signal_params)
+    sim.profiler = profiler
+    build(sim, duration, arrivals, rate_ew, rate_ns, seed, ew_count=ew_count, ns_count=ns_count,
+          spawn_gap_ew=spawn_gap_ew, spawn_gap_ns=spawn_gap_ns, v_ew=v_ew, v_ns=v_ns)
+    steps, traj = sinks if sinks is not None else stream_sinks(out_dir, fmt)
+    writer = TrackWriter(out_dir / "tracks.trk", every=every) if tracks else None
+    with Recorder(steps, traj if trajectories else (), every=every, tracks=writer) as rec:
+        sim.recorder = rec
+        sim.run(duration)
+    sim.recorder = None
+    return sim
+
+
+def write_artifacts(out_dir: Path, sim: Simulation, timeline, exited_over_time, config: dict):
+    out_dir.mkdir(parents=True, exist_ok=True)
+    write_summary(out_dir, sim, config)
 
     # Signal timeline CSV
     timeline_path = out_dir / "signal_timeline.csv"
@@ -89,6 +183,21 @@ def write_artifacts(out_dir: Path, sim: Simulation, timeline, exited_over_time,
         writer.writeheader()
         writer.writerows(exited_over_time)
 
+
+def write_summary(out_dir: Path, sim: Simulation, config: dict):
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    # Metrics JSON
+    metrics_path = out_dir / "metrics.json"
+    with metrics_path.open("w", encoding="utf-8") as f:
+        json.dump({
+            "time": sim.t,
+            "collisions": sim.metrics.collisions,
+            "near_misses": sim.metrics.near_misses,
+            "vehicles_exited": sim.metrics.total_vehicles_exited,
+            "total_delay": sim.metrics.total_delay,
+        }, f, indent=2)
+
     # Basic run log
     log_path = out_dir / "run_log.txt"
     with log_path.open("w", encoding="utf-8") as f:
@@ -114,13 +223,33 @@ if __name__ == "__main__":
     parser.add_argument("--v-ew", type=float, default=12.0)
     parser.add_argument("--v-ns", type=float, default=11.0)
     parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--arrivals", choices=("platoon", "poisson"), default="platoon",
+                        help="Demand model; only poisson depends on --seed")
+    parser.add_argument("--rate-ew", type=float, default=0.2, help="Poisson arrivals (veh/s)")
+    parser.add_argument("--rate-ns", type=float, default=0.2, help="Poisson arrivals (veh/s)")
     parser.add_argument("--min-green", type=float, default=8.0)
     parser.add_argument("--max-green", type=float, default=25.0)
     parser.add_argument("--yellow", type=float, default=3.0)
     parser.add_argument("--all-red", type=float, default=1.0)
     parser.add_argument("--tag", type=str, default="", help="Optional tag to append to artifacts folder name")
+    parser.add_argument("--format", choices=("csv", "npy", "bin"), default="csv", help="Telemetry sink format")
+    parser.add_argument("--every", type=int, default=1, help="Record one tick in N")
+    parser.add_argument("--trajectories", action="store_true", help="Also record per-vehicle trajectories")
+    parser.add_argument("--tracks", action="store_true",
+                        help="Also write tracks.trk, memory-mappable trajectories for re-scoring")
+    parser.add_argument("--replicas", type=int, default=1,
+                        help="Run seeds seed..seed+N-1 as one batched ensemble (needs --arrivals poisson)")
+    parser.add_argument("--profile", action="store_true",
+                        help="Time the phases of each step; writes profile.csv and profile_trace.json")
+    parser.add_argument("--store", type=str, default="",
+                        help="Record into this results store (SQLite) instead of a new artifacts folder")
+    parser.add_argument("--force", action="store_true", help="With --store, rerun configs already stored")
 
     args = parser.parse_args()
+    if args.replicas > 1 and args.arrivals != "poisson":
+        parser.error("--replicas needs --arrivals poisson: platoon runs do not depend on the seed")
+    if args.store and (args.profile or args.tracks or args.format != "csv"):
+        parser.error("--profile, --tracks and --format write artifacts folders; they do not apply with --store")
 
     ts = time.strftime("%Y%m%d_%H%M%S")
     folder = ts + (f"_{args.tag}" if args.tag else "")
@@ -133,7 +262,101 @@ if __name__ == "__main__":
         "all_red": args.all_red,
     }
 
-    sim, timeline, exited = run_and_collect(
+    scenario = {
+        "duration": args.duration,
+        "dt": args.dt,
+        "ew_count": args.ew_count,
+        "ns_count": args.ns_count,
+        "spawn_gap_ew": args.spawn_gap_ew,
+        "spawn_gap_ns": args.spawn_gap_ns,
+        "v_ew": args.v_ew,
+        "v_ns": args.v_ns,
+        **signal_params,
+    }
+    # Demand fields only for Poisson runs, so platoon configs keep their store keys
+    demand = {"arrivals": args.arrivals, "rate_ew": args.rate_ew, "rate_ns": args.rate_ns} \
+        if args.arrivals == "poisson" else {}
+    scenario.update(demand)
+    store = ResultStore(Path(args.store)) if args.store else None
+
+    if args.replicas > 1:
+        seeds = list(range(args.seed, args.seed + args.replicas))
+        if store is not None and not args.force:
+            seeds = [s for s in seeds if store.find_run(dict(scenario, seed=s)) is None]
+            if not seeds:
+                print(f"All {args.replicas} replicas already in {args.store}")
+                sys.exit(0)
+        metrics, _ = run_ensemble_and_collect(
+            seeds,
+            duration=args.duration,
+            dt=args.dt,
+            ew_count=args.ew_count,
+            ns_count=args.ns_count,
+            spawn_gap_ew=args.spawn_gap_ew,
+            spawn_gap_ns=args.spawn_gap_ns,
+            v_ew=args.v_ew,
+            v_ns=args.v_ns,
+            signal_params=signal_params,
+            **demand,
+        )
+        cfg = {
+            "duration": args.duration,
+            "dt": args.dt,
+            "ew_count": args.ew_count,
+            "ns_count": args.ns_count,
+            "spawn_gap_ew": args.spawn_gap_ew,
+            "spawn_gap_ns": args.spawn_gap_ns,
+            "v_ew": args.v_ew,
+            "v_ns": args.v_ns,
+            **demand,
+            "seeds": seeds,
+            "signal": signal_params,
+        }
+        if store is not None:
+            for seed, m in zip(seeds, metrics):
+                store.add_run(dict(scenario, seed=seed), args.duration, m, tag=args.tag)
+            store.close()
+            print(f"Ensemble of {len(seeds)} replicas recorded in: {args.store}")
+            sys.exit(0)
+        write_ensemble_summary(artifacts_dir, seeds, metrics, cfg)
+        print(f"Ensemble of {len(seeds)} replicas written to: {artifacts_dir}")
+        sys.exit(0)
+
+    if store is not None:
+        # Recording options change what is stored; platoon runs do not depend on the seed
+        config = dict(scenario, every=args.every, trajectories=args.trajectories)
+        if args.arrivals == "poisson":
+            config["seed"] = args.seed
+        run_id = store.find_run(config)
+        if run_id is not None and not args.force:
+            print(f"Already in {args.store} as run {run_id} (use --force to rerun)")
+            sys.exit(0)
+        run_id = store.begin_run(config, tag=args.tag)
+        sinks = ([store.sink(run_id, "steps")], [store.sink(run_id, "trajectories")])
+        sim = run_and_stream(
+            artifacts_dir,
+            duration=args.duration,
+            dt=args.dt,
+            ew_count=args.ew_count,
+            ns_count=args.ns_count,
+            spawn_gap_ew=args.spawn_gap_ew,
+            spawn_gap_ns=args.spawn_gap_ns,
+            v_ew=args.v_ew,
+            v_ns=args.v_ns,
+            seed=args.seed,
+            signal_params=signal_params,
+            every=args.every,
+            trajectories=args.trajectories,
+            sinks=sinks,
+            **demand,
+        )
+        store.finish_run(run_id, sim.t, sim.metrics)
+        store.close()
+        print(f"Run {run_id} recorded in: {args.store}")
+        sys.exit(0)
+
+    sim = run_and_stream(
+        artifacts_dir,
         duration=args.duration,
         dt=args.dt,
         ew_count=args.ew_count,
@@ -144,6 +367,12 @@ if __name__ == "__main__":
         v_ns=args.v_ns,
         seed=args.seed,
         signal_params=signal_params,
+        fmt=args.format,
+        every=args.every,
+        trajectories=args.trajectories,
+        profiler=Profiler(trace=True) if args.profile else None,
+        tracks=args.tracks,
+        **demand,
     )
 
     cfg = {
@@ -155,8 +384,13 @@ if __name__ == "__main__":
         "spawn_gap_ns": args.spawn_gap_ns,
         "v_ew": args.v_ew,
         "v_ns": args.v_ns,
+        **demand,
         "seed": args.seed,
         "signal": signal_params,
     }
-    write_artifacts(artifacts_dir, sim, timeline, exited, cfg)
+    write_summary(artifacts_dir, sim, cfg)
+    if sim.profiler is not None:
+        sim.profiler.write_summary(artifacts_dir / "profile.csv")
+        sim.profiler.write_trace(artifacts_dir / "profile_trace.json", metadata=cfg)
+        print(sim.profiler.format_table())
     print(f"Artifacts written to: {artifacts_dir}")
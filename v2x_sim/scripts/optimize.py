@@ -0,0 +1,279 @@
+from __future__ import annotations
+import sys
+import json
+import math
+import time
+import random
+import hashlib
+import argparse
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+# Ensure project root on path
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from src.v2x_sim.simulation import Simulation
+from main import build_scenario, build_demand
+from scripts.sweep import FIELDS, SIGNAL_FIELDS, derive_seed
+
+
+# Scenario fields (main.py flags), with defaults
+SCENARIO_FIELDS = {
+    "arrivals": "poisson",
+    "rate_ew": 0.2,
+    "rate_ns": 0.2,
+    "ew_count": 6,
+    "ns_count": 6,
+    "spawn_gap_ew": 2.5,
+    "spawn_gap_ns": 2.2,
+    "v_ew": 12.0,
+    "v_ns": 11.0,
+    "dt": 0.1,
+}
+# Search space (s); yellow is kept at or above the common 3 s minimum
+BOUNDS = {
+    "min_green": (4.0, 20.0),
+    "max_green": (10.0, 60.0),
+    "yellow": (3.0, 5.0),
+    "all_red": (0.5, 3.0),
+}
+DEFAULT_PLAN = {k: FIELDS[k] for k in SIGNAL_FIELDS}
+CACHE_VERSION = 1  # bump when model changes invalidate cached evaluations
+METRICS = ("collisions", "near_misses", "vehicles_exited", "total_delay")
+
+
+def eval_key(scenario: dict, params: dict, seed: int, duration: float) -> str:
+    blob = json.dumps({"v": CACHE_VERSION, "scenario": scenario, "params": params, "seed": seed,
+                       "duration": duration}, sort_keys=True)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()[:20]
+
+
+def evaluate(task: dict) -> dict:
+    """One simulation run: scenario + signal params + seed for `duration` seconds."""
+    sc, duration = task["scenario"], task["duration"]
+    sim = Simulation(dt=sc["dt"], signal_params=task["params"])
+    if sc["arrivals"] == "poisson":
+        # Lazy streams: a shorter run sees a prefix of the longer run's arrivals
+        build_demand(sim, duration, rate_ew=sc["rate_ew"], rate_ns=sc["rate_ns"], v_ew=sc["v_ew"],
+                     v_ns=sc["v_ns"], seed=task["seed"])
+    else:
+        build_scenario(sim, ew_count=int(sc["ew_count"]), ns_count=int(sc["ns_count"]),
+                       spawn_gap_ew=sc["spawn_gap_ew"], spawn_gap_ns=sc["spawn_gap_ns"],
+                       v_ew=sc["v_ew"], v_ns=sc["v_ns"], seed=task["seed"])
+    m = sim.run(duration)
+    return {"key": task["key"], "collisions": m.collisions, "near_misses": m.near_misses,
+            "vehicles_exited": m.total_vehicles_exited, "total_delay": m.total_delay}
+
+
+class EvalCache:
+    """Evaluations by eval_key, persisted as JSON lines (appended as they finish)."""
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = Path(path) if path else None
+        self.results: Dict[str, dict] = {}
+        self.hits = 0
+        self.misses = 0
+        if self.path is not None and self.path.exists():
+            with self.path.open(encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        row = json.loads(line)
+                        self.results[row["key"]] = row
+
+    def get(self, key: str) -> Optional[dict]:
+        return self.results.get(key)
+
+    def put(self, rows: List[dict]) -> None:
+        for row in rows:
+            self.results[row["key"]] = row
+        if self.path is not None and rows:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with self.path.open("a", encoding="utf-8") as f:
+                for row in rows:
+                    f.write(json.dumps(row) + "\n")
+
+
+def sample_plans(n: int, bounds: Dict[str, Tuple[float, float]], seed: int, step: float = 0.5) -> List[dict]:
+    """n distinct signal plans on a `step` s grid, the default plan first."""
+    rng = random.Random(seed)
+    plans = [dict(DEFAULT_PLAN)]
+    seen = {tuple(sorted(DEFAULT_PLAN.items()))}
+    for _ in range(50 * n):
+        if len(plans) >= n:
+            break
+        plan = {k: round(rng.uniform(lo, hi) / step) * step for k, (lo, hi) in bounds.items()}
+        plan["max_green"] = max(plan["max_green"], plan["min_green"] + step)
+        key = tuple(sorted(plan.items()))
+        if key not in seen:
+            seen.add(key)
+            plans.append(plan)
+    return plans
+
+
+def _evaluate_all(tasks: List[dict], cache: EvalCache, pool) -> None:
+    todo = list({t["key"]: t for t in tasks if cache.get(t["key"]) is None}.values())
+    cache.hits += len(tasks) - len(todo)
+    cache.misses += len(todo)
+    run_map = pool.map if pool is not None else map
+    batch = []
+    for row in run_map(evaluate, todo):
+        batch.append(row)
+        if len(batch) >= 16:
+            cache.put(batch)
+            batch = []
+    cache.put(batch)
+
+
+def _mean(rows: List[dict]) -> dict:
+    return {m: sum(r[m] for r in rows) / len(rows) for m in METRICS}
+
+
+def successive_halving(
+    scenario: dict,
+    plans: List[dict],
+    duration: float,
+    seeds: List[int],
+    eta: int = 3,
+    min_duration: float = 60.0,
+    max_collisions: Optional[float] = None,
+    max_near_misses: Optional[float] = None,
+    cache: Optional[EvalCache] = None,
+    workers: int = 1,
+    progress: bool = True,
+) -> dict:
+    """Budgeted search over signal plans minimising mean total_delay.
+
+    Rung r evaluates the surviving plans for a fraction of `duration` on a
+    subset of `seeds` (common to all plans); the best 1/eta go on, until at
+    most eta plans are run for the full duration on every seed. A plan is
+    feasible when its mean collisions and near-misses stay within the limits
+    (per full-duration run, scaled to shorter rungs); without limits, within
+    those of the default plan on the same runs. Infeasible plans rank after
+    feasible ones. Evaluations are memoised in `cache`. Platoon arrivals do
+    not depend on the seed and take a single one.
+    """
+    if scenario["arrivals"] == "platoon" and len(seeds) > 1:
+        raise ValueError("platoon arrivals do not depend on the seed; several seeds need arrivals=poisson")
+    cache = cache if cache is not None else EvalCache()
+    sizes = [len(plans)]
+    while sizes[-1] > eta:
+        sizes.append(math.ceil(sizes[-1] / eta))
+    last = len(sizes) - 1
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    alive = list(range(len(plans)))
+    rungs = []
+    try:
+        for r, size in enumerate(sizes):
+            frac = float(eta) ** (r - last)
+            rung_duration = duration if r == last else min(duration, max(min_duration, duration * frac))
+            rung_seeds = seeds if r == last else seeds[:max(1, math.ceil(len(seeds) * frac))]
+            alive = alive[:size]
+
+            def task(plan: dict, seed: int) -> dict:
+                return {"key": eval_key(scenario, plan, seed, rung_duration), "scenario": scenario,
+                        "params": plan, "seed": seed, "duration": rung_duration}
+
+            baseline_tasks = [task(DEFAULT_PLAN, s) for s in rung_seeds]
+            tasks = {i: [task(plans[i], s) for s in rung_seeds] for i in alive}
+            _evaluate_all(baseline_tasks + [t for ts in tasks.values() for t in ts], cache, pool)
+
+            baseline = _mean([cache.get(t["key"]) for t in baseline_tasks])
+            scale = rung_duration / duration
+            limit_c = baseline["collisions"] if max_collisions is None else max_collisions * scale
+            limit_nm = baseline["near_misses"] if max_near_misses is None else max_near_misses * scale
+            scored = []
+            for i in alive:
+                mean = _mean([cache.get(t["key"]) for t in tasks[i]])
+                violation = (max(0.0, mean["collisions"] - limit_c) / max(1.0, limit_c)
+                             + max(0.0, mean["near_misses"] - limit_nm) / max(1.0, limit_nm))
+                scored.append((violation > 0.0, violation, mean["total_delay"], i, mean))
+            scored.sort(key=lambda x: x[:4])
+            alive = [x[3] for x in scored]
+            rungs.append({
+                "rung": r, "duration": rung_duration, "seeds": len(rung_seeds), "plans": len(scored),
+                "baseline": baseline,
+                "ranking": [{"plan": plans[i], "feasible": not infeasible, **mean}
+                            for infeasible, _, _, i, mean in scored],
+            })
+            if progress:
+                best = scored[0]
+                print(f"rung {r}: {len(scored)} plans x {len(rung_seeds)} seeds x {rung_duration:.0f}s  "
+                      f"best delay={best[2]:.1f} (default {baseline['total_delay']:.1f})  "
+                      f"cache hits={cache.hits} runs={cache.misses}", file=sys.stderr)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    final = rungs[-1]
+    feasible = [row for row in final["ranking"] if row["feasible"]]
+    return {
+        "best": (feasible or final["ranking"])[0],
+        "feasible": bool(feasible),
+        "baseline": final["baseline"],
+        "rungs": rungs,
+        "evaluations": {"runs": cache.misses, "cached": cache.hits},
+    }
+
+
+def parse_range(text: str) -> Tuple[float, float]:
+    lo, hi = (float(x) for x in text.split(":"))
+    return lo, hi
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tune signal timings by successive halving")
+    for name, default in SCENARIO_FIELDS.items():
+        kwargs = {"choices": ("platoon", "poisson")} if name == "arrivals" else {"type": type(default)}
+        parser.add_argument("--" + name.replace("_", "-"), default=default, help=f"Scenario (default {default})", **kwargs)
+    for name, (lo, hi) in BOUNDS.items():
+        parser.add_argument("--" + name.replace("_", "-"), type=parse_range, default=(lo, hi),
+                            help=f"Search range lo:hi in s (default {lo:g}:{hi:g})")
+    parser.add_argument("--duration", type=float, default=1800.0, help="Full evaluation length (s)")
+    parser.add_argument("--min-duration", type=float, default=120.0, help="Shortest rung length (s)")
+    parser.add_argument("--candidates", type=int, default=81, help="Plans sampled (the default plan included)")
+    parser.add_argument("--seeds", type=int, default=3, help="Demand seeds per plan at the last rung")
+    parser.add_argument("--eta", type=int, default=3, help="Keep 1/eta of the plans per rung")
+    parser.add_argument("--max-collisions", type=float, default=None,
+                        help="Mean collisions allowed per full run (default: no more than the default plan)")
+    parser.add_argument("--max-near-misses", type=float, default=None,
+                        help="Mean near-misses allowed per full run (default: no more than the default plan)")
+    parser.add_argument("--seed", type=int, default=42, help="Master seed for plans and demand seeds")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--cache", type=str, default=str(ROOT / "artifacts" / "optimize_cache.jsonl"),
+                        help="Evaluation cache, reused across runs ('' = off)")
+    parser.add_argument("--out", type=str, default=str(ROOT / "artifacts" / "optimize.json"))
+
+    args = parser.parse_args()
+
+    scenario = {k: getattr(args, k) for k in SCENARIO_FIELDS}
+    bounds = {k: getattr(args, k) for k in BOUNDS}
+    scenario_id = hashlib.sha256(json.dumps(scenario, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+    n_seeds = args.seeds
+    if args.arrivals == "platoon" and n_seeds > 1:
+        print("Platoon arrivals do not depend on the seed: evaluating one seed", file=sys.stderr)
+        n_seeds = 1
+    seeds = [derive_seed(args.seed, f"{scenario_id}:{i}") for i in range(n_seeds)]
+    plans = sample_plans(args.candidates, bounds, args.seed)
+
+    t0 = time.time()
+    result = successive_halving(
+        scenario, plans, args.duration, seeds, eta=args.eta, min_duration=args.min_duration,
+        max_collisions=args.max_collisions, max_near_misses=args.max_near_misses,
+        cache=EvalCache(args.cache or None), workers=args.workers,
+    )
+    result.update({"scenario": scenario, "seeds": seeds, "elapsed_s": time.time() - t0})
+
+    out = Path(args.out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(result, indent=2), encoding="utf-8")
+
+    best, base = result["best"], result["baseline"]
+    if not result["feasible"]:
+        print("No plan met the collision/near-miss limits; showing the least violating one")
+    print(f"Best plan: " + " ".join(f"--{k.replace('_', '-')} {v:g}" for k, v in best["plan"].items()))
+    for m in METRICS:
+        print(f"  {m:<16}{best[m]:>12.1f}   default {base[m]:>12.1f}")
+    ev = result["evaluations"]
+    print(f"{ev['runs']} runs, {ev['cached']} cached, {result['elapsed_s']:.0f}s -> {out}")
@@ -0,0 +1,62 @@
+from __future__ import annotations
+import sys
+import time
+import argparse
+from pathlib import Path
+
+# Ensure project root on path
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from src.v2x_sim.render import FrameRecorder, Renderer, write_gif, write_png_sequence
+from src.v2x_sim.simulation import Simulation
+from src.v2x_sim.tracks import TrackFile
+from main import build_demand
+
+
+def live_frames(renderer: Renderer, duration: float, fps: float, rate_ew: float, rate_ns: float, seed: int,
+                dt: float = 0.1, chunk: float = 60.0):
+    # Poisson scenario of main.py --arrivals poisson, rendered while it runs (a minute of frames at a time)
+    sim = Simulation(dt=dt)
+    build_demand(sim, duration, rate_ew=rate_ew, rate_ns=rate_ns, seed=seed)
+    rec = FrameRecorder(renderer, fps)
+    sim.recorder = rec
+    steps = int(round(duration / dt))
+    per_chunk = max(1, int(round(chunk / dt)))
+    for k in range(0, steps, per_chunk):
+        sim.run_steps(min(per_chunk, steps - k))
+        yield from rec.frames
+        rec.frames.clear()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Render a run to a PNG sequence or an animated GIF")
+    parser.add_argument("tracks", nargs="?", default="", help="Recorded run (tracks.trk); without it a Poisson scenario is simulated")
+    parser.add_argument("--out", type=str, default="artifacts/frames", help="Directory for PNG frames, or a .gif file")
+    parser.add_argument("--fps", type=float, default=10.0, help="Frames per simulated second")
+    parser.add_argument("--size", type=int, default=400, help="Frame width and height (px)")
+    parser.add_argument("--extent", type=float, default=250.0, help="Distance from the centre shown (m)")
+    parser.add_argument("--workers", type=int, default=1, help="Encoding processes")
+    parser.add_argument("--from", dest="t0", type=float, default=float("-inf"), help="Start (s, recorded runs)")
+    parser.add_argument("--to", dest="t1", type=float, default=float("inf"), help="End (s, recorded runs)")
+    parser.add_argument("--duration", type=float, default=600.0, help="Simulated run length (s)")
+    parser.add_argument("--rate-ew", type=float, default=0.2)
+    parser.add_argument("--rate-ns", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=42)
+
+    args = parser.parse_args()
+    t_start = time.time()
+    if args.tracks:
+        tf = TrackFile(Path(args.tracks))
+        end = min(args.t1, float(tf.times[-1])) if len(tf.times) else 0.0
+        renderer = Renderer(args.size, args.extent, duration=end)
+        frames = renderer.from_tracks(tf, args.fps, args.t0, args.t1)
+    else:
+        renderer = Renderer(args.size, args.extent, duration=args.duration)
+        frames = live_frames(renderer, args.duration, args.fps, args.rate_ew, args.rate_ns, args.seed)
+    out = Path(args.out)
+    if out.suffix.lower() == ".gif":
+        n = write_gif(frames, out, args.fps, args.workers)
+    else:
+        n = write_png_sequence(frames, out, args.workers)
+    print(f"{n} frames -> {out} in {time.time() - t_start:.1f} s")
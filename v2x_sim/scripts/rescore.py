@@ -0,0 +1,40 @@
+from __future__ import annotations
+import sys
+import json
+import argparse
+from pathlib import Path
+
+# Ensure project root on path
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from src.v2x_sim.tracks import TrackFile
+
+
+def rescore(path: Path, threshold: float = 1.0, half_width: float = 6.0, margin: float = 0.5,
+            t0: float = float("-inf"), t1: float = float("inf")) -> dict:
+    """Safety metrics of a recorded run under the given criteria, optionally for a time window."""
+    tf = TrackFile(path)
+    tf_t0, tf_t1 = (float(tf.times[0]), float(tf.times[-1])) if len(tf.times) else (0.0, 0.0)
+    return {
+        "records": len(tf.window(t0, t1)),
+        "t0": max(t0, tf_t0),
+        "t1": min(t1, tf_t1),
+        "collisions": tf.collisions(margin, t0, t1),
+        "near_misses": tf.near_misses(threshold, half_width, t0, t1),
+        "total_delay": tf.delay(t0, t1),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recompute metrics of a recorded run (tracks.trk) with new criteria")
+    parser.add_argument("tracks", type=str)
+    parser.add_argument("--threshold", type=float, default=1.0, help="Near-miss arrival-time gap (s)")
+    parser.add_argument("--half-width", type=float, default=6.0, help="Conflict zone half width (m)")
+    parser.add_argument("--margin", type=float, default=0.5, help="Collision gap margin beyond vehicle lengths (m)")
+    parser.add_argument("--from", dest="t0", type=float, default=float("-inf"), help="Window start (s)")
+    parser.add_argument("--to", dest="t1", type=float, default=float("inf"), help="Window end (s)")
+
+    args = parser.parse_args()
+    print(json.dumps(rescore(Path(args.tracks), args.threshold, args.half_width, args.margin, args.t0, args.t1),
+                     indent=2))
@@ -0,0 +1,143 @@
+from __future__ import annotations
+import sys
+import csv
+import json
+import argparse
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Ensure project root on path
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from src.v2x_sim.simulation import Metrics
+from src.v2x_sim.store import METRICS, ResultStore
+from src.v2x_sim.telemetry import STATES
+
+
+def parse_where(items: List[str]) -> Dict[str, object]:
+    # key=value pairs; numbers compare as numbers
+    where = {}
+    for item in items:
+        key, _, text = item.partition("=")
+        try:
+            where[key] = float(text)
+        except ValueError:
+            where[key] = text
+    return where
+
+
+def compare_groups(groups: List[dict], by: str, baseline=None) -> List[dict]:
+    """Mean of each metric per group and its relative change from the baseline group."""
+    if not groups:
+        return []
+    ref = groups[0] if baseline is None else next((g for g in groups if g[by] == baseline), None)
+    if ref is None:
+        raise ValueError(f"no runs with {by}={baseline}")
+    rows = []
+    for g in groups:
+        row = {by: g[by], "runs": g["runs"]}
+        for m in METRICS:
+            mean, base = g[m]["mean"], ref[m]["mean"]
+            row[m] = mean
+            row[m + "_change"] = (mean - base) / base if base else None
+        rows.append(row)
+    return rows
+
+
+def import_artifacts(store: ResultStore, folders: List[Path]) -> int:
+    """Index old artifacts folders (metrics.json + config_used.json), metrics only."""
+    added = 0
+    for folder in folders:
+        mpath, cpath = folder / "metrics.json", folder / "config_used.json"
+        if not (mpath.exists() and cpath.exists()):
+            continue
+        metrics = json.loads(mpath.read_text(encoding="utf-8"))
+        config = json.loads(cpath.read_text(encoding="utf-8"))
+        config.update(config.pop("signal", {}))
+        if store.find_run(config, "legacy") is None:
+            m = Metrics(metrics["collisions"], metrics["near_misses"], metrics["vehicles_exited"], metrics["total_delay"])
+            store.add_run(config, metrics.get("time", config.get("duration", 0.0)), m, tag=folder.name, version="legacy")
+            added += 1
+    return added
+
+
+def _fmt(x) -> str:
+    if x is None:
+        return "-"
+    return f"{x:.4g}" if isinstance(x, float) else str(x)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Query the run-results store")
+    parser.add_argument("--store", type=str, default=str(ROOT / "artifacts" / "results.sqlite"))
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_list = sub.add_parser("list", help="List runs")
+    p_list.add_argument("--where", action="append", default=[], help="key=value filter (repeatable)")
+    p_list.add_argument("--order", type=str, default="id")
+    p_list.add_argument("--limit", type=int, default=50)
+
+    p_sum = sub.add_parser("summary", help="Aggregate metrics across seeds per parameter set")
+    p_sum.add_argument("--group-by", type=str, default="", help="Comma-separated config keys")
+    p_sum.add_argument("--where", action="append", default=[])
+
+    p_cmp = sub.add_parser("compare", help="Compare mean metrics across values of one key")
+    p_cmp.add_argument("--by", type=str, required=True)
+    p_cmp.add_argument("--baseline", type=str, default=None, help="Reference value (default: first group)")
+    p_cmp.add_argument("--where", action="append", default=[])
+
+    p_tl = sub.add_parser("timeline", help="Write one run's timeline as CSV")
+    p_tl.add_argument("run", type=int)
+    p_tl.add_argument("--channel", type=str, default="steps")
+    p_tl.add_argument("--out", type=str, default="", help="CSV file (default stdout)")
+
+    p_imp = sub.add_parser("import", help="Index existing artifacts folders")
+    p_imp.add_argument("folders", nargs="+")
+
+    args = parser.parse_args()
+    store = ResultStore(Path(args.store))
+    out = csv.writer(sys.stdout)
+
+    if args.command == "list":
+        runs = list(store.runs(parse_where(args.where), order_by=args.order, limit=args.limit))
+        keys = sorted({k for r in runs for k in r["config"]})
+        out.writerow(["id", "code_version", "tag"] + keys + list(METRICS))
+        for r in runs:
+            out.writerow([r["id"], r["code_version"], r["tag"]] + [_fmt(r["config"].get(k)) for k in keys]
+                         + [_fmt(r[m]) for m in METRICS])
+    elif args.command == "summary":
+        group_by = [k for k in args.group_by.split(",") if k]
+        out.writerow(group_by + ["runs"] + [f"{m}_{s}" for m in METRICS for s in ("mean", "std", "min", "max")])
+        for g in store.aggregate(group_by, parse_where(args.where)):
+            out.writerow([_fmt(g[k]) for k in group_by] + [g["runs"]]
+                         + [_fmt(g[m][s]) for m in METRICS for s in ("mean", "std", "min", "max")])
+    elif args.command == "compare":
+        baseline: Optional[object] = args.baseline
+        if baseline is not None:
+            baseline = parse_where([f"x={baseline}"])["x"]
+        rows = compare_groups(store.aggregate([args.by], parse_where(args.where)), args.by, baseline)
+        out.writerow([args.by, "runs"] + [c for m in METRICS for c in (m, m + "_change")])
+        for r in rows:
+            change = [r[m + "_change"] for m in METRICS]
+            out.writerow([_fmt(r[args.by]), r["runs"]] + [
+                v for m, c in zip(METRICS, change) for v in (_fmt(r[m]), "-" if c is None else f"{c * 100:+.1f}%")
+            ])
+    elif args.command == "timeline":
+        names, rows = store.timeline(args.run, args.channel)
+        f = open(args.out, "w", newline="", encoding="utf-8") if args.out else sys.stdout
+        try:
+            w = csv.writer(f)
+            w.writerow(names)
+            state = names.index("signal_state") if "signal_state" in names else -1
+            for row in rows:
+                if state >= 0:
+                    row = row[:state] + (STATES[row[state]],) + row[state + 1:]
+                w.writerow(row)
+        finally:
+            if f is not sys.stdout:
+                f.close()
+    else:
+        n = import_artifacts(store, [Path(p) for p in args.folders])
+        print(f"Imported {n} runs into {args.store}")
+    store.close()
@@ -0,0 +1,293 @@
+from __future__ import annotations
+import sys
+import csv
+import json
+import time
+import hashlib
+import argparse
+import itertools
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+
+# Ensure project root on path
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from src.v2x_sim.simulation import Metrics, Simulation
+from src.v2x_sim import snapshot
+from src.v2x_sim.kpi import TrafficKPIs, merged
+from main import build_demand, build_scenario
+
+
+# Scenario and signal fields of generate_submission_artifacts.py, with defaults
+FIELDS = {
+    "duration": 60.0,
+    "dt": 0.1,
+    "arrivals": "platoon",  # platoon (deterministic build_scenario) or poisson (seeded build_demand)
+    "rate_ew": 0.2,  # veh/s, poisson arrivals
+    "rate_ns": 0.2,
+    "ew_count": 6,
+    "ns_count": 6,
+    "spawn_gap_ew": 2.5,
+    "spawn_gap_ns": 2.2,
+    "v_ew": 12.0,
+    "v_ns": 11.0,
+    "min_green": 8.0,
+    "max_green": 25.0,
+    "yellow": 3.0,
+    "all_red": 1.0,
+}
+SIGNAL_FIELDS = ("min_green", "max_green", "yellow", "all_red")
+RESULT_FIELDS = ["collisions", "near_misses", "vehicles_exited", "total_delay"]
+COLUMNS = ["job", "key", "repeat", "seed"] + list(FIELDS) + ["warmup"] + RESULT_FIELDS
+
+
+def job_key(config: dict, repeat: int) -> str:
+    # Stable identity of a job, independent of its position in the grid
+    blob = json.dumps({"config": config, "repeat": repeat}, sort_keys=True)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()[:16]
+
+
+def derive_seed(master_seed: int, key: str) -> int:
+    digest = hashlib.sha256(f"{master_seed}:{key}".encode("utf-8")).digest()
+    return int.from_bytes(digest[:4], "little")
+
+
+def expand_jobs(configs, repeats: int, master_seed: int, warmup: float = 0.0, engine: str = "object"):
+    # The engine names the job (a resumed table never mixes engines) but not its seed,
+    # so both engines see the same demand; object-engine keys are those of older tables
+    tag = {} if engine == "object" else {"engine": engine}
+    jobs = []
+    for config in configs:
+        # Normalise types so 60 and 60.0 name the same job
+        full = {k: type(d)(config.get(k, d)) for k, d in FIELDS.items()}
+        if full["arrivals"] == "scenario":
+            full["arrivals"] = "platoon"  # the fixed build_scenario platoons
+        if full["arrivals"] not in ("platoon", "poisson"):
+            raise ValueError(f"unknown arrivals {full['arrivals']!r} (platoon or poisson)")
+        if repeats > 1 and full["arrivals"] == "platoon":
+            raise ValueError("platoon arrivals do not depend on the seed; repeats need arrivals=poisson")
+        for r in range(repeats):
+            if warmup > 0.0:
+                # Configs differing only in signal timings share one warm state (and its seed)
+                key = job_key(dict(full, warmup=warmup, **tag), r)
+                scenario = {k: v for k, v in full.items() if k not in SIGNAL_FIELDS}
+                scenario_key = job_key(dict(scenario, warmup=warmup), r)
+            else:
+                key = scenario_key = job_key(full, r)
+                if tag:
+                    key = job_key(dict(full, **tag), r)
+            jobs.append({"key": key, "repeat": r, "seed": derive_seed(master_seed, scenario_key),
+                         "scenario": scenario_key, "warmup": warmup, "engine": engine, **full})
+    for i, job in enumerate(jobs):
+        job["job"] = i
+    return jobs
+
+
+def build_job(sim, job: dict, duration: float) -> None:
+    # Demand of a job: seeded Poisson arrivals over `duration`, or the fixed platoons
+    if job["arrivals"] == "poisson":
+        build_demand(sim, duration, rate_ew=job["rate_ew"], rate_ns=job["rate_ns"], v_ew=job["v_ew"],
+                     v_ns=job["v_ns"], seed=job["seed"])
+        return
+    build_scenario(
+        sim,
+        ew_count=int(job["ew_count"]),
+        ns_count=int(job["ns_count"]),
+        spawn_gap_ew=job["spawn_gap_ew"],
+        spawn_gap_ns=job["spawn_gap_ns"],
+        v_ew=job["v_ew"],
+        v_ns=job["v_ns"],
+        seed=job["seed"],
+    )
+
+
+def run_warmup(job: dict) -> bytes:
+    # Warm-up with the default signal timings; forks then apply their own
+    sim = Simulation(dt=job["dt"], signal_params={k: FIELDS[k] for k in SIGNAL_FIELDS})
+    build_job(sim, job, job["warmup"] + job["duration"])
+    sim.run(job["warmup"])
+    return snapshot.dumps(sim)
+
+
+def run_job(job: dict) -> dict:
+    signal_params = {k: job[k] for k in SIGNAL_FIELDS}
+    if job.get("warm") is not None:
+        # Fork of the shared warm state; metrics cover `duration` after the warm-up
+        sim = snapshot.loads(job["warm"], signal_params)
+        sim.metrics = Metrics()
+        m = sim.run(job["duration"])
+        return _result_row(job, m)
+    if job.get("engine") == "vectorized":
+        from src.v2x_sim.vectorized import VectorizedSimulation
+
+        sim = VectorizedSimulation(dt=job["dt"], signal_params=signal_params)
+    else:
+        sim = Simulation(dt=job["dt"], signal_params=signal_params)
+    build_job(sim, job, job["duration"])
+    if job.get("kpi_interval"):
+        sim.kpi = TrafficKPIs(interval=job["kpi_interval"], keep=int(job["duration"] / job["kpi_interval"]) + 1)
+    m = sim.run(job["duration"])
+    row = _result_row(job, m)
+    if getattr(sim, "kpi", None) is not None:
+        row["kpi"] = sim.kpi  # merged per config by run_sweep, not written to the table
+    return row
+
+
+def _result_row(job: dict, m: Metrics) -> dict:
+    row = {k: job[k] for k in COLUMNS if k in job}
+    row.update({
+        "collisions": m.collisions,
+        "near_misses": m.near_misses,
+        "vehicles_exited": m.total_vehicles_exited,
+        "total_delay": m.total_delay,
+    })
+    return row
+
+
+def read_done(path: Path) -> dict:
+    if not path.exists():
+        return {}
+    with path.open(newline="", encoding="utf-8") as f:
+        return {row["key"]: row for row in csv.DictReader(f)}
+
+
+def run_sweep(jobs, out_path: Path, workers: int = 1, chunksize: int = 0, progress=True,
+              kpi_path: Path | None = None, kpi_interval: float = 60.0):
+    """Run jobs across a process pool, appending rows to out_path as they finish.
+
+    Jobs whose key is already in out_path are skipped, so an interrupted sweep
+    resumes where it stopped. The table is rewritten in job order at the end,
+    so its content does not depend on the number of workers. Jobs with a
+    warm-up fork one snapshot per scenario instead of repeating the warm-up.
+
+    With `kpi_path`, every job run here collects TrafficKPIs, and the KPIs of
+    the repeats of each config are merged into one entry of that JSON file
+    (`runs` counts them; jobs resumed from the table have none).
+    """
+    done = read_done(out_path)
+    todo = [j for j in jobs if j["key"] not in done]
+    if progress and done:
+        print(f"Resuming: {len(jobs) - len(todo)}/{len(jobs)} jobs already done", file=sys.stderr)
+    vectorized = any(j["engine"] == "vectorized" for j in jobs)
+    if vectorized and any(j.get("warmup") for j in jobs):
+        raise ValueError("warm-up forking needs the object engine")
+    if kpi_path is not None:
+        if vectorized or any(j.get("warmup") for j in jobs):
+            raise ValueError("KPIs need the object engine and no warm-up (trips would start at the fork)")
+        todo = [dict(j, kpi_interval=kpi_interval) for j in todo]
+    kpis = {}
+
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    if done and list(next(iter(done.values()))) != COLUMNS:
+        write_table(out_path, list(done.values()))  # table from an older version: upgrade header
+    new_file = not out_path.exists() or out_path.stat().st_size == 0
+    t0 = time.time()
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    run_map = pool.map if pool is not None else map
+    with out_path.open("a", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=COLUMNS)
+        if new_file:
+            writer.writeheader()
+        try:
+            # One warm-up per scenario; its snapshot is forked by every signal variant
+            warm_jobs = list({j["scenario"]: j for j in todo if j.get("warmup")}.values())
+            if warm_jobs:
+                warm = dict(zip((j["scenario"] for j in warm_jobs), run_map(run_warmup, warm_jobs)))
+                todo = [dict(j, warm=warm.get(j["scenario"])) for j in todo]
+            if pool is not None:
+                chunksize = chunksize or max(1, len(todo) // (workers * 4))
+                results = pool.map(run_job, todo, chunksize=chunksize)
+            else:
+                results = map(run_job, todo)
+            for i, row in enumerate(results, 1):
+                kpi = row.pop("kpi", None)
+                if kpi is not None:
+                    kpis.setdefault(_config_id(row), []).append(kpi)
+                writer.writerow(row)
+                f.flush()
+                done[row["key"]] = row
+                if progress and (i == len(todo) or i % max(1, len(todo) // 20) == 0):
+                    print(f"[{i}/{len(todo)}] {time.time() - t0:.1f}s", file=sys.stderr)
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+    # Consolidate in job order; rows of earlier sweeps into the same table are kept after them
+    keys = {j["key"] for j in jobs}
+    rows = [dict(done[j["key"]], job=j["job"]) for j in jobs]
+    rows += [done[k] for k in sorted(done) if k not in keys]
+    write_table(out_path, rows)
+    if kpi_path is not None:
+        write_kpis(kpi_path, jobs, kpis)
+    return rows[:len(jobs)]
+
+
+def _config_id(row: dict) -> str:
+    # Identity of a config across its repeats (values as run, so table rows and jobs agree)
+    return json.dumps({k: type(d)(row[k]) for k, d in FIELDS.items()}, sort_keys=True)
+
+
+def write_kpis(path: Path, jobs, kpis: dict) -> None:
+    # One merged KPI entry per config, in job order
+    out = []
+    for cid in dict.fromkeys(_config_id(j) for j in jobs):
+        runs = kpis.get(cid, [])
+        entry = {"config": json.loads(cid), "runs": len(runs)}
+        if runs:
+            k = merged(runs)
+            entry.update(summary=k.summary(), intervals=k.interval_rows())
+        out.append(entry)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(out, indent=2), encoding="utf-8")
+
+
+def write_table(path: Path, rows) -> None:
+    with path.open("w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=COLUMNS)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def parse_values(name: str, text: str):
+    return [type(FIELDS[name])(x) for x in text.split(",")]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a parameter sweep of the V2X simulation")
+    for name, default in FIELDS.items():
+        parser.add_argument(
+            "--" + name.replace("_", "-"),
+            type=str,
+            default=None,
+            help=f"Comma-separated values (default {default})",
+        )
+    parser.add_argument("--configs", type=str, default="", help="JSON file with a list of config dicts (overrides the grid)")
+    parser.add_argument("--repeats", type=int, default=1,
+                        help="Runs per configuration, each with its own derived seed (needs --arrivals poisson)")
+    parser.add_argument("--warmup", type=float, default=0.0,
+                        help="Seconds simulated once per scenario and forked for every signal variant (0 = off)")
+    parser.add_argument("--seed", type=int, default=42, help="Master seed for per-job seeds")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--chunksize", type=int, default=0, help="Jobs per worker task (0 = auto)")
+    parser.add_argument("--engine", choices=("object", "vectorized"), default="object")
+    parser.add_argument("--out", type=str, default=str(ROOT / "artifacts" / "sweep.csv"), help="Results table (resumed if present)")
+    parser.add_argument("--kpi", type=str, default="",
+                        help="Also write KPIs (travel times, queues, ...) merged over the repeats of each config to this JSON")
+    parser.add_argument("--kpi-interval", type=float, default=60.0, help="KPI interval length (s)")
+
+    args = parser.parse_args()
+
+    if args.configs:
+        with open(args.configs, encoding="utf-8") as f:
+            configs = json.load(f)
+    else:
+        grid = {name: parse_values(name, getattr(args, name)) for name in FIELDS if getattr(args, name) is not None}
+        configs = [dict(zip(grid, combo)) for combo in itertools.product(*grid.values())]
+
+    jobs = expand_jobs(configs, args.repeats, args.seed, warmup=args.warmup, engine=args.engine)
+    if args.kpi and (args.engine == "vectorized" or args.warmup > 0.0):
+        parser.error("--kpi needs the object engine and no --warmup")
+    run_sweep(jobs, Path(args.out), workers=args.workers, chunksize=args.chunksize,
+              kpi_path=Path(args.kpi) if args.kpi else None, kpi_interval=args.kpi_interval)
+    print(f"{len(jobs)} results in: {args.out}")
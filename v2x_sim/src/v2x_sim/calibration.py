@@ -0,0 +1,245 @@
+from __future__ import annotations
+import csv
+import math
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .demand import Arrival
+from .ensemble import EnsembleSimulation
+from .models.vehicle import CAR, Vehicle
+
+# Search ranges of the fitted parameters
+VEHICLE_BOUNDS = {
+    "v_des": (8.0, 20.0),
+    "a_max": (1.0, 3.5),
+    "d_max": (2.0, 8.0),
+    "t_headway": (0.8, 2.5),
+}
+SIGNAL_BOUNDS = {
+    "min_green": (4.0, 20.0),
+    "max_green": (10.0, 60.0),
+    "yellow": (3.0, 5.0),
+    "all_red": (0.5, 3.0),
+}
+BOUNDS = {**VEHICLE_BOUNDS, **SIGNAL_BOUNDS}
+DEFAULTS = {**{k: getattr(CAR, k) for k in VEHICLE_BOUNDS}, "min_green": 8.0, "max_green": 25.0, "yellow": 3.0,
+            "all_red": 1.0}
+
+
+def interval_counts(t: Sequence[float], cumulative: Sequence[float], interval: float,
+                    end: Optional[float] = None) -> List[int]:
+    """Exits per `interval` s from a cumulative count series (vehicles_exited_over_time.csv)."""
+    t = np.asarray(t, dtype=float)
+    cumulative = np.asarray(cumulative, dtype=float)
+    end = float(t[-1]) if end is None else end
+    bounds = interval * np.arange(1, int(end / interval + 1e-9) + 1)
+    # Cumulative count at each boundary: last row at or before it (0 before the first)
+    pos = np.searchsorted(t, bounds + 1e-9, "right") - 1
+    at = np.where(pos >= 0, cumulative[np.maximum(pos, 0)], 0.0)
+    return np.diff(np.concatenate(([0.0], at))).astype(int).tolist()
+
+
+def load_counts(path: Path, interval: float = 60.0) -> List[int]:
+    """Observed exits per interval from a CSV with columns t and vehicles_exited (cumulative)."""
+    with Path(path).open(newline="", encoding="utf-8") as f:
+        rows = [(float(r["t"]), float(r["vehicles_exited"])) for r in csv.DictReader(f)]
+    if not rows:
+        raise ValueError(f"{path} has no rows")
+    t, cumulative = zip(*rows)
+    return interval_counts(t, cumulative, interval)
+
+
+class ScheduleRecorder:
+    """Stand-in for a Simulation that keeps what a scenario builder schedules.
+
+    build_demand(ScheduleRecorder(), ...) drains the demand once; the list
+    is then the shared spawn schedule of every candidate evaluated on that
+    seed, so candidates differ only in their parameters.
+    """
+
+    def __init__(self):
+        self.arrivals: List[Tuple[float, Vehicle]] = []
+
+    def schedule_vehicle(self, spawn_time: float, vehicle: Vehicle) -> None:
+        self.arrivals.append((spawn_time, vehicle))
+
+    def add_demand(self, source: Iterable[Arrival]) -> None:
+        self.arrivals.extend(source)
+
+
+def _split(params: dict) -> Tuple[dict, dict]:
+    # Candidate values into (signal params, vehicle params), defaults filled in
+    full = {**DEFAULTS, **params}
+    return {k: full[k] for k in SIGNAL_BOUNDS}, {k: full[k] for k in VEHICLE_BOUNDS}
+
+
+def evaluate_batch(task: dict) -> List[dict]:
+    """Error of each candidate against the observed counts, all in one ensemble.
+
+    Every candidate runs once per schedule (demand seed), with the same
+    arrivals; its simulated counts are the mean over seeds. Every
+    `check_every` s the candidates whose RMSE over the intervals so far
+    exceeds `prune` times the best one (or `reference`, the best full error
+    known), plus one vehicle per interval, are dropped from the ensemble;
+    the first `protect` candidates always run to the end.
+    """
+    cands, schedules, observed = task["candidates"], task["schedules"], np.asarray(task["observed"], dtype=float)
+    interval, dt = task["interval"], task["dt"]
+    prune, check_every = task.get("prune", 2.0), task.get("check_every", 600.0)
+    reference = task.get("reference", math.inf)
+    protect = task.get("protect", 0)
+    n_seeds = len(schedules)
+    ens = EnsembleSimulation(len(cands) * n_seeds, dt=dt,
+                             signal_params=[_split(c)[0] for c in cands for _ in schedules])
+    for r in range(ens.k):
+        for spawn_time, vehicle in schedules[r % n_seeds]:
+            ens.schedule_vehicle(r, spawn_time, vehicle)
+    ens.set_vehicle_params([_split(c)[1] for c in cands for _ in schedules])
+
+    alive = list(range(len(cands)))
+    results = [{"error": math.inf, "pruned_at": None} for _ in cands]
+    cum = [np.zeros(ens.k)]  # cumulative exits per replica at each interval boundary
+    steps = int(round(interval / dt))
+    check = max(1, int(round(check_every / interval)))
+    ticks = 0
+    for b in range(len(observed)):
+        for _ in range(steps):
+            ens.step()
+        ticks += steps * ens.k
+        cum.append(ens.exited.astype(float))
+        done = b + 1
+        if done % check and done < len(observed):
+            continue
+        sim = np.diff(np.array(cum), axis=0).reshape(done, len(alive), n_seeds).mean(axis=2)
+        rmse = np.sqrt(((sim - observed[:done, None]) ** 2).mean(axis=0))
+        if done == len(observed):
+            for i, c in enumerate(alive):
+                results[c]["error"] = float(rmse[i])
+                results[c]["counts"] = sim[:, i].tolist()
+            break
+        limit = prune * min(float(rmse.min()), reference) + 1.0
+        keep = [i for i in range(len(alive)) if rmse[i] <= limit or alive[i] < protect]
+        if len(keep) < len(alive):
+            for i in set(range(len(alive))) - set(keep):
+                results[alive[i]].update(error=float(rmse[i]), pruned_at=done * interval)
+            rows = [i * n_seeds + s for i in keep for s in range(n_seeds)]
+            ens.keep(rows)
+            cum = [c[rows] for c in cum]
+            alive = [alive[i] for i in keep]
+    results[0]["ticks"] = ticks  # replica-ticks simulated by the batch
+    return results
+
+
+def _to_unit(params: dict, fit: Sequence[str], bounds: dict) -> np.ndarray:
+    return np.array([(params[k] - bounds[k][0]) / (bounds[k][1] - bounds[k][0]) for k in fit])
+
+
+def _from_unit(x: np.ndarray, fit: Sequence[str], bounds: dict, fixed: dict) -> dict:
+    params = dict(fixed)
+    for k, u in zip(fit, np.clip(x, 0.0, 1.0)):
+        lo, hi = bounds[k]
+        params[k] = round(float(lo + u * (hi - lo)), 3)
+    full = {**DEFAULTS, **params}
+    if full["max_green"] < full["min_green"] + 0.5:
+        params["max_green"] = full["min_green"] + 0.5
+    return params
+
+
+def calibrate(
+    observed: Sequence[int],
+    schedules: Sequence[List[Tuple[float, Vehicle]]],
+    interval: float = 60.0,
+    dt: float = 0.1,
+    fit: Sequence[str] = tuple(BOUNDS),
+    fixed: Optional[dict] = None,
+    bounds: Optional[dict] = None,
+    batch: int = 32,
+    generations: int = 8,
+    elite: float = 0.25,
+    prune: float = 2.0,
+    check_every: float = 600.0,
+    seed: int = 0,
+    workers: int = 1,
+    progress: bool = True,
+) -> dict:
+    """Parameters whose simulated exits per interval best match `observed` (lowest RMSE).
+
+    A cross-entropy search: generation 0 is the default parameters plus
+    random candidates in `bounds`; each later generation samples `batch`
+    candidates from a normal distribution fitted to the best `elite`
+    fraction of everything evaluated so far (those are kept, not re-run).
+    A generation is evaluated as `workers` ensembles (evaluate_batch) over
+    the shared spawn schedules, one per demand seed, and candidates that are
+    clearly worse than the best are stopped early. Parameters not in `fit`
+    take their value from `fixed`, else DEFAULTS.
+    """
+    bounds = {**BOUNDS, **(bounds or {})}
+    fixed = dict(fixed or {})
+    fit = [k for k in fit if k not in fixed]
+    unknown = set(fit) - set(bounds)
+    if unknown:
+        raise ValueError(f"unknown parameters {sorted(unknown)}")
+    rng = np.random.default_rng(seed)
+    pool = ProcessPoolExecutor(workers) if workers > 1 else None
+    evaluated: List[Tuple[float, dict]] = []
+    history = []
+    ticks = pruned = 0
+    best = (math.inf, None)
+    default_error = math.inf
+    try:
+        mean = std = None
+        for g in range(generations):
+            if g == 0:
+                cands = [_from_unit(_to_unit({**DEFAULTS, **fixed}, fit, bounds), fit, bounds, fixed)]
+                cands += [_from_unit(rng.random(len(fit)), fit, bounds, fixed) for _ in range(batch - 1)]
+            else:
+                cands = [_from_unit(rng.normal(mean, std), fit, bounds, fixed) for _ in range(batch)]
+            parts = [cands[i::max(1, workers)] for i in range(max(1, workers))]
+            tasks = [{"candidates": p, "schedules": schedules, "observed": list(observed), "interval": interval,
+                      "dt": dt, "prune": prune, "check_every": check_every, "reference": best[0],
+                      "protect": int(g == 0 and i == 0)}  # the defaults run in full, as the baseline
+                     for i, p in enumerate(parts) if p]
+            outs = list(pool.map(evaluate_batch, tasks) if pool is not None else map(evaluate_batch, tasks))
+            if g == 0:
+                default_error = outs[0][0]["error"]
+            for part, res in zip(parts, outs):
+                ticks += res[0]["ticks"]
+                for c, r in zip(part, res):
+                    pruned += r["pruned_at"] is not None
+                    score = r["error"] if r["pruned_at"] is None else math.inf
+                    evaluated.append((score, c))
+                    if score < best[0]:
+                        best = (score, c, r["counts"])
+            ranked = sorted((x for x in evaluated if math.isfinite(x[0])), key=lambda x: x[0])
+            top = ranked[:max(2, int(round(elite * len(ranked))))]
+            units = np.array([_to_unit({**DEFAULTS, **c}, fit, bounds) for _, c in top])
+            mean, std = units.mean(axis=0), np.maximum(units.std(axis=0), 0.02)
+            gen_errors = [r["error"] for res in outs for r in res if r["pruned_at"] is None]
+            history.append({"generation": g, "candidates": len(cands), "best_error": best[0],
+                            "generation_best": min(gen_errors, default=math.inf),
+                            "pruned": sum(r["pruned_at"] is not None for res in outs for r in res)})
+            if progress:
+                h = history[-1]
+                print(f"generation {g}: {h['candidates']} candidates, {h['pruned']} stopped early, "
+                      f"best RMSE {h['best_error']:.2f} veh/interval", file=sys.stderr)
+            if float(std.max()) <= 0.02 and g > 0:
+                break  # converged
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    return {
+        "params": {**DEFAULTS, **best[1]},
+        "error": best[0],
+        "default_error": default_error,
+        "counts": best[2],
+        "observed": list(observed),
+        "interval": interval,
+        "history": history,
+        "evaluations": len(evaluated),
+        "pruned": pruned,
+        "replica_ticks": ticks,
+    }
@@ -0,0 +1,193 @@
+from __future__ import annotations
+import math
+import random
+from collections import defaultdict, deque
+from typing import Deque, Dict, List, NamedTuple, Optional, Tuple
+
+from .models.vehicle import Vehicle, VehicleClass, LANE_CODE
+from .models.traffic_signal import LIGHT_TABLE, TrafficSignal
+
+
+class BSM(NamedTuple):
+    """Basic safety message: sender state at generation time t.
+
+    Has the `s`, `v`, `direction` and `profile` attributes the V2V controller
+    reads from a lead vehicle, so a received message stands in for one.
+    """
+
+    id: int
+    t: float
+    lane_code: int
+    direction: int
+    s: float
+    v: float
+    a: float
+    profile: VehicleClass
+
+
+class SPaT(NamedTuple):
+    """Signal phase message broadcast by the roadside unit at the intersection."""
+
+    t: float
+    phase: int
+
+    def light_for(self, lane_code: int) -> int:
+        return LIGHT_TABLE[self.phase][lane_code]
+
+
+def position(lane_code: int, s: float) -> Tuple[float, float]:
+    # Approaches are the x (EW) and y (NS) axes, crossing at the origin
+    return (s, 0.0) if lane_code == LANE_CODE["EW"] else (0.0, s)
+
+
+class MessageBus:
+    """Simulated V2V/V2I broadcast channel with latency and loss.
+
+    Each vehicle broadcasts a BSM when it appears and then every 1/rate
+    seconds (at a random phase offset), and the roadside unit a SPaT every 1/spat_rate seconds. Messages
+    are delivered in per-tick batches once `latency` has elapsed, each
+    receiver independently losing a message with probability `loss`. A BSM
+    reaches the vehicles within the sender's comm_range, found through a
+    uniform grid of `cell`-sized squares (default: the largest range), so a
+    batch costs O(messages x neighbours) instead of O(N^2) distance checks.
+
+    Receivers keep the latest message per sender. lead() picks the nearest
+    vehicle ahead in the same approach among messages at most `max_age` old,
+    dead-reckoned to the current time at constant speed unless disabled;
+    spat() returns the latest signal message (None before the first one).
+    """
+
+    def __init__(self, rate: float = 10.0, latency: float = 0.1, loss: float = 0.0, max_age: float = 1.0,
+                 spat_rate: float = 10.0, rsu_range: float = 300.0, cell: Optional[float] = None,
+                 dead_reckoning: bool = True, seed: int = 0):
+        self.rate = rate
+        self.latency = latency
+        self.loss = loss
+        self.max_age = max_age
+        self.spat_rate = spat_rate
+        self.rsu_range = rsu_range
+        self.cell = cell
+        self.dead_reckoning = dead_reckoning
+        self.sent = 0
+        self.delivered = 0
+        self.lost = 0
+        self.range_checks = 0  # sender-receiver distance computations
+        self._rng = random.Random(seed)
+        self._t = 0.0
+        self._next_tx: Dict[int, float] = {}
+        self._next_spat = 0.0
+        self._in_flight: Deque[Tuple[float, List[BSM], List[SPaT]]] = deque()
+        self._tables: Dict[int, Dict[int, BSM]] = {}
+        self._spat: Dict[int, SPaT] = {}
+
+    def step(self, t: float, vehicles: List[Vehicle], signal: TrafficSignal) -> None:
+        """Send the messages due at time t and deliver those whose latency has elapsed."""
+        self._t = t
+        bsms: List[BSM] = []
+        interval = 1.0 / self.rate
+        next_tx = {}
+        for v in vehicles:
+            due = self._next_tx.get(v.id)
+            if due is None:
+                # A new vehicle announces itself, then settles at a random phase
+                bsms.append(BSM(v.id, t, v.lane_code, v.direction, v.s, v.v, v.a, v.profile))
+                due = t + self._rng.random() * interval
+            elif due <= t + 1e-9:
+                bsms.append(BSM(v.id, t, v.lane_code, v.direction, v.s, v.v, v.a, v.profile))
+                due = max(due + interval, t + 1e-9)
+            next_tx[v.id] = due
+        self._next_tx = next_tx  # departed vehicles drop out here
+        spats = []
+        if t + 1e-9 >= self._next_spat:
+            spats.append(SPaT(t, signal.phase))
+            self._next_spat = max(self._next_spat + 1.0 / self.spat_rate, t + 1e-9)
+        self.sent += len(bsms) + len(spats)
+        if bsms or spats:
+            self._in_flight.append((t + self.latency, bsms, spats))
+
+        while self._in_flight and self._in_flight[0][0] <= t + 1e-9:
+            _, bsms, spats = self._in_flight.popleft()
+            self._deliver(bsms, spats, vehicles)
+        if len(self._tables) > 2 * len(vehicles) + 64:
+            self._prune(vehicles)
+
+    def _deliver(self, bsms: List[BSM], spats: List[SPaT], receivers: List[Vehicle]) -> None:
+        loss, rng = self.loss, self._rng
+        tables = self._tables
+        for msg in spats:
+            r2 = self.rsu_range ** 2
+            for v in receivers:
+                x, y = position(v.lane_code, v.s)
+                self.range_checks += 1
+                if x * x + y * y > r2:
+                    continue
+                if loss and rng.random() < loss:
+                    self.lost += 1
+                    continue
+                self._spat[v.id] = msg
+                self.delivered += 1
+        if not bsms:
+            return
+
+        cell = self.cell or max(m.profile.comm_range for m in bsms)
+        grid: Dict[Tuple[int, int], List[Tuple[float, float, Vehicle]]] = defaultdict(list)
+        for v in receivers:
+            x, y = position(v.lane_code, v.s)
+            grid[(math.floor(x / cell), math.floor(y / cell))].append((x, y, v))
+        # Messages from one cell share the candidate receivers of its neighbourhood
+        by_cell: Dict[Tuple[int, int, int], List[Tuple[float, float, BSM]]] = defaultdict(list)
+        for m in bsms:
+            x, y = position(m.lane_code, m.s)
+            reach = math.ceil(m.profile.comm_range / cell)
+            by_cell[(math.floor(x / cell), math.floor(y / cell), reach)].append((x, y, m))
+        for (cx, cy, reach), senders in by_cell.items():
+            near = [
+                r for gx in range(cx - reach, cx + reach + 1) for gy in range(cy - reach, cy + reach + 1)
+                for r in grid.get((gx, gy), ())
+            ]
+            self.range_checks += len(near) * len(senders)
+            for sx, sy, m in senders:
+                r2 = m.profile.comm_range ** 2
+                sid = m.id
+                for x, y, v in near:
+                    if v.id == sid or (x - sx) ** 2 + (y - sy) ** 2 > r2:
+                        continue
+                    if loss and rng.random() < loss:
+                        self.lost += 1
+                        continue
+                    table = tables.get(v.id)
+                    if table is None:
+                        table = tables[v.id] = {}
+                    table[sid] = m
+                    self.delivered += 1
+
+    def _prune(self, vehicles: List[Vehicle]) -> None:
+        # Forget the tables of vehicles that left the simulation
+        present = {v.id for v in vehicles}
+        self._tables = {k: tab for k, tab in self._tables.items() if k in present}
+        self._spat = {k: m for k, m in self._spat.items() if k in present}
+
+    def lead(self, ego: Vehicle) -> Optional[BSM]:
+        """Nearest vehicle ahead in ego's approach as known from received BSMs."""
+        table = self._tables.get(ego.id)
+        if not table or ego.direction == 0:
+            return None
+        oldest = self._t - self.max_age - 1e-9
+        lane, d, s = ego.lane_code, ego.direction, ego.s
+        best, best_gap = None, math.inf
+        for m in table.values():
+            if m.lane_code != lane or m.direction != d or m.t < oldest:
+                continue
+            gap = d * (m.s + d * m.v * (self._t - m.t) - s) if self.dead_reckoning else d * (m.s - s)
+            if 0.0 < gap < best_gap:
+                best, best_gap = m, gap
+        if best is not None and self.dead_reckoning and best.t < self._t:
+            best = best._replace(s=best.s + d * best.v * (self._t - best.t))
+        return best
+
+    def spat(self, ego: Vehicle) -> Optional[SPaT]:
+        return self._spat.get(ego.id)
+
+    def neighbours(self, ego: Vehicle) -> Dict[int, BSM]:
+        # Latest message per sender held by ego (including stale ones)
+        return self._tables.get(ego.id, {})
@@ -0,0 +1,230 @@
+from __future__ import annotations
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ..models.traffic_signal import Phase, TrafficSignal
+from ..models.road import Road
+from ..models.vehicle import Vehicle, LANES, LANE_CODE
+
+_EW_GREEN, _EW_YELLOW, _ALL_RED, _NS_GREEN, _NS_YELLOW = (int(p) for p in Phase)
+_GREEN_OF = {LANE_CODE["EW"]: _EW_GREEN, LANE_CODE["NS"]: _NS_GREEN}
+_LANE_OF = {_EW_GREEN: LANE_CODE["EW"], _EW_YELLOW: LANE_CODE["EW"], _NS_GREEN: LANE_CODE["NS"],
+            _NS_YELLOW: LANE_CODE["NS"]}
+
+
+class PredictiveSignal(TrafficSignal):
+    """Signal choosing its green times by look-ahead rollouts (model-predictive control).
+
+    Between min_green and max_green, every `interval` s of green it predicts
+    the delay of the approaching vehicles over the next `horizon` s under
+    each candidate action: keep green, switch now, or switch in k s for k in
+    `delays`. It switches when switching now is predicted best and decides
+    again later otherwise. The prediction steps a simplified copy of the
+    vehicle controllers (speed tracking, stopping for red and yellow, gap
+    keeping) every `step` s on arrays read from the vehicles (no copies),
+    all candidates at once. Each rollout also predicts where the vehicles
+    will be at the next decision; if they are there (within `tolerance`,
+    and no vehicle came or went) the previous plan is still the best one
+    shifted by `interval`, and it is reused without a rollout. An empty
+    intersection costs no rollout either.
+    With `road` set (from_signal(sim.signal, road=sim.road)) the rollouts
+    see every vehicle of both approaches, including those past the stop
+    line, which also brake for red; otherwise only the approaching vehicles
+    passed to update(). Unlike TrafficSignal, ALL_RED hands green to the
+    other approach. update_demand() has no vehicles to predict and falls
+    back to TrafficSignal's reactive rule, ALL_RED still alternating.
+    """
+
+    __slots__ = ("horizon", "step", "interval", "delays", "tolerance", "road", "next_green", "_decide_at", "_plan",
+                 "rollouts", "reused")
+
+    def __init__(self, min_green: float = 8.0, max_green: float = 25.0, yellow: float = 3.0, all_red: float = 1.0,
+                 state="EW_GREEN", t_in_state: float = 0.0, horizon: float = 20.0, step: float = 0.5,
+                 interval: float = 1.0, delays: Sequence[float] = (4.0, 8.0), tolerance: float = 0.5,
+                 road: Optional[Road] = None):
+        super().__init__(min_green, max_green, yellow, all_red, state, t_in_state)
+        self.road = road
+        self.horizon = horizon
+        self.step = step
+        self.interval = interval
+        self.delays = tuple(delays)
+        self.tolerance = tolerance
+        # Approach served after the next ALL_RED (the one not green or yellow now; NS from ALL_RED)
+        self.next_green = 1 - _LANE_OF.get(self.phase, LANE_CODE["EW"])
+        self._decide_at = 0.0
+        self._plan: Optional[tuple] = None  # (phase, vehicles, predicted s and v at the next decision, switch time)
+        self.rollouts = 0
+        self.reused = 0
+
+    @classmethod
+    def from_signal(cls, signal: TrafficSignal, **options) -> "PredictiveSignal":
+        # Same timings and current phase as `signal`
+        return cls(signal.min_green, signal.max_green, signal.yellow, signal.all_red, signal.phase,
+                   signal.t_in_state, **options)
+
+    def _fields(self) -> tuple:
+        return super()._fields() + (self.horizon, self.step, self.interval, self.delays, self.tolerance,
+                                    self.next_green, self._decide_at)
+
+    def __setstate__(self, state) -> None:
+        # The road is not pickled; snapshot.loads links the restored one
+        (self.min_green, self.max_green, self.yellow, self.all_red, self.phase, self.t_in_state, self.horizon,
+         self.step, self.interval, self.delays, self.tolerance, self.next_green, self._decide_at) = state
+        self.road = None
+        self._plan = None
+        self.rollouts = 0
+        self.reused = 0
+
+    def __repr__(self) -> str:
+        return (f"PredictiveSignal(min_green={self.min_green!r}, max_green={self.max_green!r}, "
+                f"yellow={self.yellow!r}, all_red={self.all_red!r}, state={self.state!r}, "
+                f"t_in_state={self.t_in_state!r}, horizon={self.horizon!r})")
+
+    def update(self, dt: float, approaching: Dict[str, List[Vehicle]]) -> None:
+        self.t_in_state += dt
+        phase = self.phase
+        if phase == _EW_GREEN or phase == _NS_GREEN:
+            if self.t_in_state < self.min_green or self.t_in_state < self._decide_at - 1e-9:
+                return
+            if self.t_in_state >= self.max_green or self.best_switch(approaching) == 0.0:
+                self.phase = _EW_YELLOW if phase == _EW_GREEN else _NS_YELLOW
+                self.t_in_state = 0.0
+            else:
+                self._decide_at = self.t_in_state + self.interval
+        elif phase == _EW_YELLOW or phase == _NS_YELLOW:
+            if self.t_in_state >= self.yellow:
+                self.phase = _ALL_RED
+                self.t_in_state = 0.0
+        elif self.t_in_state >= self.all_red:
+            self._serve_next()
+
+    def update_demand(self, dt: float, lane_has_close: bool, other_queue: int) -> None:
+        # Fallback for callers with only the demand summary: TrafficSignal's
+        # reactive rule, with ALL_RED alternating as in update()
+        if self.phase != _ALL_RED:
+            super().update_demand(dt, lane_has_close, other_queue)
+            return
+        self.t_in_state += dt
+        if self.t_in_state >= self.all_red:
+            self._serve_next()
+
+    def _serve_next(self) -> None:
+        # End of ALL_RED: green to the approach that waited
+        self.phase = _GREEN_OF[self.next_green]
+        self.next_green = 1 - self.next_green
+        self.t_in_state = 0.0
+        self._decide_at = 0.0
+
+    # --- Prediction ------------------------------------------------------------
+
+    def candidates(self) -> List[float]:
+        """Switch times (s from now) compared at a decision; inf keeps green past the horizon."""
+        remaining = max(0.0, self.max_green - self.t_in_state)
+        keep = remaining if remaining < self.horizon else float("inf")
+        return sorted({0.0, keep, *(k for k in self.delays if k < remaining)})
+
+    def best_switch(self, approaching: Dict[str, List[Vehicle]]) -> float:
+        """Switch time of the candidate with the lowest predicted delay (ties keep green longer)."""
+        vehicles, lead = self._vehicles(approaching)
+        cands = self.candidates()
+        if not vehicles:
+            self._plan = None
+            return cands[-1]
+        plan = self._plan
+        if plan is not None and plan[0] == self.phase and len(plan[1]) == len(vehicles) \
+                and all(a is b for a, b in zip(plan[1], vehicles)):
+            tol = self.tolerance
+            if all(abs(v.s - s) <= tol and abs(v.v - u) <= tol for v, s, u in zip(vehicles, plan[2], plan[3])):
+                self.reused += 1
+                best = max(0.0, plan[4] - self.interval)
+                self._plan = None  # the prediction only reaches the next decision
+                return best if best < 1e-9 or best in cands else min(cands, key=lambda c: abs(c - best))
+        cost, s_next, v_next = self.rollout(vehicles, lead, _LANE_OF[self.phase], cands)
+        i = min(range(len(cands)), key=lambda k: (cost[k], -cands[k]))
+        self._plan = (self.phase, vehicles, s_next[i].tolist(), v_next[i].tolist(), cands[i])
+        return cands[i]
+
+    def _vehicles(self, approaching: Dict[str, List[Vehicle]]) -> Tuple[List[Vehicle], List[int]]:
+        # Vehicles to predict, each with the index of its leader (-1: none)
+        vehicles: List[Vehicle] = []
+        lead: List[int] = []
+        if self.road is None:
+            last: Dict[Tuple[int, int], int] = {}
+            for lane in LANES:
+                for v in approaching.get(lane, ()):  # closest to the stop line first
+                    key = (v.lane_code, v.direction)
+                    lead.append(last.get(key, -1))
+                    last[key] = len(vehicles)
+                    vehicles.append(v)
+            return vehicles, lead
+        reach = self.horizon * 15.0  # farthest upstream vehicle that can matter
+        for lane in LANES:
+            for direction in (1, -1):
+                prev = -1
+                for v in reversed(self.road.lane_order(lane, direction)):  # front to rear
+                    if v.distance_to_stop_line() > reach:
+                        break
+                    lead.append(prev)
+                    prev = len(vehicles)
+                    vehicles.append(v)
+        return vehicles, lead
+
+    def rollout(self, vehicles: List[Vehicle], lead: Sequence[int], green: int,
+                switch_times: Sequence[float]):
+        """Predicted delay (veh*s over the horizon) for each switch time, stepped together.
+
+        Also returns the predicted positions (s) and speeds at the next
+        decision, one row per switch time.
+        """
+        self.rollouts += 1
+        lane = np.array([v.lane_code for v in vehicles])
+        d = np.array([v.distance_to_stop_line() for v in vehicles])
+        v0 = np.array([v.v for v in vehicles])
+        profiles = [v.profile for v in vehicles]
+        v_des = np.array([p.v_des for p in profiles])
+        a_max = np.array([p.a_max for p in profiles])
+        d_max = np.array([p.d_max for p in profiles])
+        headway = np.array([p.t_headway for p in profiles])
+        length = np.array([p.length for p in profiles])
+        lead = np.array(lead, dtype=np.int64)
+        exit_d = -(self.road.exit_distance if self.road is not None else np.inf)
+        has_lead = lead >= 0
+        lead_idx = np.where(has_lead, lead, 0)
+        half_len = 0.5 * (length + length[lead_idx])
+        on_green = lane == green
+
+        ts = np.array(switch_times, dtype=float)[:, None]
+        y_end = ts + self.yellow
+        r_end = y_end + self.all_red
+        h = self.step
+        D = np.repeat(d[None, :], len(ts), axis=0)
+        V = np.repeat(v0[None, :], len(ts), axis=0)
+        cost = np.zeros(len(ts))
+        direction = np.array([v.direction for v in vehicles], dtype=float)
+        at_next = max(1, int(round(self.interval / h)))
+        s_next = v_next = None
+        for j in range(int(round(self.horizon / h))):
+            tau = j * h
+            # Lights per candidate and vehicle: green approach until ts, yellow, all-red, then the other approach
+            red = np.where(on_green, tau >= y_end, tau < r_end)
+            yellow = on_green & (tau >= ts) & (tau < y_end)
+            # As v2i_signal_accel: full braking past the stop line (distance <= 0) as well
+            a = np.clip(0.6 * (v_des - V), -d_max, a_max)
+            stop = np.where(D > 1e-6, np.maximum(-d_max, -V * V / (2.0 * np.maximum(D, 1e-6))), -d_max)
+            a += np.where(red, stop, 0.0)
+            a += np.where(yellow & (D < 30.0), np.minimum(0.0, stop), 0.0)
+            gap = D - D[:, lead_idx] - half_len
+            desired = np.maximum(2.0, V * headway + half_len)
+            rel_v = V - V[:, lead_idx]
+            ttc = np.where(rel_v > 1e-6, np.maximum(gap, 0.0) / np.maximum(rel_v, 1e-6), np.inf)
+            follow = np.where(gap < desired, -np.minimum(d_max, 0.8 * (desired - gap)),
+                              np.where(ttc < 2.0, -np.minimum(0.7 * d_max, 2.0 - ttc), 0.0))
+            a += np.where(has_lead, follow, 0.0)
+            a = np.clip(a, -d_max, a_max)
+            V = np.maximum(0.0, V + a * h)
+            D = D - V * h
+            cost += (np.maximum(0.0, v_des - V) * (D > exit_d)).sum(axis=1) * h
+            if j + 1 == at_next:
+                s_next, v_next = -direction * D, V.copy()
+        return cost, s_next, v_next
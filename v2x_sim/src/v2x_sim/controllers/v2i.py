@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from ..models.vehicle import Vehicle
-from ..models.traffic_signal import TrafficSignal
+from ..models.traffic_signal import TrafficSignal, RED, YELLOW
 from ..models.road import Road
 
 
@@ -10,12 +10,14 @@ def v2i_signal_accel(v: Vehicle, sig: TrafficSignal, road: Road) -> float:
     - If red for lane: brake comfortably to stop line.
     - If yellow for lane: begin braking depending on distance.
     - If green: no extra effect.
+    `sig` may also be a received comm.SPaT message (anything with light_for).
     """
-    if sig.is_red_for(v.lane):
+    light = sig.light_for(v.lane_code)
+    if light == RED:
         # Plan stop at stop line
         return v.comfortable_brake_to_stop()
 
-    if sig.is_yellow_for(v.lane):
+    if light == YELLOW:
         # More conservative braking when close to stop line
         d = v.distance_to_stop_line()
         if d < 30.0:
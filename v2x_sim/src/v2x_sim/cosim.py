@@ -0,0 +1,280 @@
+from __future__ import annotations
+import asyncio
+import json
+import socket
+import struct
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from .models.vehicle import CAR, TRUCK, Vehicle
+from .models.traffic_signal import Phase, TrafficSignal
+from .simulation import Simulation
+
+
+# Wire format: every message is a header (payload length, op, request id)
+# followed by the payload, all little-endian. Replies carry the op and id of
+# their request; pushed frames use FRAME with id 0, failures ERROR with a
+# UTF-8 message.
+HEADER = struct.Struct("<IBI")
+RESET, STEP, STATE, SET_PHASE, SPAWN, SUBSCRIBE, CLOSE = range(1, 8)
+FRAME, ERROR = 0x80, 0xFF
+
+STEP_REQ = struct.Struct("<IB")  # ticks, flags
+WITH_VEHICLES = 1
+PHASE_REQ = struct.Struct("<BB")  # phase, mode
+ADAPTIVE, HOLD = 0, 1
+SUBSCRIBE_REQ = struct.Struct("<dB")  # min sim seconds between frames (0 = off), flags
+SUMMARY = struct.Struct("<dBdIIIdI")  # t, phase, t_in_state, collisions, near misses, exited, delay, vehicles
+VEHICLE = struct.Struct("<qBbddd")  # id, lane code, direction, s, v, a
+SPAWN_REC = struct.Struct("<qBbddB")  # id, lane code, direction, s, v, class
+CLASSES = (CAR, TRUCK)
+
+YIELD_TICKS = 50  # ticks between yields to other sessions
+HIGH_WATER = 1 << 20  # frames are skipped while this much output is unsent
+
+
+class HeldSignal(TrafficSignal):
+    """Signal under external control: keeps its phase, only time advances."""
+
+    __slots__ = ()
+
+    def update(self, dt: float, approaching) -> None:
+        self.t_in_state += dt
+
+
+def _retype(signal: TrafficSignal, cls) -> TrafficSignal:
+    new = cls(signal.min_green, signal.max_green, signal.yellow, signal.all_red)
+    new.phase, new.t_in_state = signal.phase, signal.t_in_state
+    return new
+
+
+def encode_state(sim: Simulation, vehicles: bool = True) -> bytes:
+    m, sig = sim.metrics, sim.signal
+    head = SUMMARY.pack(sim.t, sig.phase, sig.t_in_state, m.collisions, m.near_misses, m.total_vehicles_exited,
+                        m.total_delay, len(sim.vehicles) if vehicles else 0)
+    if not vehicles:
+        return head
+    pack = VEHICLE.pack
+    return head + b"".join([pack(v.id, v.lane_code, v.direction, v.s, v.v, v.a) for v in sim.vehicles])
+
+
+@dataclass
+class State:
+    t: float
+    phase: int
+    t_in_state: float
+    collisions: int
+    near_misses: int
+    exited: int
+    total_delay: float
+    vehicles: List[Tuple[int, int, int, float, float, float]]  # (id, lane code, direction, s, v, a)
+
+
+def decode_state(data: bytes) -> State:
+    head = SUMMARY.unpack_from(data)
+    vehicles = list(VEHICLE.iter_unpack(data[SUMMARY.size:SUMMARY.size + head[-1] * VEHICLE.size]))
+    return State(*head[:-1], vehicles)
+
+
+class Session:
+    """One client connection: its own Simulation, signal mode and subscription."""
+
+    def __init__(self):
+        self.sim = Simulation()
+        self.frame_every = 0.0
+        self.frame_vehicles = True
+        self._next_frame = 0.0
+        self.frames_sent = 0
+        self.frames_skipped = 0
+
+    def reset(self, payload: bytes) -> bytes:
+        cfg = json.loads(payload.decode("utf-8")) if payload else {}
+        sim = Simulation(dt=cfg.get("dt", 0.1), signal_params=cfg.get("signal_params"))
+        if "exit_distance" in cfg:
+            sim.road.exit_distance = cfg["exit_distance"]
+        self.sim = sim
+        self._next_frame = self.frame_every
+        return encode_state(sim, False)
+
+    def set_phase(self, payload: bytes) -> bytes:
+        phase, mode = PHASE_REQ.unpack(payload)
+        sim = self.sim
+        cls = HeldSignal if mode == HOLD else TrafficSignal
+        if type(sim.signal) is not cls:
+            sim.signal = _retype(sim.signal, cls)
+        if phase != 0xFF:  # 0xFF: only change the mode
+            sim.signal.phase = Phase(phase)
+            sim.signal.t_in_state = 0.0
+        return encode_state(sim, False)
+
+    def spawn(self, payload: bytes) -> bytes:
+        sim = self.sim
+        for vid, lane, direction, s, v, cls in SPAWN_REC.iter_unpack(payload):
+            sim.schedule_vehicle(sim.t, Vehicle(id=vid, lane=lane, direction=direction, s=s, v=v,
+                                                profile=CLASSES[cls]))
+        return encode_state(sim, False)
+
+    def subscribe(self, payload: bytes) -> bytes:
+        self.frame_every, flags = SUBSCRIBE_REQ.unpack(payload)
+        self.frame_vehicles = bool(flags & WITH_VEHICLES)
+        self._next_frame = self.sim.t + self.frame_every
+        return b""
+
+
+async def _handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    session = Session()
+    transport = writer.transport
+
+    def send(op: int, rid: int, payload: bytes) -> None:
+        writer.write(HEADER.pack(len(payload), op, rid) + payload)
+
+    async def step(rid: int, payload: bytes) -> None:
+        n, flags = STEP_REQ.unpack(payload)
+        sim = session.sim
+        done = 0
+        while done < n:
+            k = min(n - done, YIELD_TICKS)
+            if session.frame_every > 0.0:
+                for _ in range(k):
+                    sim.step()
+                    if sim.t + 1e-9 >= session._next_frame:
+                        session._next_frame = sim.t + session.frame_every
+                        # Slow readers get fewer frames rather than an unbounded buffer
+                        if transport.get_write_buffer_size() > HIGH_WATER:
+                            session.frames_skipped += 1
+                        else:
+                            send(FRAME, 0, encode_state(sim, session.frame_vehicles))
+                            session.frames_sent += 1
+            else:
+                sim.run_steps(k)
+            done += k
+            if done < n:
+                await asyncio.sleep(0)  # let other sessions run
+        send(STEP, rid, encode_state(sim, bool(flags & WITH_VEHICLES)))
+
+    handlers = {
+        RESET: session.reset, SET_PHASE: session.set_phase, SPAWN: session.spawn, SUBSCRIBE: session.subscribe,
+        STATE: lambda payload: encode_state(session.sim, True),
+    }
+    try:
+        while True:
+            try:
+                size, op, rid = HEADER.unpack(await reader.readexactly(HEADER.size))
+                payload = await reader.readexactly(size) if size else b""
+            except asyncio.IncompleteReadError:
+                break
+            if op == CLOSE:
+                send(CLOSE, rid, b"")
+                break
+            try:
+                if op == STEP:
+                    await step(rid, payload)
+                elif op in handlers:
+                    send(op, rid, handlers[op](payload))
+                else:
+                    raise ValueError(f"unknown op {op}")
+            except Exception as exc:  # reported to the client; the session stays usable
+                send(ERROR, rid, f"{type(exc).__name__}: {exc}".encode("utf-8"))
+            # Replies go out as written; only wait for a client that stopped reading
+            if transport.get_write_buffer_size() > HIGH_WATER:
+                await writer.drain()
+    finally:
+        writer.close()
+
+
+async def serve(host: str = "127.0.0.1", port: int = 0, path: str = "") -> asyncio.AbstractServer:
+    """Start the co-simulation server on a TCP port or, with `path`, a Unix socket."""
+    if path:
+        return await asyncio.start_unix_server(_handle, path=path)
+    return await asyncio.start_server(_handle, host, port)
+
+
+class CoSimClient:
+    """Blocking client of the co-simulation server.
+
+    The send_* methods only queue a request and return its id, so a control
+    loop can pipeline many requests and collect the replies with reply(id).
+    Frames pushed by a subscription are collected in `frames` meanwhile.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, path: str = ""):
+        if path:
+            self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self._sock.connect(path)
+        else:
+            self._sock = socket.create_connection((host, port))
+            self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._file = self._sock.makefile("rb")
+        self._next_id = 1
+        self._replies: Dict[int, Tuple[int, bytes]] = {}
+        self.frames: List[State] = []
+
+    def close(self) -> None:
+        try:
+            self.reply(self._send(CLOSE, b""))
+        except (OSError, ConnectionError):
+            pass
+        self._file.close()
+        self._sock.close()
+
+    def __enter__(self) -> "CoSimClient":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _send(self, op: int, payload: bytes) -> int:
+        rid = self._next_id
+        self._next_id += 1
+        self._sock.sendall(HEADER.pack(len(payload), op, rid) + payload)
+        return rid
+
+    def _read(self) -> Tuple[int, int, bytes]:
+        head = self._file.read(HEADER.size)
+        if len(head) < HEADER.size:
+            raise ConnectionError("server closed the connection")
+        size, op, rid = HEADER.unpack(head)
+        return op, rid, self._file.read(size)
+
+    def reply(self, rid: int) -> bytes:
+        while rid not in self._replies:
+            op, got, payload = self._read()
+            if op == FRAME:
+                self.frames.append(decode_state(payload))
+            else:
+                self._replies[got] = (op, payload)
+        op, payload = self._replies.pop(rid)
+        if op == ERROR:
+            raise RuntimeError(payload.decode("utf-8"))
+        return payload
+
+    # --- Requests ------------------------------------------------------------
+
+    def send_step(self, ticks: int = 1, vehicles: bool = True) -> int:
+        return self._send(STEP, STEP_REQ.pack(ticks, WITH_VEHICLES if vehicles else 0))
+
+    def step(self, ticks: int = 1, vehicles: bool = True) -> State:
+        return decode_state(self.reply(self.send_step(ticks, vehicles)))
+
+    def reset(self, dt: float = 0.1, signal_params: Optional[dict] = None, **road) -> State:
+        cfg = dict(road, dt=dt, signal_params=signal_params)
+        return decode_state(self.reply(self._send(RESET, json.dumps(cfg).encode("utf-8"))))
+
+    def state(self) -> State:
+        return decode_state(self.reply(self._send(STATE, b"")))
+
+    def send_phase(self, phase: Optional[int], hold: bool = True) -> int:
+        return self._send(SET_PHASE, PHASE_REQ.pack(0xFF if phase is None else int(phase), HOLD if hold else ADAPTIVE))
+
+    def set_phase(self, phase: Optional[int], hold: bool = True) -> State:
+        """Switch the signal to `phase` (None = keep it); hold=False returns it to adaptive control."""
+        return decode_state(self.reply(self.send_phase(phase, hold)))
+
+    def spawn(self, vehicles) -> State:
+        # vehicles: iterable of (id, lane code, direction, s, v, class index into CLASSES)
+        payload = b"".join(SPAWN_REC.pack(*rec) for rec in vehicles)
+        return decode_state(self.reply(self._send(SPAWN, payload)))
+
+    def subscribe(self, every: float, vehicles: bool = True) -> None:
+        """Receive a state frame every `every` simulated seconds while stepping (0 stops)."""
+        self.reply(self._send(SUBSCRIBE, SUBSCRIBE_REQ.pack(every, WITH_VEHICLES if vehicles else 0)))
@@ -0,0 +1,245 @@
+from __future__ import annotations
+import heapq
+import random
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from .models.vehicle import Vehicle
+
+
+Arrival = Tuple[float, Vehicle]  # (spawn_time, vehicle)
+
+
+class SpawnQueue:
+    """Pending spawns merged from one-off vehicles and lazy demand sources.
+
+    Entries are ordered by (spawn_time, insertion order), so equal spawn times
+    keep the order in which they were scheduled. A demand source is an
+    iterable of (spawn_time, vehicle) in non-decreasing time; only its next
+    arrival is held in the heap and the following one is pulled when it spawns.
+    """
+
+    def __init__(self):
+        self._heap: List[tuple] = []  # (spawn_time, seq, vehicle, source or None)
+        self._seq = 0
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def push(self, spawn_time: float, vehicle: Vehicle) -> None:
+        heapq.heappush(self._heap, (spawn_time, self._next_seq(), vehicle, None))
+
+    def add_source(self, source: Iterable[Arrival]) -> None:
+        self._pull(iter(source))
+
+    def _pull(self, it: Iterator[Arrival]) -> None:
+        nxt = next(it, None)
+        if nxt is not None:
+            heapq.heappush(self._heap, (nxt[0], self._next_seq(), nxt[1], it))
+
+    def _next_seq(self) -> int:
+        self._seq += 1
+        return self._seq - 1
+
+    def peek_time(self) -> float:
+        return self._heap[0][0] if self._heap else float("inf")
+
+    def pop_due(self, t: float) -> List[Vehicle]:
+        due = []
+        while self._heap and self._heap[0][0] <= t:
+            _, _, v, it = heapq.heappop(self._heap)
+            due.append(v)
+            if it is not None:
+                self._pull(it)
+        return due
+
+
+class Ids:
+    """Vehicle id counter, shareable between sources (itertools.count(start, step))."""
+
+    def __init__(self, start: int = 1, step: int = 1):
+        self.next_id = start
+        self.step = step
+
+    def __iter__(self) -> "Ids":
+        return self
+
+    def __next__(self) -> int:
+        vid = self.next_id
+        self.next_id += self.step
+        return vid
+
+
+def stream_rng(seed: int, name: str) -> random.Random:
+    # Independent, reproducible stream per (seed, approach/source name)
+    return random.Random(f"{seed}:{name}")
+
+
+# Demand sources are iterator classes rather than generators so that their
+# position (RNG state, next id, current segment) is plain data and a
+# simulation holding them can be snapshotted (see snapshot.py).
+
+
+class RateProfileSource:
+    def __init__(self, lane, profile, end, seed, ids, s0, v0, v_jitter, min_headway, direction, stream, vehicle_kwargs):
+        self.lane = lane
+        self.profile = list(profile)
+        self.end = end
+        self.ids = Ids() if ids is None else ids
+        self.s0, self.v0, self.v_jitter = s0, v0, v_jitter
+        self.min_headway = min_headway
+        self.direction = direction
+        self.vehicle_kwargs = vehicle_kwargs
+        self.rng = stream_rng(seed, stream or lane)
+        self.bounds = [t for t, _ in self.profile[1:]] + [end]
+        self.segment = 0
+        self.t: Optional[float] = None  # time within the current segment
+        self.last = -float("inf")
+        self.points = 0  # Poisson points drawn so far (before the headway push)
+
+    def __iter__(self) -> "RateProfileSource":
+        return self
+
+    def __next__(self) -> Arrival:
+        while self.segment < len(self.profile):
+            seg_start, rate = self.profile[self.segment]
+            seg_end = min(self.bounds[self.segment], self.end)
+            if rate <= 0.0:
+                self._next_segment()
+                continue
+            if self.t is None:
+                self.t = seg_start
+            self.t += self.rng.expovariate(rate)
+            if self.t >= seg_end:
+                self._next_segment()
+                continue
+            self.points += 1
+            t_spawn = max(self.t, self.last + self.min_headway)
+            if t_spawn >= self.end:
+                self.segment = len(self.profile)
+                break
+            self.last = t_spawn
+            v0 = self.v0
+            v = max(0.0, v0 + self.rng.uniform(-self.v_jitter, self.v_jitter)) if self.v_jitter else v0
+            return t_spawn, Vehicle(id=next(self.ids), lane=self.lane, direction=self.direction, s=self.s0, v=v,
+                                    **self.vehicle_kwargs)
+        raise StopIteration
+
+    def _next_segment(self) -> None:
+        self.segment += 1
+        self.t = None
+
+    def exposure(self) -> float:
+        # Expected number of points over the part of the profile drawn so far
+        if self.segment >= len(self.profile):
+            until = self.end
+        else:
+            until = self.profile[self.segment][0] if self.t is None else self.t
+        total = 0.0
+        for (start, rate), stop in zip(self.profile, self.bounds):
+            total += rate * max(0.0, min(stop, self.end, until) - start)
+        return total
+
+
+class PlatoonSource:
+    def __init__(self, lane, platoon_size, headway, platoons, cycle, start, ids, s0, v0, direction, vehicle_kwargs):
+        self.lane = lane
+        self.platoon_size = platoon_size
+        self.headway = headway
+        self.platoons = platoons
+        self.cycle = cycle
+        self.start = start
+        self.ids = Ids() if ids is None else ids
+        self.s0, self.v0 = s0, v0
+        self.direction = direction
+        self.vehicle_kwargs = vehicle_kwargs
+        self.platoon = 0
+        self.member = 0
+
+    def __iter__(self) -> "PlatoonSource":
+        return self
+
+    def __next__(self) -> Arrival:
+        if self.member >= self.platoon_size:
+            self.platoon += 1
+            self.member = 0
+        if self.platoon_size <= 0 or (self.platoons is not None and self.platoon >= self.platoons):
+            raise StopIteration
+        t = self.start + self.platoon * self.cycle + self.member * self.headway
+        self.member += 1
+        return t, Vehicle(id=next(self.ids), lane=self.lane, direction=self.direction, s=self.s0, v=self.v0,
+                          **self.vehicle_kwargs)
+
+
+def poisson_arrivals(
+    lane: str,
+    rate: float,
+    end: float,
+    seed: int = 42,
+    start: float = 0.0,
+    ids: Optional[Iterator[int]] = None,
+    s0: float = -200.0,
+    v0: float = 12.0,
+    v_jitter: float = 0.0,
+    min_headway: float = 0.0,
+    direction: int = +1,
+    stream: Optional[str] = None,
+    **vehicle_kwargs,
+) -> Iterator[Arrival]:
+    """Homogeneous Poisson arrivals at `rate` veh/s on [start, end)."""
+    return rate_profile_arrivals(
+        lane, [(start, rate)], end, seed=seed, ids=ids, s0=s0, v0=v0,
+        v_jitter=v_jitter, min_headway=min_headway, direction=direction, stream=stream, **vehicle_kwargs,
+    )
+
+
+def rate_profile_arrivals(
+    lane: str,
+    profile: Sequence[Tuple[float, float]],
+    end: float,
+    seed: int = 42,
+    ids: Optional[Iterator[int]] = None,
+    s0: float = -200.0,
+    v0: float = 12.0,
+    v_jitter: float = 0.0,
+    min_headway: float = 0.0,
+    direction: int = +1,
+    stream: Optional[str] = None,
+    **vehicle_kwargs,
+) -> Iterator[Arrival]:
+    """Piecewise-constant Poisson arrivals, e.g. a time-of-day demand curve.
+
+    `profile` is a list of (t_start, rate veh/s) breakpoints sorted by time;
+    each rate holds until the next breakpoint (the last one until `end`).
+    Exponential gaps are redrawn at breakpoints, which is exact for a Poisson
+    process because it is memoryless. `min_headway` pushes an arrival back so
+    it is at least that many seconds behind the previous one (a vehicle
+    cannot enter on top of the last spawned one). The random stream is named
+    after the lane unless `stream` is given (e.g. several entries per lane).
+    """
+    return RateProfileSource(lane, profile, end, seed, ids, s0, v0, v_jitter, min_headway, direction, stream,
+                             vehicle_kwargs)
+
+
+def platoon_arrivals(
+    lane: str,
+    platoon_size: int,
+    headway: float,
+    platoons: Optional[int] = 1,
+    cycle: float = 60.0,
+    start: float = 0.0,
+    ids: Optional[Iterator[int]] = None,
+    s0: float = -200.0,
+    v0: float = 12.0,
+    direction: int = +1,
+    **vehicle_kwargs,
+) -> Iterator[Arrival]:
+    """Platoons of `platoon_size` vehicles `headway` s apart, one every `cycle` s.
+
+    `platoons=None` repeats indefinitely; the simulation only pulls arrivals
+    as they become due. Pass a shared `ids` counter to keep vehicle ids unique
+    across sources. A platoon must end before the next one starts
+    (cycle >= (platoon_size - 1) * headway), so spawn times never go back.
+    """
+    if (platoons is None or platoons > 1) and cycle < (platoon_size - 1) * headway:
+        raise ValueError(f"platoons of {platoon_size} vehicles {headway:g} s apart overlap with cycle {cycle:g} s")
+    return PlatoonSource(lane, platoon_size, headway, platoons, cycle, start, ids, s0, v0, direction, vehicle_kwargs)
@@ -0,0 +1,326 @@
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Union
+
+import numpy as np
+
+from .models.vehicle import Vehicle
+from .models.road import Road
+from .models import traffic_signal
+from .models.traffic_signal import STATES, STATE_CODE
+from .simulation import Metrics
+from .demand import Arrival
+from .vectorized import (
+    LANES,
+    LANE_CODE,
+    collision_flags,
+    lead_indices,
+    near_miss_flags,
+    rear_end_accel,
+    signal_accel,
+)
+
+
+# (state x lane) lookup tables of TrafficSignal.is_red_for / is_yellow_for
+RED_TABLE = np.array(traffic_signal.RED_TABLE)
+YELLOW_TABLE = np.array(traffic_signal.YELLOW_TABLE)
+
+
+class SignalBank:
+    """K independent TrafficSignal state machines stepped together.
+
+    Each replica has its own min_green/max_green/yellow/all_red; transitions
+    follow TrafficSignal.update_demand exactly, including ALL_RED always
+    handing over to NS_GREEN (TrafficSignal.previous_major() reports EW there).
+    """
+
+    def __init__(self, params: Sequence[dict]):
+        self.min_green = np.array([p.get("min_green", 8.0) for p in params])
+        self.max_green = np.array([p.get("max_green", 25.0) for p in params])
+        self.yellow = np.array([p.get("yellow", 3.0) for p in params])
+        self.all_red = np.array([p.get("all_red", 1.0) for p in params])
+        self.state = np.array([STATE_CODE[p.get("state", "EW_GREEN")] for p in params], dtype=np.int8)
+        self.t_in_state = np.array([p.get("t_in_state", 0.0) for p in params])
+
+    def green_lane(self) -> np.ndarray:
+        # Lane code of the current (or last) green; only meaningful in green states
+        return np.where(self.state <= STATE_CODE["ALL_RED"], LANE_CODE["EW"], LANE_CODE["NS"])
+
+    def update_demand(self, dt: float, lane_has_close: np.ndarray, other_queue: np.ndarray) -> None:
+        self.t_in_state = self.t_in_state + dt
+        t = self.t_in_state
+        st = self.state
+        green = (st == STATE_CODE["EW_GREEN"]) | (st == STATE_CODE["NS_GREEN"])
+        yellow = (st == STATE_CODE["EW_YELLOW"]) | (st == STATE_CODE["NS_YELLOW"])
+        all_red = st == STATE_CODE["ALL_RED"]
+
+        extend = lane_has_close & (t < self.max_green)
+        end_green = green & (t >= self.min_green) & ~extend & ((other_queue > 0) | (t >= self.max_green))
+        end_yellow = yellow & (t >= self.yellow)
+        end_red = all_red & (t >= self.all_red)
+
+        new = st.copy()
+        new[end_green] = st[end_green] + 1  # X_GREEN -> X_YELLOW
+        new[end_yellow] = STATE_CODE["ALL_RED"]
+        new[end_red] = STATE_CODE["NS_GREEN"]
+        self.state = new
+        self.t_in_state = np.where(end_green | end_yellow | end_red, 0.0, t)
+
+    def state_names(self) -> List[str]:
+        return [STATES[c] for c in self.state]
+
+
+@dataclass
+class _ReplicaScheduler:
+    # Adapter so scenario builders written against Simulation can fill one replica
+    ensemble: "EnsembleSimulation"
+    replica: int
+
+    def schedule_vehicle(self, spawn_time: float, vehicle: Vehicle) -> None:
+        self.ensemble.schedule_vehicle(self.replica, spawn_time, vehicle)
+
+    def add_demand(self, source: Iterable[Arrival]) -> None:
+        self.ensemble.add_demand(self.replica, source)
+
+
+_PARAMS = ("length", "v_des", "a_max", "d_max", "t_headway")
+
+
+class EnsembleSimulation:
+    """Steps K independent scenarios at once on (K x N) padded arrays.
+
+    Replica k behaves like a VectorizedSimulation with signal_params[k]; slots
+    are laid out per replica in spawn order and masked by a status array
+    (0 = scheduled, 1 = active, 2 = exited). Adding replicas widens the arrays
+    instead of adding interpreter loops.
+    """
+
+    def __init__(
+        self,
+        replicas: int,
+        dt: float = 0.1,
+        signal_params: Optional[Union[dict, Sequence[dict]]] = None,
+        record: bool = False,
+    ):
+        if signal_params is None:
+            signal_params = {"min_green": 8.0, "max_green": 25.0, "yellow": 3.0, "all_red": 1.0}
+        if isinstance(signal_params, dict):
+            signal_params = [signal_params] * replicas
+        if len(signal_params) != replicas:
+            raise ValueError("signal_params must be a dict or one dict per replica")
+        self.k = replicas
+        self.t: float = 0.0
+        self.dt: float = dt
+        self.road = Road()
+        self.signals = SignalBank(signal_params)
+        self.record = record
+
+        self._pending: List[List[tuple]] = [[] for _ in range(replicas)]
+        self._n_sched = [0] * replicas
+        n = 0
+        self.spawn_time = np.zeros((replicas, n))
+        self.status = np.zeros((replicas, n), dtype=np.int8)
+        self.lane = np.zeros((replicas, n), dtype=np.int8)
+        self.direction = np.zeros((replicas, n))
+        self.s = np.zeros((replicas, n))
+        self.v = np.zeros((replicas, n))
+        self.a = np.zeros((replicas, n))
+        for name in _PARAMS:
+            setattr(self, name, np.zeros((replicas, n)))
+
+        self.collisions = np.zeros(replicas, dtype=np.int64)
+        self.near_misses = np.zeros(replicas, dtype=np.int64)
+        self.exited = np.zeros(replicas, dtype=np.int64)
+        self.total_delay = np.zeros(replicas)
+
+        self._t_log: List[float] = []
+        self._state_log: List[np.ndarray] = []
+        self._approach_log: List[np.ndarray] = []
+        self._exited_log: List[np.ndarray] = []
+
+    def replica(self, k: int) -> _ReplicaScheduler:
+        return _ReplicaScheduler(self, k)
+
+    def schedule_vehicle(self, replica: int, spawn_time: float, vehicle: Vehicle) -> None:
+        self._pending[replica].append((spawn_time, self._n_sched[replica], vehicle))
+        self._n_sched[replica] += 1
+
+    def add_demand(self, replica: int, source: Iterable[Arrival]) -> None:
+        # Slots are preallocated per replica, so a demand source is drained up
+        # front here; use finite sources.
+        for spawn_time, vehicle in source:
+            self.schedule_vehicle(replica, spawn_time, vehicle)
+
+    def _materialize(self) -> None:
+        # Append newly scheduled vehicles as new slot columns, in spawn order
+        width = max(len(p) for p in self._pending)
+        if width == 0:
+            return
+        k = self.k
+        cols = {
+            "spawn_time": np.full((k, width), np.inf),
+            "status": np.full((k, width), 2, dtype=np.int8),  # padding slots never spawn
+            "lane": np.zeros((k, width), dtype=np.int8),
+            "direction": np.zeros((k, width)),
+            "s": np.zeros((k, width)),
+            "v": np.zeros((k, width)),
+            "a": np.zeros((k, width)),
+        }
+        for name in _PARAMS:
+            cols[name] = np.zeros((k, width))
+        for r, pending in enumerate(self._pending):
+            pending.sort(key=lambda x: (x[0], x[1]))
+            for j, (t_spawn, _, veh) in enumerate(pending):
+                cols["spawn_time"][r, j] = t_spawn
+                cols["status"][r, j] = 0
+                cols["lane"][r, j] = veh.lane_code
+                cols["direction"][r, j] = veh.direction
+                cols["s"][r, j] = veh.s
+                cols["v"][r, j] = veh.v
+                cols["a"][r, j] = veh.a
+                for name in _PARAMS:
+                    cols[name][r, j] = getattr(veh, name)
+            pending.clear()
+        for name, arr in cols.items():
+            setattr(self, name, np.concatenate([getattr(self, name), arr], axis=1))
+
+    def set_vehicle_params(self, params: Sequence[dict]) -> None:
+        """Give every vehicle scheduled so far in replica k the values of params[k].
+
+        Keys are Vehicle parameters (v_des, a_max, d_max, t_headway, length);
+        missing ones keep each vehicle's own value. With one shared spawn
+        schedule this turns replicas into candidate vehicle models.
+        """
+        if len(params) != self.k:
+            raise ValueError("params must have one dict per replica")
+        if any(self._pending):
+            self._materialize()
+        for k, p in enumerate(params):
+            for name, value in p.items():
+                if name not in _PARAMS:
+                    raise ValueError(f"unknown vehicle parameter {name!r}")
+                getattr(self, name)[k, :] = value
+
+    def keep(self, replicas: Sequence[int]) -> None:
+        """Drop all other replicas (e.g. candidates stopped early); the kept ones continue unchanged."""
+        if self.record:
+            raise RuntimeError("replicas cannot be dropped from a recording ensemble")
+        if any(self._pending):
+            self._materialize()
+        rows = np.asarray(replicas, dtype=np.int64)
+        for name in ("spawn_time", "status", "lane", "direction", "s", "v", "a", *_PARAMS,
+                     "collisions", "near_misses", "exited", "total_delay"):
+            setattr(self, name, getattr(self, name)[rows])
+        bank = self.signals
+        for name in ("min_green", "max_green", "yellow", "all_red", "state", "t_in_state"):
+            setattr(bank, name, getattr(bank, name)[rows])
+        self._pending = [self._pending[r] for r in rows]
+        self._n_sched = [self._n_sched[r] for r in rows]
+        self.k = len(rows)
+
+    def step(self) -> None:
+        dt = self.dt
+        if any(self._pending):
+            self._materialize()
+        self.status[(self.status == 0) & (self.spawn_time <= self.t)] = 1
+
+        n = self.s.shape[1]
+        idx = np.flatnonzero(self.status.ravel() == 1)
+        rep = idx // n if n else idx
+        lane = self.lane.ravel()[idx]
+        direction = self.direction.ravel()[idx]
+        s = self.s.ravel()[idx]
+        v = self.v.ravel()[idx]
+        p = {name: getattr(self, name).ravel()[idx] for name in _PARAMS}
+
+        # Signals: per-replica demand summary for the current green lane
+        d = -direction * s
+        approaching = (d >= 0.0) & (d <= 120.0)
+        on_green = lane == self.signals.green_lane()[rep]
+        close = np.bincount(rep, weights=approaching & on_green & (d < 40.0), minlength=self.k) > 0
+        queue = np.bincount(rep, weights=approaching & ~on_green & (d > 10.0), minlength=self.k)
+        self.signals.update_demand(dt, close, queue)
+
+        # Controls and integration on the active slots of all replicas
+        seq = idx % n if n else idx
+        state = self.signals.state[rep]
+        a_cmd = np.clip(0.6 * (p["v_des"] - v), -p["d_max"], p["a_max"])
+        a_cmd = a_cmd + signal_accel(s, v, direction, p["d_max"], RED_TABLE[state, lane], YELLOW_TABLE[state, lane])
+        lead = lead_indices(lane, direction, s, seq, block=rep)
+        a_cmd = a_cmd + rear_end_accel(s, v, direction, p["length"], p["t_headway"], p["d_max"], lead)
+        a = np.maximum(-p["d_max"], np.minimum(p["a_max"], a_cmd))
+        v = np.maximum(0.0, v + a * dt)
+        s = s + direction * v * dt
+        self.total_delay += np.bincount(rep, weights=np.maximum(0.0, p["v_des"] - v) * dt, minlength=self.k)
+        flags = near_miss_flags(s, v, direction, lane, self.road.conflict_half_width, block=rep)
+        self.near_misses += np.bincount(rep, weights=flags, minlength=self.k).astype(np.int64)
+
+        self.s.ravel()[idx] = s
+        self.v.ravel()[idx] = v
+        self.a.ravel()[idx] = a
+
+        out = np.abs(s) > self.road.exit_distance
+        if out.any():
+            self.status.ravel()[idx[out]] = 2
+            self.exited += np.bincount(rep[out], minlength=self.k)
+            keep = ~out
+            idx, rep, lane, direction, s, seq = idx[keep], rep[keep], lane[keep], direction[keep], s[keep], seq[keep]
+            length = p["length"][keep]
+        else:
+            length = p["length"]
+
+        # Collision detection (rear-end in lane)
+        lead = lead_indices(lane, direction, s, seq, block=rep)
+        hits = collision_flags(s, direction, length, lead)
+        self.collisions += np.bincount(rep, weights=hits, minlength=self.k).astype(np.int64)
+
+        self.t += dt
+        if self.record:
+            d = -direction * s
+            app = (d >= 0.0) & (d <= 120.0)
+            counts = np.zeros((self.k, len(LANES)), dtype=np.int64)
+            np.add.at(counts, (rep[app], lane[app]), 1)
+            self._t_log.append(round(self.t, 2))
+            self._state_log.append(self.signals.state.copy())
+            self._approach_log.append(counts)
+            self._exited_log.append(self.exited.copy())
+
+    def run(self, duration: float) -> List[Metrics]:
+        steps = int(duration / self.dt)
+        for _ in range(steps):
+            self.step()
+        return self.metrics
+
+    @property
+    def metrics(self) -> List[Metrics]:
+        return [
+            Metrics(
+                collisions=int(self.collisions[r]),
+                near_misses=int(self.near_misses[r]),
+                total_vehicles_exited=int(self.exited[r]),
+                total_delay=float(self.total_delay[r]),
+            )
+            for r in range(self.k)
+        ]
+
+    def timelines(self) -> List[tuple]:
+        """Per-replica (timeline, exited_over_time) rows in run_and_collect's format."""
+        if not self.record:
+            raise RuntimeError("EnsembleSimulation was created with record=False")
+        states = np.array(self._state_log).reshape(len(self._t_log), self.k)
+        approach = np.array(self._approach_log).reshape(len(self._t_log), self.k, len(LANES))
+        exited = np.array(self._exited_log).reshape(len(self._t_log), self.k)
+        res = []
+        for r in range(self.k):
+            timeline: List[Dict] = []
+            exited_over_time: List[Dict] = []
+            for i, t in enumerate(self._t_log):
+                timeline.append({
+                    "t": t,
+                    "signal_state": STATES[states[i, r]],
+                    "EW_approaching": int(approach[i, r, LANE_CODE["EW"]]),
+                    "NS_approaching": int(approach[i, r, LANE_CODE["NS"]]),
+                })
+                exited_over_time.append({"t": t, "vehicles_exited": int(exited[i, r])})
+            res.append((timeline, exited_over_time))
+        return res
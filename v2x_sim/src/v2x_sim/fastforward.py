@@ -0,0 +1,139 @@
+from __future__ import annotations
+import copy
+import math
+from typing import List, Optional, Tuple
+
+from .models.vehicle import Vehicle
+from .models.traffic_signal import TrafficSignal
+from .controllers.v2v import v2v_rear_end_accel
+from .controllers.v2i import v2i_signal_accel
+
+
+# Distances to the stop line (m) at which some discrete input changes:
+# approach radius of Simulation.step (120), green extension / queue
+# detection of TrafficSignal.update (40, 10), yellow braking of v2i (30)
+# and the stop line itself. Conflict zone and exit come from the Road.
+SIGNAL_THRESHOLDS = (120.0, 40.0, 30.0, 10.0, 0.0)
+
+
+class FastForward:
+    """Skips runs of ticks in which nothing discrete can change.
+
+    A tick is quiet when every vehicle is either cruising (no signal or
+    rear-end term, speed unchanged by its control, leader no slower) or
+    stopped with a stopped leader, and no moving vehicle is in the conflict
+    zone. A quiet window ends before the next spawn, the next signal state
+    change, or the first tick a moving vehicle could cross a detection
+    threshold, the conflict zone or the exit. Inside it positions advance in
+    closed form and the per-tick collision count and delay are constant.
+
+    Collision, near-miss and exit counts and the signal timeline are the
+    same as in fixed-step mode; total_delay and positions agree up to float
+    rounding. After an unsuccessful check the next one is postponed a few
+    ticks (up to `max_backoff`) so busy periods pay little for it.
+    """
+
+    def __init__(self, sim, min_skip: int = 2, max_backoff: int = 16):
+        self.sim = sim
+        self.min_skip = min_skip
+        self.max_backoff = max_backoff
+        self.ticks_skipped = 0
+        self.windows = 0
+        self._backoff = 1
+        self._wait = 0
+
+    def advance(self, max_ticks: int) -> int:
+        """Skip up to max_ticks quiet ticks; returns how many (0 = call step())."""
+        if self._wait > 0:
+            self._wait -= 1
+            return 0
+        plan = self._plan(max_ticks)
+        if plan is None:
+            self._wait = self._backoff
+            self._backoff = min(2 * self._backoff, self.max_backoff)
+            return 0
+        self._backoff = 1
+        self._apply(*plan)
+        return plan[0]
+
+    def _plan(self, max_ticks: int):
+        sim = self.sim
+        if sim.recorder is not None or sim.comm is not None or sim.kpi is not None or max_ticks < self.min_skip:
+            return None
+        if sim.lod is not None:
+            return None  # windows are planned from per-tick updates of every vehicle
+        if type(sim.signal) is not TrafficSignal:
+            return None  # the ghost below replays TrafficSignal's own rule
+        road, sig, dt = sim.road, sim.signal, sim.dt
+        w = road.conflict_half_width
+        thresholds = sorted(SIGNAL_THRESHOLDS + (w, -w, -road.exit_distance), reverse=True)
+        limit = max_ticks
+        accels: List[Tuple[Vehicle, float]] = []
+        collisions = 0
+        delay = 0.0
+        for v in sim.vehicles:
+            lead = road.get_indexed_lead(v)
+            v2v = v2v_rear_end_accel(v, lead)
+            v2i = v2i_signal_accel(v, sig, road)
+            # Same sum and saturation as Simulation.step / Vehicle.apply_control
+            a_cmd = v.base_speed_control()
+            a_cmd += v2i
+            a_cmd += v2v
+            a = max(-v.d_max, min(v.a_max, a_cmd))
+            if max(0.0, v.v + a * dt) != v.v:
+                return None
+            if v.v > 0.0 and v.direction != 0:
+                if v2i != 0.0 or v2v != 0.0 or (lead is not None and lead.v < v.v):
+                    return None
+                if road.in_conflict_zone(v):
+                    return None
+                d = v.distance_to_stop_line()
+                below = next((t for t in thresholds if t <= d), None)
+                if below is not None:
+                    limit = min(limit, math.floor((d - below) / (v.v * dt)) - 1)
+                    if limit < self.min_skip:
+                        return None
+            elif lead is not None and lead.v != 0.0:
+                return None
+            if lead and v.direction * (lead.s - v.s) < (v.length * 0.5 + lead.length * 0.5 + 0.5):
+                collisions += 1
+            delay += max(0.0, v.v_des - v.v) * dt
+            accels.append((v, a))
+
+        # Signal inputs are constant while no threshold is crossed
+        lane_has_close, other_queue = False, 0
+        if sig.state in ("EW_GREEN", "NS_GREEN"):
+            lane = "EW" if sig.state == "EW_GREEN" else "NS"
+            approaching = road.get_indexed_approaching(radius=SIGNAL_THRESHOLDS[0])
+            lane_has_close = any(u.distance_to_stop_line() < 40.0 for u in approaching[lane])
+            other_queue = sum(1 for u in approaching["NS" if lane == "EW" else "EW"] if u.distance_to_stop_line() > 10.0)
+
+        ghost = copy.copy(sig)
+        t = sim.t
+        k = 0
+        t_in_state = sig.t_in_state
+        next_spawn = sim._spawn_queue.peek_time()
+        while k < limit and next_spawn > t:
+            ghost.update_demand(dt, lane_has_close, other_queue)
+            if ghost.state != sig.state:
+                break
+            t_in_state = ghost.t_in_state
+            t += dt
+            k += 1
+        if k < self.min_skip:
+            return None
+        return k, t, t_in_state, accels, collisions, delay
+
+    def _apply(self, k: int, t: float, t_in_state: float, accels, collisions: int, delay: float) -> None:
+        sim = self.sim
+        for v, a in accels:
+            v.a = a
+            if v.v > 0.0:
+                v.s += v.direction * v.v * sim.dt * k
+        sim.road.reindex()
+        sim.signal.t_in_state = t_in_state
+        sim.metrics.collisions += k * collisions
+        sim.metrics.total_delay += k * delay
+        sim.t = t
+        self.ticks_skipped += k
+        self.windows += 1
@@ -0,0 +1,279 @@
+from __future__ import annotations
+import copy
+import math
+from typing import Dict, List, Optional, Sequence
+
+from .models.vehicle import LANES
+from .models.traffic_signal import STATES, GREEN_TABLE
+
+# Lane code with green in each phase (None for yellow and all-red)
+_GREEN_LANE = tuple(next((code for code, g in enumerate(row) if g), None) for row in GREEN_TABLE)
+
+
+class LogHistogram:
+    """Fixed-memory histogram with relative-error quantiles, mergeable.
+
+    Values in [lo, hi) fall into logarithmic buckets whose representative
+    value is within `rel_error` of every value in them (as in DDSketch);
+    smaller values share one bucket, larger ones are clamped to hi. Counts,
+    sum, min and max are exact. Histograms with the same parameters merge
+    by adding bucket counts, so partial results of parallel runs combine
+    into the histogram of all samples.
+    """
+
+    __slots__ = ("lo", "hi", "rel_error", "_gamma", "_log_gamma", "counts", "under", "count", "total", "min", "max")
+
+    def __init__(self, lo: float = 0.1, hi: float = 1e5, rel_error: float = 0.01):
+        self.lo = lo
+        self.hi = hi
+        self.rel_error = rel_error
+        self._gamma = (1.0 + rel_error) / (1.0 - rel_error)
+        self._log_gamma = math.log(self._gamma)
+        self.counts = [0] * (int(math.log(hi / lo) / self._log_gamma) + 1)
+        self.under = 0  # values below lo (including zero)
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, x: float) -> None:
+        self.count += 1
+        self.total += x
+        if x < self.min:
+            self.min = x
+        if x > self.max:
+            self.max = x
+        if x < self.lo:
+            self.under += 1
+        else:
+            k = int(math.log(x / self.lo) / self._log_gamma)
+            self.counts[min(k, len(self.counts) - 1)] += 1
+
+    def merge(self, other: "LogHistogram") -> "LogHistogram":
+        if (other.lo, other.hi, other.rel_error) != (self.lo, self.hi, self.rel_error):
+            raise ValueError("histograms with different bucket layouts cannot be merged")
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.under += other.under
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else math.nan
+
+    def quantile(self, q: float) -> float:
+        if not self.count:
+            return math.nan
+        rank = q * (self.count - 1)
+        seen = self.under
+        if rank < seen:
+            return self.min
+        for k, c in enumerate(self.counts):
+            seen += c
+            if rank < seen:
+                mid = self.lo * self._gamma ** k * (1.0 + self._gamma) / 2.0
+                return min(max(mid, self.min), self.max)
+        return self.max
+
+    def summary(self, quantiles: Sequence[float] = (0.5, 0.95, 0.99)) -> Dict[str, float]:
+        out = {"count": self.count, "mean": self.mean, "min": self.min if self.count else math.nan,
+               "max": self.max if self.count else math.nan}
+        for q in quantiles:
+            out[f"p{round(q * 100):d}"] = self.quantile(q)
+        return out
+
+
+class Rolling:
+    """Per-interval aggregates of the last `keep` intervals (a ring buffer).
+
+    Each slot holds named counters for one interval of `interval` seconds;
+    add() and peak() update the slot of time t, reusing the oldest slot when
+    a new interval starts. Rolling windows with the same layout merge slot by
+    slot (same interval number), summing counters and keeping the peaks.
+    """
+
+    def __init__(self, fields: Sequence[str], peaks: Sequence[str] = (), interval: float = 60.0, keep: int = 60):
+        self.fields = tuple(fields)
+        self.peaks = tuple(peaks)
+        self.interval = interval
+        self.keep = keep
+        self._index = [-1] * keep  # interval number held by each slot
+        self._sums = [[0.0] * len(self.fields) for _ in range(keep)]
+        self._max = [[0.0] * len(self.peaks) for _ in range(keep)]
+
+    def _slot(self, t: float) -> int:
+        n = int(t // self.interval)
+        i = n % self.keep
+        if self._index[i] != n:
+            self._index[i] = n
+            self._sums[i] = [0.0] * len(self.fields)
+            self._max[i] = [0.0] * len(self.peaks)
+        return i
+
+    def add(self, t: float, values: Sequence[float]) -> None:
+        sums = self._sums[self._slot(t)]
+        for j, x in enumerate(values):
+            sums[j] += x
+
+    def peak(self, t: float, values: Sequence[float]) -> None:
+        peaks = self._max[self._slot(t)]
+        for j, x in enumerate(values):
+            if x > peaks[j]:
+                peaks[j] = x
+
+    def merge(self, other: "Rolling") -> "Rolling":
+        if (other.fields, other.peaks, other.interval, other.keep) != (self.fields, self.peaks, self.interval, self.keep):
+            raise ValueError("rolling windows with different layouts cannot be merged")
+        for i, n in enumerate(other._index):
+            if n < 0:
+                continue
+            if self._index[i] > n:
+                continue  # we already hold a newer interval in this slot
+            if self._index[i] < n:
+                self._index[i] = n
+                self._sums[i] = list(other._sums[i])
+                self._max[i] = list(other._max[i])
+                continue
+            self._sums[i] = [a + b for a, b in zip(self._sums[i], other._sums[i])]
+            self._max[i] = [max(a, b) for a, b in zip(self._max[i], other._max[i])]
+        return self
+
+    def rows(self) -> List[dict]:
+        """Retained intervals, oldest first: start time, counters and peaks."""
+        out = []
+        for i in sorted(range(self.keep), key=lambda i: self._index[i]):
+            n = self._index[i]
+            if n < 0:
+                continue
+            row = {"t0": n * self.interval}
+            row.update(zip(self.fields, self._sums[i]))
+            row.update(zip(("max_" + p for p in self.peaks), self._max[i]))
+            out.append(row)
+        return out
+
+
+class TrafficKPIs:
+    """Operational traffic statistics computed while a Simulation runs.
+
+    Attach with `sim.kpi = TrafficKPIs()`; Simulation.step calls on_step()
+    after exits are removed. Per vehicle it keeps only its entry time and
+    stopped time while active; completed trips go into histograms of travel
+    time and stop delay (time below `stop_speed`). Per tick it adds the
+    exits per approach, the queue per approach (stopped vehicles within
+    `queue_radius` of the stop line) and the signal phase to rolling
+    intervals and running totals. A green tick counts as used when the
+    green approach has a vehicle within 40 m of the stop line, the test
+    the signal uses to extend green. Everything is fixed-size apart from
+    the active vehicles, and merge() combines separate runs (sweep.py
+    merges the repeats of each config).
+    """
+
+    def __init__(self, interval: float = 60.0, keep: int = 60, stop_speed: float = 0.5,
+                 queue_radius: float = 120.0, rel_error: float = 0.01):
+        self.stop_speed = stop_speed
+        self.queue_radius = queue_radius
+        self.travel_time = LogHistogram(0.1, 1e5, rel_error)
+        self.stop_delay = LogHistogram(0.1, 1e5, rel_error)
+        self.queue = {lane: LogHistogram(1.0, 1e5, rel_error) for lane in LANES}  # queue length per tick
+        fields = [f"exits_{lane}" for lane in LANES] + [f"queue_{lane}" for lane in LANES] + \
+                 [f"time_{state}" for state in STATES] + ["green_used", "ticks"]
+        self.intervals = Rolling(fields, [f"queue_{lane}" for lane in LANES], interval, keep)
+        self.exits = [0] * len(LANES)
+        self.phase_time = [0.0] * len(STATES)
+        self.green_time = 0.0
+        self.green_used = 0.0
+        self.time = 0.0
+        self._active: Dict[int, List[float]] = {}  # id -> [entry time, stopped time]
+
+    def on_step(self, sim, exited) -> None:
+        t, dt = sim.t + sim.dt, sim.dt  # end of the tick being completed
+        active = self._active
+        stop, radius = self.stop_speed, self.queue_radius
+        queue = [0] * len(LANES)
+        for v in sim.vehicles:
+            rec = active.get(v.id)
+            if rec is None:
+                rec = active[v.id] = [t - dt, 0.0]
+            if v.v < stop:
+                rec[1] += dt
+                if 0.0 <= -v.direction * v.s <= radius:
+                    queue[v.lane_code] += 1
+        exits = [0] * len(LANES)
+        for v in exited:
+            exits[v.lane_code] += 1
+            rec = active.pop(v.id, None)
+            if rec is not None:
+                self.travel_time.add(t - rec[0])
+                self.stop_delay.add(rec[1])
+        for lane, q in zip(LANES, queue):
+            self.queue[lane].add(q)
+        for i, n in enumerate(exits):
+            self.exits[i] += n
+
+        phase = sim.signal.phase
+        self.phase_time[phase] += dt
+        self.time += dt
+        used = 0.0
+        green = _GREEN_LANE[phase]
+        if green is not None:
+            self.green_time += dt
+            if sim.road.count_indexed_approaching(40.0)[LANES[green]]:
+                used = dt
+                self.green_used += dt
+        phases = [0.0] * len(STATES)
+        phases[phase] = dt
+        ticks = self.intervals
+        ticks.add(t - dt, exits + [q * dt for q in queue] + phases + [used, 1.0])
+        ticks.peak(t - dt, queue)
+
+    def merge(self, other: "TrafficKPIs") -> "TrafficKPIs":
+        self.travel_time.merge(other.travel_time)
+        self.stop_delay.merge(other.stop_delay)
+        for lane in LANES:
+            self.queue[lane].merge(other.queue[lane])
+        self.intervals.merge(other.intervals)
+        self.exits = [a + b for a, b in zip(self.exits, other.exits)]
+        self.phase_time = [a + b for a, b in zip(self.phase_time, other.phase_time)]
+        self.green_time += other.green_time
+        self.green_used += other.green_used
+        self.time += other.time
+        return self
+
+    def summary(self) -> dict:
+        hours = self.time / 3600.0
+        return {
+            "travel_time": self.travel_time.summary(),
+            "stop_delay": self.stop_delay.summary(),
+            "throughput_per_hour": {lane: n / hours if hours else math.nan for lane, n in zip(LANES, self.exits)},
+            "queue": {lane: self.queue[lane].summary() for lane in LANES},
+            "phase_share": {s: x / self.time if self.time else math.nan for s, x in zip(STATES, self.phase_time)},
+            "green_utilization": self.green_used / self.green_time if self.green_time else math.nan,
+        }
+
+    def interval_rows(self) -> List[dict]:
+        """Per-interval throughput, mean and peak queue and phase shares of the retained intervals."""
+        rows = []
+        for r in self.intervals.rows():
+            span = r["time_" + STATES[0]] + sum(r["time_" + s] for s in STATES[1:])
+            row = {"t0": r["t0"]}
+            for lane in LANES:
+                row[f"exits_{lane}"] = int(r[f"exits_{lane}"])
+                row[f"queue_mean_{lane}"] = r[f"queue_{lane}"] / span if span else 0.0
+                row[f"queue_max_{lane}"] = int(r[f"max_queue_{lane}"])
+            for s in STATES:
+                row[f"share_{s}"] = r["time_" + s] / span if span else 0.0
+            rows.append(row)
+        return rows
+
+
+def merged(kpis: Sequence[TrafficKPIs]) -> Optional[TrafficKPIs]:
+    # Combined statistics of several runs (e.g. seeds of a sweep), leaving the inputs unchanged
+    if not kpis:
+        return None
+    out = copy.deepcopy(kpis[0])
+    for k in kpis[1:]:
+        out.merge(k)
+    return out
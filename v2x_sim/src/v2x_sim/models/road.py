@@ -1,8 +1,23 @@
 from __future__ import annotations
-from dataclasses import dataclass
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass, field
+from heapq import merge
 from typing import List, Dict, Tuple, Optional
 
-from .vehicle import Vehicle
+from .vehicle import Vehicle, LANES, LANE_CODE
+
+
+LaneKey = Tuple[int, int]  # (lane code, direction)
+
+
+@dataclass
+class LaneIndex:
+    # Vehicles of one (lane, direction) ordered rear to front by direction * s.
+    # Ties on position are ordered by descending spawn sequence so that, read
+    # front to back, equal positions come out in spawn (list) order.
+    vehicles: List[Vehicle] = field(default_factory=list)
+    keys: List[float] = field(default_factory=list)  # direction * s, ascending
+    seqs: List[int] = field(default_factory=list)
 
 
 @dataclass
@@ -11,12 +26,20 @@ class Road:
     exit_distance: float = 250.0  # vehicles removed if |s| > exit_distance
     conflict_half_width: float = 6.0  # meters around s=0 considered conflict zone
 
+    # Incremental per-(lane, direction) index maintained by the simulation
+    _lanes: Dict[LaneKey, LaneIndex] = field(default_factory=dict, init=False, repr=False, compare=False)
+    _next_seq: int = field(default=0, init=False, repr=False, compare=False)
+    _dirty: bool = field(default=False, init=False, repr=False, compare=False)
+    # Largest max(v_des, speed) and a_max of the vehicles tracked so far (speed_bound)
+    _v_top: float = field(default=0.0, init=False, repr=False, compare=False)
+    _a_top: float = field(default=0.0, init=False, repr=False, compare=False)
+
     def get_approaching_by_lane(self, vehicles: List[Vehicle], radius: float) -> Dict[str, List[Vehicle]]:
         res = {"EW": [], "NS": []}
         for v in vehicles:
             d = v.distance_to_stop_line()
             if 0.0 <= d <= radius:
-                res[v.lane].append(v)
+                res[LANES[v.lane_code]].append(v)
         # Sort by distance ascending (closest first)
         for k in res:
             res[k].sort(key=lambda x: x.distance_to_stop_line())
@@ -28,7 +51,7 @@ class Road:
         for v in vehicles:
             if v is ego:
                 continue
-            if v.lane != ego.lane or v.direction != ego.direction:
+            if v.lane_code != ego.lane_code or v.direction != ego.direction:
                 continue
             # ahead if direction*(v.s - ego.s) > 0
             ahead = ego.direction * (v.s - ego.s) > 0
@@ -45,3 +68,147 @@ class Road:
 
     def in_conflict_zone(self, v: Vehicle) -> bool:
         return abs(v.s) <= self.conflict_half_width
+
+    # --- Indexed queries -------------------------------------------------
+    # The simulation tracks vehicles on spawn, untracks them on exit and calls
+    # reindex() after integrating positions. Between reindex() calls the
+    # queries below return the same results as the full scans above over the
+    # tracked vehicles (in spawn order), at O(1)/O(log N) cost per query.
+
+    def track(self, v: Vehicle) -> None:
+        key = (v.lane_code, v.direction)
+        if key not in self._lanes:
+            self._lanes[key] = LaneIndex()
+        self._lanes[key].vehicles.append(v)
+        # Spawn sequence and slot in the lane are kept on the vehicle; _road
+        # marks it as tracked here (a vehicle is tracked by one road at a time)
+        v._road = self
+        v._seq = self._next_seq
+        self._next_seq += 1
+        self._dirty = True
+        p = v.profile
+        self._v_top = max(self._v_top, p.v_des, v.v)
+        self._a_top = max(self._a_top, p.a_max)
+
+    def speed_bound(self, dt: float) -> float:
+        # Upper bound on any tracked vehicle's speed after a tick of dt: the
+        # controllers never accelerate a vehicle beyond max(v_des, its speed
+        # when tracked). Profiles changed after tracking are not covered.
+        return self._v_top + self._a_top * dt
+
+    def untrack(self, v: Vehicle) -> None:
+        if v._road is self:
+            v._road = None
+            self._dirty = True
+
+    def reindex(self) -> None:
+        for lane in self._lanes.values():
+            vs = [v for v in lane.vehicles if v._road is self] if self._dirty else lane.vehicles
+            # Positions change little per tick, so this is near-linear (timsort runs)
+            vs.sort(key=lambda v: (v.direction * v.s, -v._seq))
+            lane.vehicles = vs
+            lane.keys = [v.direction * v.s for v in vs]
+            lane.seqs = [v._seq for v in vs]
+            for i, v in enumerate(vs):
+                v._slot = i
+        self._dirty = False
+
+    def lane_order(self, lane: str, direction: int) -> List[Vehicle]:
+        # Tracked vehicles of one approach, rear to front
+        if self._dirty:
+            self.reindex()
+        idx = self._lanes.get((LANE_CODE[lane], direction))
+        return idx.vehicles if idx else []
+
+    def get_indexed_lead(self, ego: Vehicle) -> Optional[Vehicle]:
+        if self._dirty:
+            self.reindex()
+        if ego.direction == 0:
+            return None
+        lane = self._lanes[(ego.lane_code, ego.direction)]
+        keys = lane.keys
+        n = len(keys)
+        j = ego._slot
+        k = keys[j]
+        # Common case: next slot is strictly ahead and not part of a tie group
+        j += 1
+        if j >= n or keys[j] <= k:
+            j = bisect_right(keys, k)
+            if j >= n:
+                return None
+        if j + 1 < n and keys[j + 1] == keys[j]:
+            # Equal gaps: the scan keeps the earliest spawned, stored last in the group
+            j = bisect_right(keys, keys[j], j) - 1
+        return lane.vehicles[j]
+
+    def get_indexed_follower(self, ego: Vehicle) -> Optional[Vehicle]:
+        # Nearest tracked vehicle behind or level with ego in its lane
+        if self._dirty:
+            self.reindex()
+        if ego.direction == 0:
+            return None
+        lane = self._lanes[(ego.lane_code, ego.direction)]
+        j = ego._slot
+        if j + 1 < len(lane.keys) and lane.keys[j + 1] == lane.keys[j]:
+            return lane.vehicles[j + 1]
+        return lane.vehicles[j - 1] if j > 0 else None
+
+    def get_indexed_approaching(self, radius: float) -> Dict[str, List[Vehicle]]:
+        if self._dirty:
+            self.reindex()
+        res = {"EW": [], "NS": []}
+        for lane_name in res:
+            code = LANE_CODE[lane_name]
+            runs = []
+            for (lane_code, direction), lane in self._lanes.items():
+                if lane_code != code:
+                    continue
+                # 0 <= -direction*s <= radius  <=>  -radius <= key <= 0
+                lo = bisect_left(lane.keys, -radius)
+                hi = bisect_right(lane.keys, 0.0)
+                if lo < hi:
+                    # Closest first: walk the slice front to back
+                    runs.append([
+                        (-lane.keys[i], lane.seqs[i], lane.vehicles[i]) for i in range(hi - 1, lo - 1, -1)
+                    ])
+            if len(runs) == 1:
+                res[lane_name] = [v for _, _, v in runs[0]]
+            elif runs:
+                res[lane_name] = [v for _, _, v in merge(*runs, key=lambda r: (r[0], r[1]))]
+        return res
+
+    def count_indexed_approaching(self, radius: float) -> Dict[str, int]:
+        # len() of each get_indexed_approaching() list, without building them
+        if self._dirty:
+            self.reindex()
+        res = {"EW": 0, "NS": 0}
+        for (lane_code, _), lane in self._lanes.items():
+            res[LANES[lane_code]] += max(0, bisect_right(lane.keys, 0.0) - bisect_left(lane.keys, -radius))
+        return res
+
+    def get_indexed_window(self, lo: float, hi: float) -> Dict[str, List[Vehicle]]:
+        # Tracked vehicles with lo <= direction * s <= hi (distance to the stop line in [-hi, -lo]), per lane
+        if self._dirty:
+            self.reindex()
+        res = {"EW": [], "NS": []}
+        for (lane_code, direction), lane in self._lanes.items():
+            if direction == 0:
+                continue
+            i = bisect_left(lane.keys, lo)
+            j = bisect_right(lane.keys, hi)
+            res[LANES[lane_code]].extend(lane.vehicles[i:j])
+        return res
+
+    def get_indexed_conflict_zone(self) -> Dict[str, List[Vehicle]]:
+        # Tracked vehicles with |s| <= conflict_half_width, per lane
+        if self._dirty:
+            self.reindex()
+        res = {"EW": [], "NS": []}
+        w = self.conflict_half_width
+        for (lane_code, direction), lane in self._lanes.items():
+            if direction == 0:
+                continue
+            lo = bisect_left(lane.keys, -w)
+            hi = bisect_right(lane.keys, w)
+            res[LANES[lane_code]].extend(lane.vehicles[lo:hi])
+        return res
@@ -1,45 +1,126 @@
 from __future__ import annotations
-from dataclasses import dataclass
+from enum import IntEnum
 from typing import Dict, List
 
-from .vehicle import Vehicle
+from .vehicle import Vehicle, LANE_CODE
+
+
+STATES = ("EW_GREEN", "EW_YELLOW", "ALL_RED", "NS_GREEN", "NS_YELLOW")
+STATE_CODE = {name: i for i, name in enumerate(STATES)}
+
+
+class Phase(IntEnum):
+    EW_GREEN = 0
+    EW_YELLOW = 1
+    ALL_RED = 2
+    NS_GREEN = 3
+    NS_YELLOW = 4
+
+
+# Light shown to a lane: LIGHT_TABLE[phase][lane_code]
+GREEN, YELLOW, RED = 0, 1, 2
+LIGHT_TABLE = (
+    (GREEN, RED),    # EW_GREEN
+    (YELLOW, RED),   # EW_YELLOW
+    (RED, RED),      # ALL_RED
+    (RED, GREEN),    # NS_GREEN
+    (RED, YELLOW),   # NS_YELLOW
+)
+RED_TABLE = tuple(tuple(light == RED for light in row) for row in LIGHT_TABLE)
+YELLOW_TABLE = tuple(tuple(light == YELLOW for light in row) for row in LIGHT_TABLE)
+GREEN_TABLE = tuple(tuple(light == GREEN for light in row) for row in LIGHT_TABLE)
+
+_EW_GREEN, _EW_YELLOW, _ALL_RED, _NS_GREEN, _NS_YELLOW = (int(p) for p in Phase)
+
+
+def _code(lane) -> int:
+    return lane if lane.__class__ is int else LANE_CODE[lane]
 
 
-@dataclass
 class TrafficSignal:
-    min_green: float = 8.0
-    max_green: float = 25.0
-    yellow: float = 3.0
-    all_red: float = 1.0
+    """Two-phase adaptive signal.
 
-    state: str = "EW_GREEN"  # EW_GREEN, EW_YELLOW, ALL_RED, NS_GREEN, NS_YELLOW
-    t_in_state: float = 0.0
+    The phase is an int (Phase / STATE_CODE); `state` gives and sets it by
+    name. The is_*_for queries take a lane name or LANE_CODE and are lookups
+    in the (phase x lane) tables above.
+    """
 
-    def is_green_for(self, lane: str) -> bool:
-        return (self.state == "EW_GREEN" and lane == "EW") or (self.state == "NS_GREEN" and lane == "NS")
+    __slots__ = ("min_green", "max_green", "yellow", "all_red", "phase", "t_in_state")
 
-    def is_yellow_for(self, lane: str) -> bool:
-        return (self.state == "EW_YELLOW" and lane == "EW") or (self.state == "NS_YELLOW" and lane == "NS")
+    def __init__(self, min_green: float = 8.0, max_green: float = 25.0, yellow: float = 3.0, all_red: float = 1.0,
+                 state="EW_GREEN", t_in_state: float = 0.0):
+        self.min_green = min_green
+        self.max_green = max_green
+        self.yellow = yellow
+        self.all_red = all_red
+        self.phase = STATE_CODE[state] if isinstance(state, str) else int(state)
+        self.t_in_state = t_in_state
 
-    def is_red_for(self, lane: str) -> bool:
-        if self.state == "ALL_RED":
-            return True
-        if lane == "EW":
-            return self.state in ("NS_GREEN", "NS_YELLOW")
-        else:
-            return self.state in ("EW_GREEN", "EW_YELLOW")
+    @property
+    def state(self) -> str:  # EW_GREEN, EW_YELLOW, ALL_RED, NS_GREEN, NS_YELLOW
+        return STATES[self.phase]
 
-    def update(self, dt: float, approaching: Dict[str, List[Vehicle]]) -> None:
-        self.t_in_state += dt
+    @state.setter
+    def state(self, name: str) -> None:
+        self.phase = STATE_CODE[name]
 
-        # State machine timing
-        if self.state in ("EW_GREEN", "NS_GREEN"):
-            # Demand responsive green extension
-            lane = "EW" if self.state == "EW_GREEN" else "NS"
+    def _fields(self) -> tuple:
+        return (self.min_green, self.max_green, self.yellow, self.all_red, self.phase, self.t_in_state)
+
+    def __eq__(self, other):
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return self._fields() == other._fields()
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return (f"TrafficSignal(min_green={self.min_green!r}, max_green={self.max_green!r}, yellow={self.yellow!r}, "
+                f"all_red={self.all_red!r}, state={self.state!r}, t_in_state={self.t_in_state!r})")
+
+    def __getstate__(self):
+        return self._fields()
+
+    def __setstate__(self, state) -> None:
+        if isinstance(state, dict):
+            # Pickled by the former dataclass TrafficSignal (older snapshots)
+            self.__init__(**state)
+            return
+        self.min_green, self.max_green, self.yellow, self.all_red, self.phase, self.t_in_state = state
+
+    def light_for(self, lane_code: int) -> int:
+        return LIGHT_TABLE[self.phase][lane_code]
+
+    def is_green_for(self, lane) -> bool:
+        return GREEN_TABLE[self.phase][_code(lane)]
+
+    def is_yellow_for(self, lane) -> bool:
+        return YELLOW_TABLE[self.phase][_code(lane)]
+
+    def is_red_for(self, lane) -> bool:
+        return RED_TABLE[self.phase][_code(lane)]
+
+    def update(self, dt: float, approaching: Dict[str, List[Vehicle]]) -> None:
+        lane_has_close = False
+        other_queue = 0
+        phase = self.phase
+        if phase == _EW_GREEN or phase == _NS_GREEN:
+            lane = "EW" if phase == _EW_GREEN else "NS"
             other = "NS" if lane == "EW" else "EW"
             lane_has_close = any(v.distance_to_stop_line() < 40.0 for v in approaching.get(lane, []))
             other_queue = len([v for v in approaching.get(other, []) if v.distance_to_stop_line() > 10.0])
+        self.update_demand(dt, lane_has_close, other_queue)
 
+    def update_demand(self, dt: float, lane_has_close: bool, other_queue: int) -> None:
+        # Same state machine as update(), driven by a precomputed demand summary:
+        # whether the green lane has a vehicle within 40 m of the stop line and
+        # how many vehicles on the other lane are queued beyond 10 m.
+        self.t_in_state += dt
+        phase = self.phase
+
+        # State machine timing
+        if phase == _EW_GREEN or phase == _NS_GREEN:
+            # Demand responsive green extension
             if self.t_in_state < self.min_green:
                 return
             # If platoon approaching or queue still exists, extend up to max
@@ -47,28 +128,28 @@ class TrafficSignal:
                 return
             # If other direction has clear demand and we've reached min, switch
             if other_queue > 0 or self.t_in_state >= self.max_green:
-                self.state = ("EW_YELLOW" if lane == "EW" else "NS_YELLOW")
+                self.phase = _EW_YELLOW if phase == _EW_GREEN else _NS_YELLOW
                 self.t_in_state = 0.0
                 return
 
-        elif self.state in ("EW_YELLOW", "NS_YELLOW"):
+        elif phase == _EW_YELLOW or phase == _NS_YELLOW:
             if self.t_in_state >= self.yellow:
-                self.state = "ALL_RED"
+                self.phase = _ALL_RED
                 self.t_in_state = 0.0
                 return
 
-        elif self.state == "ALL_RED":
+        elif phase == _ALL_RED:
             if self.t_in_state >= self.all_red:
                 # Switch to the opposite green
-                self.state = "NS_GREEN" if self.previous_major() == "EW" else "EW_GREEN"
+                self.phase = _NS_GREEN if self.previous_major() == "EW" else _EW_GREEN
                 self.t_in_state = 0.0
                 return
 
     def previous_major(self) -> str:
         # Determines which was the last green based on current state
-        if self.state in ("EW_GREEN", "EW_YELLOW"):
+        if self.phase in (_EW_GREEN, _EW_YELLOW):
             return "EW"
-        if self.state in ("NS_GREEN", "NS_YELLOW"):
+        if self.phase in (_NS_GREEN, _NS_YELLOW):
             return "NS"
         # If all red, assume last was EW for deterministic choice
         return "EW"
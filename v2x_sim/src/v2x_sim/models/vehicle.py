@@ -1,33 +1,175 @@
 from __future__ import annotations
-from dataclasses import dataclass
-from typing import Optional
+from operator import attrgetter
+from typing import Dict, Optional
+from weakref import WeakValueDictionary
 import math
 
 
-@dataclass
+LANES = ("EW", "NS")
+LANE_CODE = {name: i for i, name in enumerate(LANES)}
+# Parameters shared by every vehicle of a class, held by VehicleClass
+PROFILE_FIELDS = ("length", "v_des", "a_max", "d_max", "t_headway", "comm_range")
+
+# Live profiles by parameters, and per (profile, overrides) for Vehicle(..., v_des=...)
+_INTERNED: "WeakValueDictionary[tuple, VehicleClass]" = WeakValueDictionary()
+_DERIVED: "WeakValueDictionary[tuple, VehicleClass]" = WeakValueDictionary()
+
+
+class VehicleClass:
+    """Immutable, interned parameter set of a vehicle class.
+
+    Equal parameter sets are the same object, so each Vehicle only holds a
+    reference to its profile. Changing a parameter on one vehicle (e.g.
+    `v.v_des = 12.0`) moves that vehicle to another interned profile.
+    """
+
+    __slots__ = ("name",) + PROFILE_FIELDS + ("__weakref__",)
+
+    def __new__(cls, name: str = "car", length: float = 4.5, v_des: float = 14.0, a_max: float = 2.0,
+                d_max: float = 3.5, t_headway: float = 1.2, comm_range: float = 200.0) -> "VehicleClass":
+        key = (name, float(length), float(v_des), float(a_max), float(d_max), float(t_headway), float(comm_range))
+        obj = _INTERNED.get(key)
+        if obj is None:
+            obj = object.__new__(cls)
+            for attr, value in zip(cls.__slots__, key):  # __weakref__ is left out
+                object.__setattr__(obj, attr, value)
+            _INTERNED[key] = obj
+        return obj
+
+    def __setattr__(self, name, value):
+        raise AttributeError("VehicleClass is immutable; use replace()")
+
+    def __reduce__(self):
+        # Unpickling and copying go through __new__, so profiles stay interned
+        return (VehicleClass, tuple(getattr(self, f) for f in ("name",) + PROFILE_FIELDS))
+
+    def __repr__(self) -> str:
+        return "VehicleClass(" + ", ".join(f"{f}={getattr(self, f)!r}" for f in ("name",) + PROFILE_FIELDS) + ")"
+
+    def params(self) -> Dict[str, float]:
+        return {f: getattr(self, f) for f in PROFILE_FIELDS}
+
+    def replace(self, **changes) -> "VehicleClass":
+        return VehicleClass(self.name, **{**self.params(), **changes})
+
+    def _with(self, values: tuple) -> "VehicleClass":
+        # replace() for a tuple of PROFILE_FIELDS values, None = keep; cached
+        key = (self, values)
+        derived = _DERIVED.get(key)
+        if derived is None:
+            derived = self.replace(**{f: x for f, x in zip(PROFILE_FIELDS, values) if x is not None})
+            _DERIVED[key] = derived
+        return derived
+
+
+# Defaults are the former per-vehicle field defaults
+CAR = VehicleClass("car")
+TRUCK = VehicleClass("truck", length=12.0, v_des=12.0, a_max=1.0, d_max=3.0, t_headway=1.8)
+
+
+def _shared(name: str) -> property:
+    def set_value(self, value):
+        self.profile = self.profile.replace(**{name: value})
+    return property(attrgetter("profile." + name), set_value)
+
+
 class Vehicle:
-    id: int
-    lane: str  # 'EW' or 'NS'
-    direction: int  # +1 moves to +s (toward +inf), -1 opposite; we use +1 toward intersection
-    s: float  # longitudinal position along approach (m). Intersection at s=0.
-    v: float  # m/s
-    a: float = 0.0  # m/s^2
-    length: float = 4.5
-    v_des: float = 14.0  # desired speed (m/s ~ 50 km/h)
-    a_max: float = 2.0  # comfortable accel
-    d_max: float = 3.5  # comfortable braking (positive number)
-    t_headway: float = 1.2  # desired time headway (s)
-    comm_range: float = 200.0  # V2V/V2I range (m)
+    """A vehicle on one approach.
+
+    Per-vehicle state lives in slots (lane as an index into LANES); class
+    parameters (length, v_des, a_max, d_max, t_headway, comm_range) live in
+    the shared `profile` and read like plain attributes. The constructor
+    keeps the former dataclass signature: explicit parameters override the
+    profile's. `_road`, `_seq` and `_slot` belong to the Road index.
+    """
+
+    __slots__ = ("id", "lane_code", "direction", "s", "v", "a", "profile", "_road", "_seq", "_slot")
+
+    def __init__(
+        self,
+        id: int,
+        lane,  # 'EW' or 'NS' (or its LANE_CODE)
+        direction: int,  # +1 moves to +s (toward +inf), -1 opposite; we use +1 toward intersection
+        s: float,  # longitudinal position along approach (m). Intersection at s=0.
+        v: float,  # m/s
+        a: float = 0.0,  # m/s^2
+        length: Optional[float] = None,  # 4.5 m for CAR
+        v_des: Optional[float] = None,  # desired speed (m/s ~ 50 km/h)
+        a_max: Optional[float] = None,  # comfortable accel
+        d_max: Optional[float] = None,  # comfortable braking (positive number)
+        t_headway: Optional[float] = None,  # desired time headway (s)
+        comm_range: Optional[float] = None,  # V2V/V2I range (m)
+        profile: Optional[VehicleClass] = None,
+    ):
+        self.id = id
+        self.lane_code = lane if lane.__class__ is int else LANE_CODE[lane]
+        self.direction = direction
+        self.s = s
+        self.v = v
+        self.a = a
+        profile = CAR if profile is None else profile
+        if length is None and v_des is None and a_max is None and d_max is None and t_headway is None \
+                and comm_range is None:
+            self.profile = profile
+        else:
+            self.profile = profile._with((length, v_des, a_max, d_max, t_headway, comm_range))
+        self._road = None
+        self._seq = 0
+        self._slot = 0
+
+    length = _shared("length")
+    v_des = _shared("v_des")
+    a_max = _shared("a_max")
+    d_max = _shared("d_max")
+    t_headway = _shared("t_headway")
+    comm_range = _shared("comm_range")
+
+    @property
+    def lane(self) -> str:
+        return LANES[self.lane_code]
+
+    @lane.setter
+    def lane(self, name: str) -> None:
+        self.lane_code = LANE_CODE[name]
+
+    def _state(self) -> tuple:
+        return (self.id, self.lane_code, self.direction, self.s, self.v, self.a, self.profile)
+
+    def __eq__(self, other):
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return self._state() == other._state()
+
+    __hash__ = None  # mutable, as with the former dataclass
+
+    def __repr__(self) -> str:
+        return (f"Vehicle(id={self.id!r}, lane={self.lane!r}, direction={self.direction!r}, s={self.s!r}, "
+                f"v={self.v!r}, a={self.a!r}, profile={self.profile.name!r})")
+
+    def __getstate__(self):
+        return self._state()
+
+    def __setstate__(self, state) -> None:
+        if isinstance(state, dict):
+            # Pickled by the former dataclass Vehicle (older snapshots)
+            self.__init__(**state)
+            return
+        self.id, self.lane_code, self.direction, self.s, self.v, self.a, self.profile = state
+        self._road = None
+        self._seq = 0
+        self._slot = 0
 
     def base_speed_control(self) -> float:
         # Simple P-control to reach v_des
-        err = self.v_des - self.v
+        p = self.profile
+        err = p.v_des - self.v
         a_cmd = 0.6 * err
-        return max(-self.d_max, min(self.a_max, a_cmd))
+        return max(-p.d_max, min(p.a_max, a_cmd))
 
     def apply_control(self, a_cmd: float) -> None:
         # Saturate
-        self.a = max(-self.d_max, min(self.a_max, a_cmd))
+        p = self.profile
+        self.a = max(-p.d_max, min(p.a_max, a_cmd))
 
     def update(self, dt: float) -> None:
         # Kinematic update with clamp
@@ -43,17 +185,18 @@ class Vehicle:
 
     def comfortable_brake_to_stop(self) -> float:
         # Return braking to stop within remaining distance (if needed)
+        d_max = self.profile.d_max
         d = max(0.0, self.distance_to_stop_line())
         if d < 1e-6:
-            return -self.d_max
+            return -d_max
         # v^2 = 2 a d  => a = - v^2/(2d)
         a_needed = -(self.v ** 2) / (2.0 * d)
-        return max(-self.d_max, a_needed)
+        return max(-d_max, a_needed)
 
     def ttc_with_lead(self, lead: Optional[Vehicle]) -> float:
         if not lead:
             return math.inf
-        gap = self.direction * (lead.s - self.s) - 0.5 * (self.length + lead.length)
+        gap = self.direction * (lead.s - self.s) - 0.5 * (self.profile.length + lead.profile.length)
         rel_v = self.v - lead.v
         if gap <= 0:
             return 0.0
@@ -0,0 +1,413 @@
+from __future__ import annotations
+import itertools
+import multiprocessing as mp
+import struct
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .models.vehicle import PROFILE_FIELDS, Vehicle, VehicleClass
+from .simulation import Metrics, Simulation
+from .demand import Arrival, Ids, poisson_arrivals
+
+
+@dataclass
+class Intersection:
+    name: str
+    x: float  # position (m); links are axis-aligned
+    y: float
+    sim: Simulation  # local Road + TrafficSignal crossing at s=0
+
+
+@dataclass
+class Link:
+    src: int  # intersection indices
+    dst: int
+    lane: str  # axis of travel: "EW" (along x) or "NS" (along y)
+    direction: int  # +1 towards +x / +y
+    length: float  # centre to centre (m)
+
+
+Move = Tuple[int, Vehicle]  # (destination intersection, vehicle)
+
+
+class Network:
+    """Signalized intersections joined by links, with vehicles following routes.
+
+    Each intersection is a Simulation on local coordinates (its own Road,
+    TrafficSignal, v2v/v2i control and metrics). A vehicle that leaves one
+    intersection's road is handed to the next intersection of its route at
+    the end of the tick, keeping its speed and the distance it has covered
+    along the link. The handoff point is where it passes exit_distance of
+    the upstream node, so a link may be at most as long as the two exit
+    distances together.
+
+    Turning is not modelled inside an intersection: a vehicle crosses on its
+    inbound axis and joins the axis of the outbound link at the handoff.
+    Rear-end control does not look across a handoff point.
+    """
+
+    def __init__(self, dt: float = 0.1):
+        self.dt = dt
+        self.t = 0.0
+        self.nodes: List[Intersection] = []
+        self.index: Dict[str, int] = {}
+        self.links: Dict[Tuple[int, int], Link] = {}
+        self.routes: List[Tuple[int, ...]] = []
+        self.exited = 0  # vehicles that completed their route
+        self.handoffs = 0
+        self._trips: Dict[int, Tuple[int, int]] = {}  # vehicle id -> (route, hop)
+        self._active: Sequence[int] = ()  # intersections stepped by this process
+
+    def add_intersection(
+        self,
+        name: str,
+        x: float = 0.0,
+        y: float = 0.0,
+        signal_params: Optional[dict] = None,
+        exit_distance: float = 250.0,
+    ) -> Intersection:
+        if name in self.index:
+            raise ValueError(f"duplicate intersection {name!r}")
+        sim = Simulation(dt=self.dt, signal_params=signal_params)
+        sim.road.exit_distance = exit_distance
+        sim.outflow = []
+        node = Intersection(name, x, y, sim)
+        self.index[name] = len(self.nodes)
+        self.nodes.append(node)
+        self._active = range(len(self.nodes))
+        return node
+
+    def connect(self, src: str, dst: str, length: Optional[float] = None) -> Link:
+        u, v = self.index[src], self.index[dst]
+        a, b = self.nodes[u], self.nodes[v]
+        dx, dy = b.x - a.x, b.y - a.y
+        if (dx == 0.0) == (dy == 0.0):
+            raise ValueError(f"link {src}->{dst} must be axis-aligned")
+        lane, delta = ("EW", dx) if dy == 0.0 else ("NS", dy)
+        length = abs(delta) if length is None else length
+        e_src, e_dst = a.sim.road.exit_distance, b.sim.road.exit_distance
+        if not e_src < length <= e_src + e_dst:
+            raise ValueError(f"link {src}->{dst} length {length} must be in ({e_src}, {e_src + e_dst}]")
+        link = Link(u, v, lane, 1 if delta > 0 else -1, length)
+        self.links[(u, v)] = link
+        return link
+
+    def add_route(self, names: Sequence[str]) -> int:
+        route = tuple(self.index[n] for n in names)
+        for hop in zip(route, route[1:]):
+            if hop not in self.links:
+                raise ValueError(f"no link {self.nodes[hop[0]].name}->{self.nodes[hop[1]].name}")
+        self.routes.append(route)
+        return len(self.routes) - 1
+
+    def add_demand(self, route: int, source: Iterable[Arrival]) -> None:
+        # Vehicles enter the route's first intersection with their own lane,
+        # direction and s; ids must be unique across the network.
+        self.nodes[self.routes[route][0]].sim.add_demand(self._on_route(route, source))
+
+    def _on_route(self, route: int, source: Iterable[Arrival]) -> Iterable[Arrival]:
+        for t, v in source:
+            self._trips[v.id] = (route, 0)
+            yield t, v
+
+    # --- Stepping ----------------------------------------------------------
+
+    def _advance(self) -> List[Move]:
+        # Step the active intersections and route the vehicles that left them
+        moves: List[Move] = []
+        for i in self._active:
+            sim = self.nodes[i].sim
+            sim.step()
+            for v in sim.outflow:
+                route_id, hop = self._trips.pop(v.id)
+                route = self.routes[route_id]
+                if hop + 1 == len(route):
+                    self.exited += 1
+                    continue
+                link = self.links[(route[hop], route[hop + 1])]
+                # Distance covered past the upstream centre carries over to the link
+                v.s = link.direction * (v.direction * v.s - link.length)
+                v.lane, v.direction = link.lane, link.direction
+                self._trips[v.id] = (route_id, hop + 1)
+                moves.append((link.dst, v))
+            sim.outflow.clear()
+        self.t += self.dt
+        return moves
+
+    def _deliver(self, moves: List[Move]) -> None:
+        # Sorted so the result does not depend on how the network is partitioned
+        moves.sort(key=lambda m: (m[0], m[1].id))
+        for dst, v in moves:
+            sim = self.nodes[dst].sim
+            sim.schedule_vehicle(sim.t, v)
+        self.handoffs += len(moves)
+
+    def step(self) -> None:
+        self._deliver(self._advance())
+
+    def run(self, duration: float) -> Metrics:
+        steps = int(duration / self.dt)
+        for _ in range(steps):
+            self.step()
+        return self.metrics
+
+    def node_metrics(self) -> Dict[str, Metrics]:
+        return {self.nodes[i].name: self.nodes[i].sim.metrics for i in self._active}
+
+    @property
+    def metrics(self) -> Metrics:
+        return _total(self.node_metrics().values(), self.exited)
+
+
+def _total(per_node: Iterable[Metrics], exited: int) -> Metrics:
+    # Exits count vehicles that finished their route, not per-node exits
+    per_node = list(per_node)
+    return Metrics(
+        collisions=sum(m.collisions for m in per_node),
+        near_misses=sum(m.near_misses for m in per_node),
+        total_vehicles_exited=exited,
+        total_delay=sum(m.total_delay for m in per_node),
+    )
+
+
+# --- Builders ----------------------------------------------------------------
+
+def grid(
+    rows: int,
+    cols: int,
+    spacing: float = 300.0,
+    dt: float = 0.1,
+    signal_params: Optional[dict] = None,
+) -> Network:
+    """rows x cols intersections named "r{i}c{j}", two-way links `spacing` m apart."""
+    net = Network(dt=dt)
+    for i, j in itertools.product(range(rows), range(cols)):
+        net.add_intersection(f"r{i}c{j}", x=j * spacing, y=i * spacing,
+                             signal_params=signal_params, exit_distance=spacing / 2.0)
+    for i, j in itertools.product(range(rows), range(cols)):
+        if j + 1 < cols:
+            net.connect(f"r{i}c{j}", f"r{i}c{j + 1}")
+            net.connect(f"r{i}c{j + 1}", f"r{i}c{j}")
+        if i + 1 < rows:
+            net.connect(f"r{i}c{j}", f"r{i + 1}c{j}")
+            net.connect(f"r{i + 1}c{j}", f"r{i}c{j}")
+    return net
+
+
+def corridor(n: int, spacing: float = 300.0, dt: float = 0.1, signal_params: Optional[dict] = None) -> Network:
+    # Arterial of n intersections along x
+    return grid(1, n, spacing=spacing, dt=dt, signal_params=signal_params)
+
+
+def add_through_demand(
+    net: Network,
+    rows: int,
+    cols: int,
+    rate: float,
+    duration: float,
+    seed: int = 42,
+    v0: float = 12.0,
+    v_jitter: float = 2.0,
+    min_headway: float = 2.0,
+) -> None:
+    """Poisson through traffic entering every row and column of a grid from both ends."""
+    s0 = net.nodes[0].sim.road.exit_distance - 1.0
+    lines = [("EW", [f"r{i}c{j}" for j in range(cols)]) for i in range(rows)]
+    lines += [("NS", [f"r{i}c{j}" for i in range(rows)]) for j in range(cols)]
+    entries = [(lane, d, path) for lane, names in lines for d, path in ((+1, names), (-1, names[::-1]))]
+    for k, (lane, direction, path) in enumerate(entries):
+        route = net.add_route(path)
+        # Interleaved id ranges: ids must not depend on which sources a process pulls
+        ids = Ids(k + 1, len(entries))
+        net.add_demand(route, poisson_arrivals(
+            lane, rate, duration, seed=seed, ids=ids, s0=-direction * s0, v0=v0,
+            v_jitter=v_jitter, min_headway=min_headway, direction=direction,
+            stream=f"{lane}:{path[0]}:{direction:+d}",
+        ))
+
+
+def grid_scenario(rows: int, cols: int, rate: float = 0.1, duration: float = 600.0, spacing: float = 300.0,
+                  dt: float = 0.1, seed: int = 42, predictive: bool = False) -> Network:
+    # Picklable scenario factory for run_partitioned (use functools.partial)
+    net = grid(rows, cols, spacing=spacing, dt=dt)
+    add_through_demand(net, rows, cols, rate, duration, seed=seed)
+    if predictive:
+        from .controllers.signal_mpc import PredictiveSignal
+
+        for node in net.nodes:
+            node.sim.signal = PredictiveSignal.from_signal(node.sim.signal, road=node.sim.road)
+    return net
+
+
+# --- Domain decomposition ----------------------------------------------------
+
+def partition(net: Network, regions: int) -> List[List[int]]:
+    """Split intersections into `regions` groups by recursive coordinate bisection.
+
+    Each cut is made across the longer extent of the group, so regions are
+    compact blocks and few links cross a boundary.
+    """
+    def split(group: List[int], k: int) -> List[List[int]]:
+        if k <= 1 or len(group) <= 1:
+            return [group]
+        xs = [net.nodes[i].x for i in group]
+        ys = [net.nodes[i].y for i in group]
+        axis = 0 if max(xs) - min(xs) >= max(ys) - min(ys) else 1
+        group = sorted(group, key=lambda i: ((net.nodes[i].x, net.nodes[i].y)[axis], i))
+        k_left = k // 2
+        cut = round(len(group) * k_left / k)
+        return split(group[:cut], k_left) + split(group[cut:], k - k_left)
+
+    parts = [sorted(g) for g in split(list(range(len(net.nodes))), min(regions, len(net.nodes)))]
+    return [g for g in parts if g]
+
+
+# Handoff record: id, destination, route, hop, lane, direction, vehicle class name,
+# then the kinematic state and the class parameters
+_FLOATS = ("s", "v", "a") + PROFILE_FIELDS
+_RECORD = struct.Struct("<qiiiBb16s" + "d" * len(_FLOATS))
+_COUNT = struct.Struct("<i")
+
+
+class _Exchange:
+    """Shared-memory mailboxes between region processes.
+
+    One section per (parity, source region, destination region) holding a
+    record count and up to `capacity` packed vehicles. Writers fill their own
+    sections for tick parity p, wait on the barrier, then read the sections
+    addressed to them. A section of parity p is written again two ticks
+    later, after the next barrier, so every reader is done with it by then
+    and one barrier per tick is enough.
+    """
+
+    def __init__(self, name: str, regions: int, capacity: int):
+        self.shm = shared_memory.SharedMemory(name=name)
+        self.k = regions
+        self.capacity = capacity
+        self.section = _COUNT.size + capacity * _RECORD.size
+
+    @staticmethod
+    def size(regions: int, capacity: int) -> int:
+        return 2 * regions * regions * (_COUNT.size + capacity * _RECORD.size)
+
+    def _offset(self, parity: int, src: int, dst: int) -> int:
+        return ((parity * self.k + src) * self.k + dst) * self.section
+
+    def write(self, parity: int, src: int, dst: int, records: List[tuple]) -> None:
+        if len(records) > self.capacity:
+            raise RuntimeError(f"{len(records)} handoffs from region {src} to {dst} in one tick; "
+                               f"raise capacity (now {self.capacity})")
+        buf = self.shm.buf
+        off = self._offset(parity, src, dst)
+        _COUNT.pack_into(buf, off, len(records))
+        off += _COUNT.size
+        for r in records:
+            _RECORD.pack_into(buf, off, *r)
+            off += _RECORD.size
+
+    def read(self, parity: int, src: int, dst: int) -> List[tuple]:
+        buf = self.shm.buf
+        off = self._offset(parity, src, dst)
+        (n,) = _COUNT.unpack_from(buf, off)
+        off += _COUNT.size
+        return [_RECORD.unpack_from(buf, off + i * _RECORD.size) for i in range(n)]
+
+    def close(self) -> None:
+        self.shm.close()
+
+
+def _pack(net: Network, dst: int, v: Vehicle) -> tuple:
+    route, hop = net._trips.pop(v.id)
+    head = (v.id, dst, route, hop, v.lane_code, v.direction, v.profile.name.encode("utf-8"))
+    return head + (v.s, v.v, v.a) + tuple(getattr(v.profile, f) for f in PROFILE_FIELDS)
+
+
+def _unpack(net: Network, r: tuple) -> Move:
+    vid, dst, route, hop, lane, direction, name = r[:7]
+    s, v, a = r[7:10]
+    profile = VehicleClass(name.rstrip(b"\0").decode("utf-8"), *r[10:])
+    v = Vehicle(id=vid, lane=lane, direction=direction, s=s, v=v, a=a, profile=profile)
+    net._trips[vid] = (route, hop)
+    return dst, v
+
+
+def _region_worker(factory, duration, regions, me, shm_name, capacity, barrier, results) -> None:
+    exchange = None
+    try:
+        net = factory()
+        net._active = regions[me]
+        owner = {i: r for r, group in enumerate(regions) for i in group}
+        exchange = _Exchange(shm_name, len(regions), capacity)
+        for tick in range(int(duration / net.dt)):
+            parity = tick & 1
+            moves = net._advance()
+            local: List[Move] = []
+            outgoing: List[List[tuple]] = [[] for _ in regions]
+            for dst, v in moves:
+                if owner[dst] == me:
+                    local.append((dst, v))
+                else:
+                    outgoing[owner[dst]].append(_pack(net, dst, v))
+            for r, records in enumerate(outgoing):
+                if r != me:
+                    exchange.write(parity, me, r, records)
+            barrier.wait()
+            for r in range(len(regions)):
+                if r != me:
+                    local.extend(_unpack(net, rec) for rec in exchange.read(parity, r, me))
+            net._deliver(local)
+        results.put((me, None, net.node_metrics(), net.exited, net.handoffs))
+    except BaseException as exc:
+        barrier.abort()
+        results.put((me, repr(exc), {}, 0, 0))
+    finally:
+        if exchange is not None:
+            exchange.close()
+
+
+def run_partitioned(
+    factory: Callable[[], Network],
+    duration: float,
+    regions: int = 2,
+    capacity: int = 256,
+) -> Tuple[Metrics, Dict[str, Metrics]]:
+    """Run the network from `factory` with each region stepped in its own process.
+
+    `factory` must be picklable (a module-level function or functools.partial)
+    and build the same network every time; each process builds it and steps
+    only its own intersections. Vehicles crossing a region boundary are passed
+    through shared memory at the end of each tick, so the result equals
+    factory().run(duration) whatever the number of regions. `capacity` bounds
+    the handoffs from one region to another per tick.
+    """
+    topology = factory()
+    groups = partition(topology, regions)
+    k = len(groups)
+    ctx = mp.get_context()
+    shm = shared_memory.SharedMemory(create=True, size=_Exchange.size(k, capacity))
+    barrier = ctx.Barrier(k)
+    results = ctx.Queue()
+    procs = [
+        ctx.Process(target=_region_worker, args=(factory, duration, groups, r, shm.name, capacity, barrier, results))
+        for r in range(k)
+    ]
+    try:
+        for p in procs:
+            p.start()
+        out = [results.get() for _ in procs]
+        for p in procs:
+            p.join()
+    finally:
+        shm.close()
+        shm.unlink()
+
+    errors = [f"region {r}: {err}" for r, err, _, _, _ in out if err is not None]
+    if errors:
+        raise RuntimeError("; ".join(errors))
+    merged: Dict[str, Metrics] = {}
+    for _, _, nodes, _, _ in out:
+        merged.update(nodes)
+    # Network order, so sums match a single-process run exactly
+    per_node = {node.name: merged[node.name] for node in topology.nodes}
+    return _total(per_node.values(), sum(o[3] for o in out)), per_node
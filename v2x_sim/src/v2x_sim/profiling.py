@@ -0,0 +1,108 @@
+from __future__ import annotations
+import csv
+import json
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+
+PHASES = ("spawn", "signal", "control", "integrate", "exits", "near_miss", "collision", "telemetry")
+COUNTERS = ("controller_calls", "leader_lookups", "conflict_comparisons")
+
+
+class Profiler:
+    """Opt-in per-phase timing of Simulation.step.
+
+    Attach with `sim.profiler = Profiler()`. Each tick is split into the
+    phases in PHASES by lap() calls; wall-clock time per phase, the counters
+    in COUNTERS and the active vehicle count are accumulated. With
+    `trace=True` every phase of every tick is also kept as a Chrome trace
+    event (chrome://tracing, Perfetto), up to `trace_limit` events.
+    Without a profiler attached the step pays only a few `is None` checks.
+    """
+
+    def __init__(self, trace: bool = False, trace_limit: int = 1_000_000):
+        self.trace = trace
+        self.trace_limit = trace_limit
+        self.ticks = 0
+        self.phase_time: Dict[str, float] = {p: 0.0 for p in PHASES}
+        self.counters: Dict[str, int] = {c: 0 for c in COUNTERS}
+        self.active_total = 0
+        self.active_max = 0
+        self.events: List[dict] = []
+        self._origin = time.perf_counter()
+        self._tick_start = 0.0
+        self._last = 0.0
+
+    def begin(self) -> None:
+        self._tick_start = self._last = time.perf_counter()
+
+    def lap(self, phase: str) -> None:
+        now = time.perf_counter()
+        self.phase_time[phase] += now - self._last
+        if self.trace and len(self.events) < self.trace_limit:
+            self.events.append({
+                "name": phase, "ph": "X", "pid": 0, "tid": 0,
+                "ts": (self._last - self._origin) * 1e6, "dur": (now - self._last) * 1e6,
+            })
+        self._last = now
+
+    def count(self, counter: str, n: int) -> None:
+        self.counters[counter] += n
+
+    def end(self, sim_t: float, active: int) -> None:
+        self.ticks += 1
+        self.active_total += active
+        self.active_max = max(self.active_max, active)
+        if self.trace and len(self.events) < self.trace_limit:
+            ts = (self._tick_start - self._origin) * 1e6
+            self.events.append({"name": "active_vehicles", "ph": "C", "pid": 0, "ts": ts, "args": {"active": active}})
+            self.events.append({"name": "tick", "ph": "X", "pid": 0, "tid": 1, "ts": ts,
+                                "dur": (self._last - self._tick_start) * 1e6, "args": {"t": round(sim_t, 9)}})
+
+    # --- Reports -----------------------------------------------------------
+
+    def summary(self) -> List[dict]:
+        """One row per phase and counter: totals, per-tick means and shares."""
+        total = sum(self.phase_time.values()) or 1.0
+        ticks = max(1, self.ticks)
+        rows = [
+            {"name": p, "total": t, "per_tick": t / ticks, "share": t / total}
+            for p, t in self.phase_time.items()
+        ]
+        rows += [{"name": c, "total": n, "per_tick": n / ticks, "share": None} for c, n in self.counters.items()]
+        rows.append({"name": "active_vehicles", "total": self.active_max, "per_tick": self.active_total / ticks, "share": None})
+        return rows
+
+    def format_table(self) -> str:
+        lines = [f"{'phase':<22}{'total (s)':>12}{'us/tick':>12}{'share':>8}"]
+        step_total = 0.0
+        for r in self.summary()[:len(PHASES)]:
+            step_total += r["total"]
+            lines.append(f"{r['name']:<22}{r['total']:>12.4f}{r['per_tick'] * 1e6:>12.1f}{r['share'] * 100:>7.1f}%")
+        lines.append(f"{'step':<22}{step_total:>12.4f}{step_total / max(1, self.ticks) * 1e6:>12.1f}{'':>8}")
+        lines.append(f"{'counter':<22}{'total':>12}{'per tick':>12}")
+        for r in self.summary()[len(PHASES):-1]:
+            lines.append(f"{r['name']:<22}{r['total']:>12}{r['per_tick']:>12.1f}")
+        lines.append(f"ticks={self.ticks}  active vehicles mean={self.active_total / max(1, self.ticks):.1f} max={self.active_max}")
+        return "\n".join(lines)
+
+    def write_summary(self, path: Path) -> None:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with path.open("w", newline="", encoding="utf-8") as f:
+            w = csv.writer(f)
+            w.writerow(["name", "total", "per_tick", "share"])
+            for r in self.summary():
+                w.writerow([r["name"], r["total"], r["per_tick"], "" if r["share"] is None else r["share"]])
+
+    def write_trace(self, path: Path, metadata: Optional[dict] = None) -> None:
+        # Chrome trace event format (JSON object form)
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        names = [
+            {"name": "thread_name", "ph": "M", "pid": 0, "tid": 0, "args": {"name": "phases"}},
+            {"name": "thread_name", "ph": "M", "pid": 0, "tid": 1, "args": {"name": "ticks"}},
+        ]
+        doc = {"traceEvents": names + self.events, "displayTimeUnit": "ms", "otherData": metadata or {}}
+        path.write_text(json.dumps(doc), encoding="utf-8")
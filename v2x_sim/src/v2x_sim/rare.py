@@ -0,0 +1,215 @@
+from __future__ import annotations
+import math
+import random
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from . import snapshot
+from .demand import RateProfileSource
+from .models.vehicle import LANE_CODE
+from .simulation import Simulation
+
+
+EVENTS = ("collision", "near_miss")
+TTC_HORIZON = 5.0  # s; a rear-end TTC at or above this scores 0
+CONFLICT_WINDOW = 5.0  # s; crossing arrival-time gaps at or above this score 0
+
+
+def rear_end_score(sim: Simulation) -> float:
+    """Danger in [0, 1] from the smallest time-to-collision with a leader (1 = touching)."""
+    road = sim.road
+    best = 0.0
+    for v in sim.vehicles:
+        lead = road.get_indexed_lead(v)
+        if lead is None:
+            continue
+        ttc = v.ttc_with_lead(lead)
+        if ttc < TTC_HORIZON:
+            score = 1.0 - ttc / TTC_HORIZON
+            if score > best:
+                best = score
+    return best
+
+
+def conflict_score(sim: Simulation) -> float:
+    """Danger in [0, 1] from the closest predicted arrivals of crossing vehicles at s=0."""
+    times = ([], [])
+    for v in sim.vehicles:
+        t = v.t_to_conflict()
+        if t < 4.0 * CONFLICT_WINDOW:
+            times[v.lane_code].append(t)
+    ew, ns = sorted(times[LANE_CODE["EW"]]), sorted(times[LANE_CODE["NS"]])
+    if not ew or not ns:
+        return 0.0
+    # Closest pair of two sorted lists by a merge walk
+    i = j = 0
+    gap = math.inf
+    while i < len(ew) and j < len(ns):
+        gap = min(gap, abs(ew[i] - ns[j]))
+        if ew[i] < ns[j]:
+            i += 1
+        else:
+            j += 1
+    return max(0.0, 1.0 - gap / CONFLICT_WINDOW)
+
+
+def _event_count(sim: Simulation, event: str) -> int:
+    return sim.metrics.collisions if event == "collision" else sim.metrics.near_misses
+
+
+def _sources(sim: Simulation) -> List[RateProfileSource]:
+    return [entry[3] for entry in sim._spawn_queue._heap if isinstance(entry[3], RateProfileSource)]
+
+
+def _tilt(sim: Simulation, factor: float) -> None:
+    # Sample the Poisson demand at `factor` times its rate; run_segment reweights
+    for src in _sources(sim):
+        src.profile = [(t, rate * factor) for t, rate in src.profile]
+
+
+def _draws(sources: Sequence[RateProfileSource]) -> Tuple[int, float]:
+    return sum(s.points for s in sources), sum(s.exposure() for s in sources)
+
+
+def reseed(sim: Simulation, seed: int) -> None:
+    # New randomness for the pending demand: a clone then diverges from its siblings
+    for i, src in enumerate(_sources(sim)):
+        src.rng.seed(f"{seed}:{i}")
+
+
+def run_segment(task: dict) -> dict:
+    """Advance one trajectory until it reaches `level`, has the event, or hits `t_end`.
+
+    The start is either a fresh simulation (`factory(seed)`, with its demand
+    tilted by `tilt`) or a snapshot whose demand is reseeded. Returns
+    whether the level was reached, the snapshot at that moment, the
+    likelihood ratio of the demand drawn meanwhile and the ticks simulated.
+    """
+    tilt = task.get("tilt", 1.0)
+    if task.get("state") is None:
+        sim = task["factory"](task["seed"])
+        _tilt(sim, tilt)
+    else:
+        sim = snapshot.loads(task["state"])
+        reseed(sim, task["seed"])
+    event, level = task["event"], task["level"]
+    if _event_count(sim, event):  # cloned from a state that already had the event
+        return {"reached": True, "state": task["state"], "weight": 1.0, "ticks": 0}
+    score = rear_end_score if event == "collision" else conflict_score
+    sources = _sources(sim)
+    n0, m0 = _draws(sources)
+    steps = int(round((task["t_end"] - sim.t) / sim.dt))
+    reached, k = False, 0
+    while k < steps and not reached:
+        sim.step()
+        k += 1
+        reached = _event_count(sim, event) > 0 or score(sim) >= level
+    weight = 1.0
+    if reached and tilt != 1.0:
+        # Poisson demand of mean m sampled at c times the rate: ratio c^-N * exp((c - 1) m)
+        # over the N points drawn, written with the tilted mean c*m that the sources hold
+        n1, m1 = _draws(sources)
+        weight = math.exp(-(n1 - n0) * math.log(tilt) + (1.0 - 1.0 / tilt) * (m1 - m0))
+    return {"reached": reached, "state": snapshot.dumps(sim) if reached else None, "weight": weight, "ticks": k}
+
+
+def splitting(
+    factory: Callable[[int], Simulation],
+    horizon: float,
+    levels: Sequence[float] = (0.5, 0.7),
+    n: int = 200,
+    event: str = "collision",
+    tilt: float = 1.0,
+    seed: int = 0,
+    workers: int = 1,
+    z: float = 1.96,
+) -> dict:
+    """Probability that `event` happens within `horizon` s, by multilevel splitting.
+
+    Stage 0 runs n fresh simulations (factory(seed)) until each crosses the
+    first danger level (rear_end_score or conflict_score) or the horizon
+    ends. Every later stage restarts n trajectories from states drawn among
+    those that crossed the previous level, with reseeded demand, until they
+    cross the next level; the last level is the event itself. With tilt > 1
+    the Poisson demand is also sampled at tilt times its rate and every
+    trajectory carries the likelihood ratio of its arrivals (importance
+    sampling), which pays off when the event needs unusual demand.
+
+    The estimate is the product of the stage means of (reached * weight),
+    unbiased for any levels and tilt (a particle filter with 0/1 potentials).
+    Its variance comes from the genealogy (Lee & Whiteley, 2018): clones of
+    one stage-0 trajectory share its vehicles, so the confidence interval
+    depends on how many independent ancestors the successes descend from,
+    not on the number of clones.
+    """
+    if event not in EVENTS:
+        raise ValueError(f"event must be one of {EVENTS}")
+    rng = random.Random(seed)
+    thresholds = sorted(x for x in levels if x < 1.0) + [math.inf]  # inf: only the event counts
+    pool = ProcessPoolExecutor(workers) if workers > 1 else None
+    chunk = max(1, n // (4 * workers)) if pool is not None else 1
+    stages: List[dict] = []
+    starts: List[Optional[bytes]] = [None] * n
+    roots = list(range(n))  # stage-0 ancestor of each start
+    ticks = 0
+    try:
+        for level in thresholds:
+            tasks = [
+                {"factory": factory, "seed": rng.getrandbits(32), "state": s, "event": event, "level": level,
+                 "t_end": horizon, "tilt": tilt}
+                for s in starts
+            ]
+            results = list(pool.map(run_segment, tasks, chunksize=chunk) if pool is not None else map(run_segment, tasks))
+            ticks += sum(r["ticks"] for r in results)
+            hits = [(r["state"], r["weight"], root) for r, root in zip(results, roots) if r["reached"]]
+            weights = [w for _, w, _ in hits]
+            stages.append({"level": level if level < math.inf else 1.0, "runs": n, "hits": len(hits),
+                           "p": sum(weights) / n})
+            if not hits or level == math.inf:
+                break
+            picks = rng.choices(hits, weights, k=n)
+            starts = [s for s, _, _ in picks]
+            roots = [root for _, _, root in picks]
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    ps = [s["p"] for s in stages]
+    out = {"event": event, "horizon": horizon, "tilt": tilt, "p": 0.0, "stages": stages, "ticks": ticks}
+    if not hits:
+        # Nothing crossed the last stage run: at most 3/n of it (rule of three), times the earlier stages
+        # (exact without tilt; with one the missing weights make it indicative only)
+        out.update(ci=(0.0, math.prod(ps[:-1]) * 3.0 / n), rel_error=math.inf, brute_force_ticks=math.inf)
+        return out
+    p = math.prod(ps)
+    share: Dict[int, float] = {}
+    total = sum(weights)
+    for _, w, root in hits:
+        share[root] = share.get(root, 0.0) + w / total
+    a = (n / (n - 1)) ** len(stages)
+    rel_var = max(0.0, a * sum(c * c for c in share.values()) - (a - 1.0))
+    half = z * math.sqrt(math.log1p(rel_var))
+    out.update(p=p, ci=(p * math.exp(-half), p * math.exp(half)), rel_error=math.sqrt(rel_var),
+               ancestors=len(share))
+    # Plain Monte Carlo runs (and ticks) needed for the same relative error
+    dt = factory(0).dt
+    out["brute_force_ticks"] = (1.0 - p) / (p * rel_var) * horizon / dt if rel_var > 0 else math.inf
+    return out
+
+
+def monte_carlo(factory: Callable[[int], Simulation], horizon: float, runs: int, event: str = "collision",
+                seed: int = 0, workers: int = 1, z: float = 1.96) -> dict:
+    """Plain Monte Carlo estimate of the same probability (for comparison)."""
+    rng = random.Random(seed)
+    tasks = [{"factory": factory, "seed": rng.getrandbits(32), "state": None, "event": event,
+              "level": math.inf, "t_end": horizon} for _ in range(runs)]
+    if workers > 1:
+        with ProcessPoolExecutor(workers) as pool:
+            results = list(pool.map(run_segment, tasks, chunksize=max(1, runs // (4 * workers))))
+    else:
+        results = [run_segment(t) for t in tasks]
+    hits = sum(r["reached"] for r in results)
+    p = hits / runs
+    half = z * math.sqrt(p * (1.0 - p) / runs)
+    return {"event": event, "horizon": horizon, "p": p, "hits": hits, "runs": runs,
+            "ci": (max(0.0, p - half), p + half), "ticks": sum(r["ticks"] for r in results)}
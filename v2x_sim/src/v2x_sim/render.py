@@ -0,0 +1,311 @@
+from __future__ import annotations
+import struct
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Iterable, Iterator, List, Tuple
+
+import numpy as np
+
+from .models.traffic_signal import LIGHT_TABLE, GREEN, YELLOW
+from .models.vehicle import LANE_CODE
+
+# 16-colour palette shared by every frame (index -> RGB)
+PALETTE = np.array([
+    (34, 40, 49),     # 0 background
+    (86, 92, 102),    # 1 road
+    (230, 230, 230),  # 2 stop line and markings
+    (120, 72, 72),    # 3 conflict zone
+    (46, 204, 64),    # 4 light green
+    (255, 200, 0),    # 5 light yellow
+    (230, 57, 53),    # 6 light red
+    (214, 39, 40),    # 7 vehicle stopped
+    (255, 127, 14),   # 8 vehicle slow (< 1/3 of desired speed)
+    (240, 228, 66),   # 9 vehicle below 2/3 of desired speed
+    (120, 220, 120),  # 10 vehicle near desired speed
+    (100, 170, 255),  # 11 progress bar
+    (0, 0, 0), (0, 0, 0), (0, 0, 0),
+    (0, 0, 0),        # 15 transparent (GIF frame differences)
+], dtype=np.uint8)
+BACKGROUND, ROAD, MARKING, ZONE, LIGHT_GREEN, LIGHT_YELLOW, LIGHT_RED, STOPPED = range(8)
+PROGRESS, TRANSPARENT = 11, 15
+_LIGHT_COLOR = {GREEN: LIGHT_GREEN, YELLOW: LIGHT_YELLOW}
+
+
+class Renderer:
+    """Draws the crossing, vehicles and signal phase into palette-index frames.
+
+    EW runs left to right, NS bottom to top, each with one lane per direction
+    (+1 on the right-hand side). Vehicles are rectangles of their length,
+    coloured by speed relative to their desired speed; a square at each stop
+    line shows the light. Drawing is array work per approach rather than per
+    vehicle: the extents of all vehicles of a lane are filled into one 1-D
+    line, which is then copied across the lane's rows. Frames are uint8
+    arrays of PALETTE indices, ready for PNG or GIF encoding.
+    """
+
+    def __init__(self, size: int = 400, extent: float = 250.0, lane_width: float = 4.0, duration: float = 0.0):
+        self.size = size
+        self.extent = extent
+        self.scale = size / (2.0 * extent)  # px per m
+        self.duration = duration  # progress bar length (0: no bar)
+        c = size // 2
+        self.lane_px = max(2, int(round(lane_width * self.scale)))
+        w = self.lane_px
+        bg = np.full((size, size), BACKGROUND, dtype=np.uint8)
+        bg[c - w:c + w, :] = ROAD
+        bg[:, c - w:c + w] = ROAD
+        bg[c - w:c + w, c - w:c + w] = ZONE
+        bg[c, ::8] = MARKING  # centre lines
+        bg[::8, c] = MARKING
+        bg[c:c + w, c - w - 1] = MARKING  # stop lines of the +1 lanes
+        bg[c + w, c:c + w] = MARKING
+        self.background = bg
+        # Rows (EW) or columns (NS) of each lane, by (lane code, direction)
+        self._band = {
+            (LANE_CODE["EW"], 1): slice(c, c + w), (LANE_CODE["EW"], -1): slice(c - w, c),
+            (LANE_CODE["NS"], 1): slice(c, c + w), (LANE_CODE["NS"], -1): slice(c - w, c),
+        }
+        sq = max(2, w // 2)
+        self._lights = {  # light square of each lane, upstream of its stop line
+            (LANE_CODE["EW"], 1): (slice(c + w + 1, c + w + 1 + sq), slice(c - w - 1 - sq, c - w - 1)),
+            (LANE_CODE["EW"], -1): (slice(c - w - 1 - sq, c - w - 1), slice(c + w + 1, c + w + 1 + sq)),
+            (LANE_CODE["NS"], 1): (slice(c + w + 1, c + w + 1 + sq), slice(c + w + 1, c + w + 1 + sq)),
+            (LANE_CODE["NS"], -1): (slice(c - w - 1 - sq, c - w - 1), slice(c - w - 1 - sq, c - w - 1)),
+        }
+
+    def draw(self, t: float, phase: int, lane, direction, s, v, length, v_des) -> np.ndarray:
+        """One frame from per-vehicle arrays (any order)."""
+        frame = self.background.copy()
+        size, c = self.size, self.size // 2
+        lane = np.asarray(lane)
+        direction = np.asarray(direction)
+        s = np.asarray(s, dtype=float)
+        ratio = np.asarray(v, dtype=float) / np.maximum(np.asarray(v_des, dtype=float), 1e-9)
+        color = np.where(ratio < 0.05, STOPPED, STOPPED + 1 + np.minimum(2, (ratio * 3.0).astype(np.int64)))
+        half = 0.5 * np.asarray(length, dtype=float)
+        for (code, d), band in self._band.items():
+            sel = (lane == code) & (direction == d)
+            if not sel.any():
+                continue
+            lo = np.clip(np.floor((s[sel] - half[sel]) * self.scale).astype(np.int64) + c, 0, size)
+            hi = np.clip(np.ceil((s[sel] + half[sel]) * self.scale).astype(np.int64) + c, 0, size)
+            n = hi - lo
+            keep = n > 0
+            lo, n, col = lo[keep], n[keep], color[sel][keep]
+            # All vehicles' pixel ranges at once: start + offset within its range
+            total = int(n.sum())
+            idx = np.repeat(lo, n) + (np.arange(total) - np.repeat(np.cumsum(n) - n, n))
+            line = np.zeros(size, dtype=np.uint8)
+            line[idx] = np.repeat(col, n).astype(np.uint8)
+            if code == LANE_CODE["EW"]:
+                region = frame[band, :]
+                np.copyto(region, line[None, :], where=line[None, :] > 0)
+            else:
+                line = line[::-1]  # north (s > 0) is up
+                region = frame[:, band]
+                np.copyto(region, line[:, None], where=line[:, None] > 0)
+        for (code, _), (rows, cols) in self._lights.items():
+            frame[rows, cols] = _LIGHT_COLOR.get(LIGHT_TABLE[phase][code], LIGHT_RED)
+        if self.duration > 0.0:
+            frame[size - 3:, :int(size * min(1.0, t / self.duration))] = PROGRESS
+        return frame
+
+    def from_sim(self, sim) -> np.ndarray:
+        vs = sim.vehicles
+        return self.draw(sim.t, sim.signal.phase, [v.lane_code for v in vs], [v.direction for v in vs],
+                         [v.s for v in vs], [v.v for v in vs], [v.profile.length for v in vs],
+                         [v.profile.v_des for v in vs])
+
+    def from_tracks(self, track, fps: float = 10.0, t0: float = float("-inf"),
+                    t1: float = float("inf")) -> Iterator[np.ndarray]:
+        """Frames of a recorded run (tracks.TrackFile), one per 1/fps s of simulated time."""
+        times = track.times
+        k0, k1 = track._ticks(t0, t1)
+        every = max(1, int(round(1.0 / (fps * track.dt * track.every))))
+        phase = 0
+        for k in range(k0, k1, every):
+            recs = track._slice(k, k + 1)
+            if len(recs):
+                phase = int(recs["phase"][0])  # empty ticks keep the last phase seen
+            yield self.draw(float(times[k]), phase, recs["lane"], recs["direction"], recs["s"], recs["v"],
+                            recs["length"], recs["v_des"])
+
+
+class FrameRecorder:
+    """Renders a live Simulation every 1/fps s of simulated time into a list.
+
+    Attach as `sim.recorder` (or call on_step yourself); write the frames
+    with write_png_sequence / write_gif. Frames are taken at the first tick
+    and every round(1 / (fps * dt)) ticks after it, the ticks
+    Renderer.from_tracks draws from a recording of the same run.
+    """
+
+    def __init__(self, renderer: Renderer, fps: float = 10.0):
+        self.renderer = renderer
+        self.fps = fps
+        self.frames: List[np.ndarray] = []
+        self._tick = 0
+
+    def on_step(self, sim) -> None:
+        every = max(1, int(round(1.0 / (self.fps * sim.dt))))
+        if self._tick % every == 0:
+            self.frames.append(self.renderer.from_sim(sim))
+        self._tick += 1
+
+    def close(self) -> None:
+        pass
+
+
+# --- Encoding --------------------------------------------------------------
+
+def _chunk(kind: bytes, data: bytes) -> bytes:
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+
+def encode_png(frame: np.ndarray, level: int = 6) -> bytes:
+    """Palette PNG of one frame."""
+    h, w = frame.shape
+    raw = np.zeros((h, w + 1), dtype=np.uint8)  # filter byte 0 per row
+    raw[:, 1:] = frame
+    return b"".join((
+        b"\x89PNG\r\n\x1a\n",
+        _chunk(b"IHDR", struct.pack(">IIBBBBB", w, h, 8, 3, 0, 0, 0)),
+        _chunk(b"PLTE", PALETTE.tobytes()),
+        _chunk(b"IDAT", zlib.compress(raw.tobytes(), level)),
+        _chunk(b"IEND", b""),
+    ))
+
+
+def lzw_encode(data: bytes, min_code_size: int = 4) -> bytes:
+    """GIF variable-width LZW of palette indices (below 2**min_code_size)."""
+    clear = 1 << min_code_size
+    eoi = clear + 1
+    size = min_code_size + 1
+    nxt = eoi + 1
+    table = {}
+    out = bytearray()
+    acc = clear
+    nbits = size
+    if not data:
+        data = bytes(1)
+    w = data[0]
+    for c in data[1:]:
+        key = (w << 8) | c
+        code = table.get(key)
+        if code is not None:
+            w = code
+            continue
+        acc |= w << nbits
+        nbits += size
+        if nxt < 4095:
+            table[key] = nxt
+            nxt += 1
+            if nxt > (1 << size) and size < 12:
+                size += 1
+        else:
+            # Table full: start over (as giflib does at 4095)
+            acc |= clear << nbits
+            nbits += size
+            table.clear()
+            nxt = eoi + 1
+            size = min_code_size + 1
+        while nbits >= 8:
+            out.append(acc & 0xFF)
+            acc >>= 8
+            nbits -= 8
+        w = c
+    acc |= w << nbits
+    nbits += size
+    if nxt + 1 > (1 << size) and size < 12:  # the decoder counts the last code too
+        size += 1
+    acc |= eoi << nbits
+    nbits += size
+    while nbits > 0:
+        out.append(acc & 0xFF)
+        acc >>= 8
+        nbits -= 8
+    return bytes(out)
+
+
+def _gif_image(task: Tuple[int, int, np.ndarray, int]) -> bytes:
+    # Graphics control extension and image block of one (possibly cropped) frame
+    left, top, img, delay = task
+    h, w = img.shape
+    data = lzw_encode(img.tobytes(), 4)
+    blocks = b"".join(bytes((len(data[i:i + 255]),)) + data[i:i + 255] for i in range(0, len(data), 255))
+    return (b"\x21\xf9\x04" + struct.pack("<BHBB", (1 << 2) | 1, delay, TRANSPARENT, 0)
+            + b"\x2c" + struct.pack("<HHHHB", left, top, w, h, 0) + b"\x04" + blocks + b"\x00")
+
+
+def _gif_tasks(frames: Iterable[np.ndarray], delay: int) -> Iterator[Tuple[int, int, np.ndarray, int]]:
+    # Each frame as the bounding box of the pixels that changed, unchanged ones transparent
+    prev = None
+    for f in frames:
+        if prev is None:
+            yield 0, 0, f, delay
+        else:
+            changed = f != prev
+            rows, cols = np.flatnonzero(changed.any(axis=1)), np.flatnonzero(changed.any(axis=0))
+            if not len(rows):
+                yield 0, 0, np.full((1, 1), TRANSPARENT, dtype=np.uint8), delay
+            else:
+                r0, r1, c0, c1 = rows[0], rows[-1] + 1, cols[0], cols[-1] + 1
+                yield int(c0), int(r0), np.where(changed[r0:r1, c0:c1], f[r0:r1, c0:c1], TRANSPARENT), delay
+        prev = f
+
+
+def _pool_map(fn, items: Iterable, workers: int, batch: int = 256) -> Iterator:
+    # Ordered map over a stream in bounded batches, in worker processes if workers > 1
+    if workers <= 1:
+        yield from map(fn, items)
+        return
+    with ProcessPoolExecutor(workers) as pool:
+        buf = []
+        for item in items:
+            buf.append(item)
+            if len(buf) >= batch:
+                yield from pool.map(fn, buf, chunksize=max(1, batch // (4 * workers)))
+                buf = []
+        if buf:
+            yield from pool.map(fn, buf, chunksize=max(1, len(buf) // (4 * workers)))
+
+
+def write_gif(frames: Iterable[np.ndarray], path: Path, fps: float = 10.0, workers: int = 1) -> int:
+    """Animated GIF (looping) of palette frames; returns the number of frames."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    delay = max(2, int(round(100.0 / fps)))  # centiseconds; most viewers treat less than 2 as 10
+    frames = iter(frames)
+    first = next(frames, None)
+    if first is None:
+        raise ValueError("no frames to write")
+    h, w = first.shape
+    n = 0
+    with path.open("wb") as f:
+        f.write(b"GIF89a" + struct.pack("<HHBBB", w, h, 0xF3, BACKGROUND, 0) + PALETTE.tobytes())
+        f.write(b"\x21\xff\x0bNETSCAPE2.0\x03\x01\x00\x00\x00")  # loop forever
+        for block in _pool_map(_gif_image, _gif_tasks(_chain(first, frames), delay), workers):
+            f.write(block)
+            n += 1
+        f.write(b"\x3b")
+    return n
+
+
+def _png_file(task: Tuple[Path, np.ndarray]) -> None:
+    path, frame = task
+    path.write_bytes(encode_png(frame))
+
+
+def write_png_sequence(frames: Iterable[np.ndarray], directory: Path, workers: int = 1,
+                       prefix: str = "frame") -> int:
+    """frame_000000.png, ... in `directory`; returns the number of frames."""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    tasks = ((directory / f"{prefix}_{i:06d}.png", f) for i, f in enumerate(frames))
+    return sum(1 for _ in _pool_map(_png_file, tasks, workers))
+
+
+def _chain(first, rest: Iterator):
+    yield first
+    yield from rest
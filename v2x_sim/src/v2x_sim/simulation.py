@@ -1,12 +1,16 @@
 from __future__ import annotations
 from dataclasses import dataclass
-from typing import List, Dict, Optional, Tuple
+from typing import Iterable, List, Dict, Optional, Tuple
 
 from .models.vehicle import Vehicle
 from .models.road import Road
 from .models.traffic_signal import TrafficSignal
 from .controllers.v2v import v2v_rear_end_accel
 from .controllers.v2i import v2i_signal_accel
+from .demand import Arrival, SpawnQueue
+from .conflict import ConflictDetector
+from .fastforward import FastForward
+from .comm import MessageBus
 
 
 @dataclass
@@ -18,9 +22,11 @@ class Metrics:
 
 
 class Simulation:
-    def __init__(self, dt: float = 0.1, signal_params: Optional[dict] = None):
+    def __init__(self, dt: float = 0.1, signal_params: Optional[dict] = None, swept: bool = False):
         self.t: float = 0.0
         self.dt: float = dt
+        # Check collisions and near-misses over each whole tick, not only at its end (for coarse dt)
+        self.swept = swept
         self.road = Road()
         self.vehicles: List[Vehicle] = []
         if signal_params is None:
@@ -28,72 +34,195 @@ class Simulation:
         else:
             self.signal = TrafficSignal(**signal_params)
         self.metrics = Metrics()
-        self._spawn_queue: List[Tuple[float, Vehicle]] = []  # (spawn_time, vehicle)
+        self.conflicts = ConflictDetector()
+        self.recorder = None  # optional telemetry.Recorder, called at the end of each step
+        self.outflow: Optional[List[Vehicle]] = None  # if a list, exited vehicles are appended to it
+        self.fast_forward: Optional[FastForward] = None  # set by run(fast_forward=True)
+        self.profiler = None  # optional profiling.Profiler timing the phases of step()
+        self.comm: Optional[MessageBus] = None  # if set, controllers act on received V2X messages
+        self.kpi = None  # optional kpi.TrafficKPIs, updated at the end of each step
+        self.lod = None  # optional lod.LevelOfDetail: far, free-flowing vehicles and the signal at coarse rates
+        self._spawn_queue = SpawnQueue()
 
     def schedule_vehicle(self, spawn_time: float, vehicle: Vehicle) -> None:
-        self._spawn_queue.append((spawn_time, vehicle))
-        self._spawn_queue.sort(key=lambda x: x[0])
+        self._spawn_queue.push(spawn_time, vehicle)
 
-    def _spawn_due(self) -> None:
-        while self._spawn_queue and self._spawn_queue[0][0] <= self.t:
-            _, v = self._spawn_queue.pop(0)
+    def add_demand(self, source: Iterable[Arrival]) -> None:
+        # Lazy (spawn_time, vehicle) stream; vehicles are created only when due
+        self._spawn_queue.add_source(source)
+
+    def _spawn_due(self) -> List[Vehicle]:
+        due = self._spawn_queue.pop_due(self.t)
+        for v in due:
             self.vehicles.append(v)
+            self.road.track(v)
+        return due
 
     def step(self) -> None:
         dt = self.dt
-        self._spawn_due()
+        prof = self.profiler
+        if prof is not None:
+            prof.begin()
+        spawned = self._spawn_due()
+        if prof is not None:
+            prof.lap("spawn")
 
         # V2I: signal optimization using approaching info
-        approaching = self.road.get_approaching_by_lane(self.vehicles, radius=120.0)
-        self.signal.update(dt, approaching)
+        lod = self.lod
+        if lod is None:
+            approaching = self.road.get_indexed_approaching(radius=120.0)
+            self.signal.update(dt, approaching)
+        elif lod.signal_due(self):
+            approaching = self.road.get_indexed_approaching(radius=120.0)
+            self.signal.update(dt * lod.signal_every, approaching)
+        if prof is not None:
+            prof.lap("signal")
+
+        # Vehicles updated this tick, with their step
+        if lod is None:
+            active = self.vehicles
+            batches = ((active, dt),)
+        else:
+            full, coarse = lod.select(self, spawned)
+            active = full + coarse if coarse else full
+            batches = ((full, dt), (coarse, dt * lod.every))
 
         # Compute controls for each vehicle
-        for v in self.vehicles:
-            # Base desire to reach v_des
-            a_cmd = v.base_speed_control()
+        signal, road = self.signal, self.road
+        if self.comm is not None:
+            self._control_from_messages(active)
+        else:
+            for v in active:
+                # Base desire to reach v_des
+                a_cmd = v.base_speed_control()
 
-            # V2I: stopping for red / proceed for green
-            a_cmd += v2i_signal_accel(v, self.signal, self.road)
+                # V2I: stopping for red / proceed for green
+                a_cmd += v2i_signal_accel(v, signal, road)
 
-            # V2V: rear-end safety in same lane
-            lead = self.road.get_lead_vehicle(self.vehicles, v)
-            a_cmd += v2v_rear_end_accel(v, lead)
+                # V2V: rear-end safety in same lane
+                lead = road.get_indexed_lead(v)
+                a_cmd += v2v_rear_end_accel(v, lead)
 
-            v.apply_control(a_cmd)
+                v.apply_control(a_cmd)
+        if prof is not None:
+            prof.lap("control")
+            stepped = len(active)  # vehicles stepped this tick
+            prof.count("controller_calls", 2 * stepped)  # v2i + v2v
+            prof.count("leader_lookups", stepped)
+
+        # Leaders at the start of the tick, for the swept collision check
+        leads = {id(v): road.get_indexed_lead(v) for v in self.vehicles} if self.swept else None
 
         # Integrate dynamics and collect metrics
-        for i, v in enumerate(list(self.vehicles)):
-            prev_v = v.v
-            v.update(dt)
-
-            # Delay metric (only positive when under v_des)
-            self.metrics.total_delay += max(0.0, v.v_des - v.v) * dt
-
-            # Intersection conflict check (near-miss tracking)
-            if self.road.in_conflict_zone(v):
-                for u in self.vehicles:
-                    if u is v:
-                        continue
-                    if self.road.in_conflict_zone(u):
-                        if abs(v.t_to_conflict() - u.t_to_conflict()) < 1.0:
-                            self.metrics.near_misses += 1
-                            break
-
-            # Remove vehicles that have exited
-            if self.road.exited(v):
-                self.vehicles.pop(i)
-                self.metrics.total_vehicles_exited += 1
-
-        # Collision detection (rear-end in lane)
-        for v in self.vehicles:
-            lead = self.road.get_lead_vehicle(self.vehicles, v)
-            if lead and (lead.s - v.s) < (v.length * 0.5 + lead.length * 0.5 + 0.5):
-                self.metrics.collisions += 1
+        exited: List[Vehicle] = []
+        for group, h in batches:
+            for v in group:
+                v.update(h)
+
+                # Delay metric (only positive when under v_des)
+                self.metrics.total_delay += max(0.0, v.profile.v_des - v.v) * h
+
+                # Remove vehicles that have exited
+                if self.road.exited(v):
+                    exited.append(v)
+                    self.metrics.total_vehicles_exited += 1
+        if prof is not None:
+            prof.lap("integrate")
+
+        if exited:
+            self.vehicles[:] = [v for v in self.vehicles if not self.road.exited(v)]
+            for v in exited:
+                self.road.untrack(v)
+            if lod is not None:
+                lod.drop(road)
+                active = [v for v in active if v._road is road]
+            if self.outflow is not None:
+                self.outflow.extend(exited)
+        self.road.reindex()
+        if self.kpi is not None:
+            self.kpi.on_step(self, exited)
+        if prof is not None:
+            prof.lap("exits")
+            comparisons = self.conflicts.comparisons
+
+        # Intersection conflict check (near-miss tracking between crossing approaches)
+        if leads is None:
+            self.metrics.near_misses += self.conflicts.scan(self.road, self.t + dt)
+        else:
+            self.metrics.near_misses += self.conflicts.sweep(self.road, self.t + dt, dt)
+        if prof is not None:
+            prof.lap("near_miss")
+            prof.count("conflict_comparisons", self.conflicts.comparisons - comparisons)
+
+        # Collision detection (rear-end in lane); vehicles not stepped this tick
+        # are farther from their neighbours than any collision gap
+        if leads is None:
+            for v in active:
+                lead = road.get_indexed_lead(v)
+                if lead and v.direction * (lead.s - v.s) < (v.profile.length * 0.5 + lead.profile.length * 0.5 + 0.5):
+                    self.metrics.collisions += 1
+        else:
+            self.metrics.collisions += self._swept_collisions(leads)
+        if prof is not None:
+            prof.lap("collision")
+            prof.count("leader_lookups", len(active))
 
         self.t += dt
+        if self.recorder is not None:
+            self.recorder.on_step(self)
+        if prof is not None:
+            prof.lap("telemetry")
+            prof.end(self.t, stepped)
+
+    def _swept_collisions(self, leads: Dict[int, Optional[Vehicle]]) -> int:
+        # Vehicles closer to their leader than the collision gap at any time in the tick.
+        # Positions move linearly within a tick, so the gap to a given leader is
+        # smallest at one end: the start was checked in the previous tick, and at
+        # the end a vehicle is checked against both its current leader and the one
+        # it had at the start (a negative gap: it drove through it).
+        road = self.road
+        n = 0
+        for v in self.vehicles:
+            half = v.profile.length * 0.5 + 0.5
+            lead = road.get_indexed_lead(v)
+            if lead and v.direction * (lead.s - v.s) < half + lead.profile.length * 0.5:
+                n += 1
+                continue
+            before = leads.get(id(v))
+            if before is not None and before is not lead and before._road is road \
+                    and v.direction * (before.s - v.s) < half + before.profile.length * 0.5:
+                n += 1
+        return n
+
+    def _control_from_messages(self, active: List[Vehicle]) -> None:
+        # Same controllers, fed with the (possibly stale or missing) messages
+        # each vehicle has received instead of the true signal and leader
+        comm, road = self.comm, self.road
+        comm.step(self.t, self.vehicles, self.signal)
+        for v in active:
+            a_cmd = v.base_speed_control()
+            spat = comm.spat(v)
+            if spat is not None:
+                a_cmd += v2i_signal_accel(v, spat, road)
+            a_cmd += v2v_rear_end_accel(v, comm.lead(v))
+            v.apply_control(a_cmd)
 
-    def run(self, duration: float) -> Metrics:
-        steps = int(duration / self.dt)
-        for _ in range(steps):
-            self.step()
+    def run(self, duration: float, fast_forward: bool = False) -> Metrics:
+        # fast_forward jumps over quiet stretches (see fastforward.FastForward)
+        return self.run_steps(int(duration / self.dt), fast_forward=fast_forward)
+
+    def run_steps(self, steps: int, fast_forward: bool = False) -> Metrics:
+        if not fast_forward:
+            for _ in range(steps):
+                self.step()
+            return self.metrics
+        if self.fast_forward is None:
+            self.fast_forward = FastForward(self)
+        done = 0
+        while done < steps:
+            k = self.fast_forward.advance(steps - done)
+            if k == 0:
+                self.step()
+                k = 1
+            done += k
         return self.metrics
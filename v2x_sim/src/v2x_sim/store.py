@@ -0,0 +1,255 @@
+from __future__ import annotations
+import hashlib
+import json
+import re
+import sqlite3
+import struct
+import subprocess
+import time
+import zlib
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from .telemetry import Sink
+
+
+METRICS = ("collisions", "near_misses", "vehicles_exited", "total_delay")
+# Columns of `runs` usable in filters and groupings besides config keys
+RUN_COLUMNS = ("id", "config_hash", "code_version", "tag", "created", "sim_time") + METRICS
+_KEY = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    config_hash TEXT NOT NULL,
+    code_version TEXT NOT NULL,
+    config TEXT NOT NULL,
+    tag TEXT NOT NULL DEFAULT '',
+    created TEXT NOT NULL,
+    status TEXT NOT NULL,
+    sim_time REAL,
+    collisions INTEGER,
+    near_misses INTEGER,
+    vehicles_exited INTEGER,
+    total_delay REAL,
+    UNIQUE (config_hash, code_version)
+);
+CREATE INDEX IF NOT EXISTS runs_by_version ON runs (code_version, status);
+CREATE TABLE IF NOT EXISTS channels (
+    run_id INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    channel TEXT NOT NULL,
+    fields TEXT NOT NULL,
+    PRIMARY KEY (run_id, channel)
+);
+CREATE TABLE IF NOT EXISTS chunks (
+    run_id INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    channel TEXT NOT NULL,
+    chunk INTEGER NOT NULL,
+    rows INTEGER NOT NULL,
+    data BLOB NOT NULL,
+    PRIMARY KEY (run_id, channel, chunk)
+);
+"""
+
+
+def config_hash(config: dict) -> str:
+    # Canonical JSON, so key order and 60 vs 60.0 do not matter
+    canon = {k: float(v) if isinstance(v, int) and not isinstance(v, bool) else v for k, v in config.items()}
+    return hashlib.sha256(json.dumps(canon, sort_keys=True).encode("utf-8")).hexdigest()[:20]
+
+
+@lru_cache(maxsize=1)
+def code_version() -> str:
+    """Short git commit of the source tree, with '-dirty' for local changes."""
+    root = Path(__file__).resolve().parent
+    try:
+        head = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=root, capture_output=True,
+                              text=True, timeout=10).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no", "--", "."], cwd=root,
+                               capture_output=True, text=True, timeout=30).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return "unknown"
+    return (head + "-dirty" if dirty else head) or "unknown"
+
+
+def _encode(fields: Sequence[Tuple[str, str]], rows: List[tuple]) -> bytes:
+    # Column-major: each field's values packed contiguously, then zlib
+    n = len(rows)
+    cols = zip(*rows)
+    return zlib.compress(b"".join(struct.pack(f"<{n}{code}", *col) for (_, code), col in zip(fields, cols)), 6)
+
+
+def _decode(fields: Sequence[Tuple[str, str]], n: int, data: bytes) -> List[tuple]:
+    raw = zlib.decompress(data)
+    cols, off = [], 0
+    for _, code in fields:
+        fmt = struct.Struct(f"<{n}{code}")
+        cols.append(fmt.unpack_from(raw, off))
+        off += fmt.size
+    return list(zip(*cols))
+
+
+class StoreSink(Sink):
+    """Telemetry sink writing one channel of a run into the store, chunk by chunk."""
+
+    def __init__(self, store: "ResultStore", run_id: int, channel: str):
+        self.store = store
+        self.run_id = run_id
+        self.channel = channel
+        self._chunk = 0
+
+    def open(self, fields) -> None:
+        super().open(fields)
+        self.store._db.execute("INSERT OR REPLACE INTO channels VALUES (?, ?, ?)",
+                               (self.run_id, self.channel, json.dumps(self.fields)))
+
+    def write(self, rows: List[tuple]) -> None:
+        self.store._db.execute("INSERT INTO chunks VALUES (?, ?, ?, ?, ?)",
+                               (self.run_id, self.channel, self._chunk, len(rows), _encode(self.fields, rows)))
+        self._chunk += 1
+
+
+class ResultStore:
+    """SQLite index of simulation runs with compressed columnar timelines.
+
+    A run is identified by the hash of its (flat) config dict and the code
+    version; metrics are columns, config keys are queried through JSON. A
+    run is only visible once finish_run() has recorded its metrics, so an
+    interrupted run is redone, not half-counted. Timelines are stored as
+    zlib-compressed column chunks (one per telemetry flush) and read back
+    chunk by chunk.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(self.path))
+        self._db.execute("PRAGMA foreign_keys = ON")
+        self._db.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self._db.commit()
+        self._db.close()
+
+    def __enter__(self) -> "ResultStore":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # --- Writing -----------------------------------------------------------
+
+    def find_run(self, config: dict, version: Optional[str] = None) -> Optional[int]:
+        """id of the finished run of this config and code version, if any."""
+        row = self._db.execute(
+            "SELECT id FROM runs WHERE config_hash = ? AND code_version = ? AND status = 'done'",
+            (config_hash(config), version or code_version()),
+        ).fetchone()
+        return row[0] if row else None
+
+    def begin_run(self, config: dict, tag: str = "", version: Optional[str] = None) -> int:
+        key, version = config_hash(config), version or code_version()
+        # Leftovers of an interrupted attempt (or a forced rerun) are replaced
+        self._db.execute("DELETE FROM runs WHERE config_hash = ? AND code_version = ?", (key, version))
+        cur = self._db.execute(
+            "INSERT INTO runs (config_hash, code_version, config, tag, created, status) VALUES (?, ?, ?, ?, ?, 'running')",
+            (key, version, json.dumps(config, sort_keys=True), tag, time.strftime("%Y-%m-%dT%H:%M:%S")),
+        )
+        return cur.lastrowid
+
+    def sink(self, run_id: int, channel: str) -> StoreSink:
+        return StoreSink(self, run_id, channel)
+
+    def finish_run(self, run_id: int, sim_time: float, metrics) -> None:
+        self._db.execute(
+            "UPDATE runs SET status = 'done', sim_time = ?, collisions = ?, near_misses = ?, vehicles_exited = ?, "
+            "total_delay = ? WHERE id = ?",
+            (sim_time, metrics.collisions, metrics.near_misses, metrics.total_vehicles_exited, metrics.total_delay,
+             run_id),
+        )
+        self._db.commit()
+
+    def add_run(self, config: dict, sim_time: float, metrics, tag: str = "", version: Optional[str] = None) -> int:
+        # Metrics-only run (no timelines)
+        run_id = self.begin_run(config, tag, version)
+        self.finish_run(run_id, sim_time, metrics)
+        return run_id
+
+    # --- Queries -----------------------------------------------------------
+
+    @staticmethod
+    def _column(key: str) -> str:
+        if key in RUN_COLUMNS:
+            return key
+        if not _KEY.fullmatch(key):
+            raise ValueError(f"invalid config key {key!r}")
+        return f"json_extract(config, '$.{key}')"
+
+    def _where(self, where: Optional[Dict[str, object]]) -> Tuple[str, list]:
+        clauses, args = ["status = 'done'"], []
+        for key, value in (where or {}).items():
+            clauses.append(f"{self._column(key)} = ?")
+            args.append(value)
+        return " AND ".join(clauses), args
+
+    def runs(self, where: Optional[Dict[str, object]] = None, order_by: str = "id", limit: int = 0) -> Iterator[dict]:
+        sql, args = self._where(where)
+        query = f"SELECT {', '.join(RUN_COLUMNS)}, config FROM runs WHERE {sql} ORDER BY {self._column(order_by)}"
+        if limit:
+            query += f" LIMIT {int(limit)}"
+        for row in self._db.execute(query, args):
+            rec = dict(zip(RUN_COLUMNS, row[:-1]))
+            rec["config"] = json.loads(row[-1])
+            yield rec
+
+    def aggregate(self, group_by: Sequence[str], where: Optional[Dict[str, object]] = None,
+                  metrics: Sequence[str] = METRICS) -> List[dict]:
+        """Count, mean, std, min and max of metrics per group, computed in SQL."""
+        sql, args = self._where(where)
+        keys = [self._column(k) for k in group_by]
+        parts = []
+        for m in metrics:
+            col = self._column(m)
+            parts += [f"AVG({col})", f"AVG({col} * {col})", f"MIN({col})", f"MAX({col})"]
+        select = ", ".join(keys + ["COUNT(*)"] + parts)
+        query = f"SELECT {select} FROM runs WHERE {sql}"
+        if keys:
+            query += f" GROUP BY {', '.join(keys)} ORDER BY {', '.join(keys)}"
+        out = []
+        for row in self._db.execute(query, args):
+            rec = dict(zip(group_by, row[:len(keys)]))
+            rec["runs"] = row[len(keys)]
+            vals = row[len(keys) + 1:]
+            for i, m in enumerate(metrics):
+                mean, sq, lo, hi = vals[4 * i:4 * i + 4]
+                var = sq - mean * mean if mean is not None else None
+                if var is not None and var <= 1e-12 * sq:
+                    var = 0.0  # cancellation noise of identical values
+                rec[m] = {"mean": mean, "std": var ** 0.5 if var is not None else None, "min": lo, "max": hi}
+            out.append(rec)
+        return out
+
+    def channels(self, run_id: int) -> List[str]:
+        return [r[0] for r in self._db.execute("SELECT channel FROM channels WHERE run_id = ? ORDER BY channel", (run_id,))]
+
+    def timeline(self, run_id: int, channel: str = "steps") -> Tuple[List[str], Iterator[tuple]]:
+        """Field names and a row iterator that decodes one chunk at a time."""
+        row = self._db.execute("SELECT fields FROM channels WHERE run_id = ? AND channel = ?",
+                               (run_id, channel)).fetchone()
+        if row is None:
+            raise KeyError(f"run {run_id} has no channel {channel!r}")
+        fields = [tuple(f) for f in json.loads(row[0])]
+
+        def rows():
+            cur = self._db.cursor()
+            last = -1
+            while True:
+                nxt = cur.execute("SELECT chunk, rows, data FROM chunks WHERE run_id = ? AND channel = ? AND chunk > ? "
+                                  "ORDER BY chunk LIMIT 1", (run_id, channel, last)).fetchone()
+                if nxt is None:
+                    return
+                last, n, data = nxt
+                yield from _decode(fields, n, data)
+
+        return [name for name, _ in fields], rows()
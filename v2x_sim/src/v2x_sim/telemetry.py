@@ -0,0 +1,248 @@
+from __future__ import annotations
+import csv
+import struct
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from .models.traffic_signal import STATES
+
+
+# Fixed record schemas: (field, struct code)
+STEP_FIELDS: List[Tuple[str, str]] = [
+    ("t", "d"),
+    ("signal_state", "B"),
+    ("EW_approaching", "i"),
+    ("NS_approaching", "i"),
+    ("vehicles_exited", "q"),
+    ("active", "i"),
+]
+TRAJECTORY_FIELDS: List[Tuple[str, str]] = [
+    ("t", "d"),
+    ("id", "q"),
+    ("lane", "B"),
+    ("s", "d"),
+    ("v", "d"),
+    ("a", "d"),
+]
+_NUMPY_CODES = {"d": "<f8", "q": "<i8", "i": "<i4", "B": "u1"}
+
+
+class Sink:
+    """Destination for one channel's records; receives batches of tuples."""
+
+    def open(self, fields: Sequence[Tuple[str, str]]) -> None:
+        self.fields = list(fields)
+
+    def write(self, rows: List[tuple]) -> None:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+class MemorySink(Sink):
+    # Keeps rows as dicts; only for short runs and tests
+    def __init__(self):
+        self.rows: List[Dict] = []
+
+    def write(self, rows: List[tuple]) -> None:
+        names = [n for n, _ in self.fields]
+        for r in rows:
+            row = dict(zip(names, r))
+            if "signal_state" in row:
+                row["signal_state"] = STATES[row["signal_state"]]
+            self.rows.append(row)
+
+
+class CsvSink(Sink):
+    """CSV file with an optional subset of columns; signal states as names."""
+
+    def __init__(self, path: Path, columns: Optional[Sequence[str]] = None):
+        self.path = Path(path)
+        self.columns = list(columns) if columns else None
+
+    def open(self, fields) -> None:
+        super().open(fields)
+        names = [n for n, _ in self.fields]
+        cols = self.columns or names
+        self._idx = [names.index(c) for c in cols]
+        self._state_col = cols.index("signal_state") if "signal_state" in cols else -1
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._f = self.path.open("w", newline="", encoding="utf-8")
+        self._w = csv.writer(self._f)
+        self._w.writerow(cols)
+
+    def write(self, rows: List[tuple]) -> None:
+        for r in rows:
+            out = [r[i] for i in self._idx]
+            if self._state_col >= 0:
+                out[self._state_col] = STATES[out[self._state_col]]
+            self._w.writerow(out)
+
+    def close(self) -> None:
+        self._f.close()
+
+
+class NpySink(Sink):
+    """One structured .npy file per flushed buffer: <prefix>_00000.npy, ..."""
+
+    def __init__(self, directory: Path, prefix: str):
+        self.directory = Path(directory)
+        self.prefix = prefix
+        self._chunk = 0
+
+    def open(self, fields) -> None:
+        import numpy as np
+
+        super().open(fields)
+        self._np = np
+        self._dtype = np.dtype([(n, _NUMPY_CODES[c]) for n, c in self.fields])
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def write(self, rows: List[tuple]) -> None:
+        arr = self._np.array(rows, dtype=self._dtype)
+        self._np.save(self.directory / f"{self.prefix}_{self._chunk:05d}.npy", arr)
+        self._chunk += 1
+
+
+def load_npy_chunks(directory: Path, prefix: str):
+    import numpy as np
+
+    files = sorted(Path(directory).glob(f"{prefix}_*.npy"))
+    return np.concatenate([np.load(f) for f in files]) if files else None
+
+
+MAGIC = b"V2XT"
+
+
+class BinarySink(Sink):
+    """Append-only packed records behind a small self-describing header.
+
+    Header: MAGIC, u16 field count, then per field a u8 name length, the
+    name, and its struct code. Records follow as little-endian packed rows.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+
+    def open(self, fields) -> None:
+        super().open(fields)
+        self._struct = struct.Struct("<" + "".join(c for _, c in self.fields))
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._f = self.path.open("wb")
+        header = [MAGIC, struct.pack("<H", len(self.fields))]
+        for name, code in self.fields:
+            raw = name.encode("ascii")
+            header.append(struct.pack("<B", len(raw)) + raw + code.encode("ascii"))
+        self._f.write(b"".join(header))
+
+    def write(self, rows: List[tuple]) -> None:
+        pack = self._struct.pack
+        self._f.write(b"".join(pack(*r) for r in rows))
+
+    def close(self) -> None:
+        self._f.close()
+
+
+def read_binary(path: Path) -> Tuple[List[str], Iterator[tuple]]:
+    """Field names and a lazy iterator over the records of a BinarySink file."""
+    f = Path(path).open("rb")
+    if f.read(4) != MAGIC:
+        f.close()
+        raise ValueError(f"{path} is not a telemetry file")
+    (n,) = struct.unpack("<H", f.read(2))
+    fields = []
+    for _ in range(n):
+        (ln,) = struct.unpack("<B", f.read(1))
+        name = f.read(ln).decode("ascii")
+        fields.append((name, f.read(1).decode("ascii")))
+    rec = struct.Struct("<" + "".join(c for _, c in fields))
+
+    def rows():
+        with f:
+            while True:
+                chunk = f.read(rec.size * 1024)
+                if not chunk:
+                    return
+                yield from rec.iter_unpack(chunk)
+
+    return [name for name, _ in fields], rows()
+
+
+class Recorder:
+    """Streams per-tick telemetry from Simulation.step to sinks.
+
+    Records are fixed-schema tuples (STEP_FIELDS, TRAJECTORY_FIELDS) held in a
+    bounded buffer and flushed to the sinks every `buffer_size` rows, so memory
+    stays constant however long the run is. `every` keeps one tick in N.
+    `tracks` (a tracks.TrackWriter) also records memory-mappable trajectories.
+    Attach with `sim.recorder = Recorder(...)` and close() when done.
+    """
+
+    def __init__(
+        self,
+        sinks: Sequence[Sink] = (),
+        trajectory_sinks: Sequence[Sink] = (),
+        every: int = 1,
+        buffer_size: int = 4096,
+        radius: float = 120.0,
+        tracks=None,
+    ):
+        self.sinks = list(sinks)
+        self.trajectory_sinks = list(trajectory_sinks)
+        self.every = max(1, every)
+        self.buffer_size = buffer_size
+        self.radius = radius
+        self.tracks = tracks  # thins ticks by its own `every`
+        self._tick = 0
+        self._steps: List[tuple] = []
+        self._traj: List[tuple] = []
+        for s in self.sinks:
+            s.open(STEP_FIELDS)
+        for s in self.trajectory_sinks:
+            s.open(TRAJECTORY_FIELDS)
+
+    def on_step(self, sim) -> None:
+        if self.tracks is not None:
+            self.tracks.on_step(sim)
+        self._tick += 1
+        if self._tick % self.every:
+            return
+        t = round(sim.t, 9)  # drop accumulated float noise from t += dt
+        if self.sinks:
+            counts = sim.road.count_indexed_approaching(self.radius)
+            self._steps.append((
+                t,
+                sim.signal.phase,
+                counts["EW"],
+                counts["NS"],
+                sim.metrics.total_vehicles_exited,
+                len(sim.vehicles),
+            ))
+            if len(self._steps) >= self.buffer_size:
+                self._flush(self._steps, self.sinks)
+        if self.trajectory_sinks:
+            self._traj.extend((t, v.id, v.lane_code, v.s, v.v, v.a) for v in sim.vehicles)
+            if len(self._traj) >= self.buffer_size:
+                self._flush(self._traj, self.trajectory_sinks)
+
+    @staticmethod
+    def _flush(buf: List[tuple], sinks: Sequence[Sink]) -> None:
+        if buf:
+            for s in sinks:
+                s.write(buf)
+            buf.clear()
+
+    def close(self) -> None:
+        self._flush(self._steps, self.sinks)
+        self._flush(self._traj, self.trajectory_sinks)
+        for s in self.sinks + self.trajectory_sinks:
+            s.close()
+        if self.tracks is not None:
+            self.tracks.close()
+
+    def __enter__(self) -> "Recorder":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,296 @@
+from __future__ import annotations
+import struct
+from pathlib import Path
+from typing import Dict, Iterator, List, Tuple
+
+from .telemetry import _NUMPY_CODES
+
+
+# One record per vehicle per recorded tick, after the tick's exits
+TRACK_FIELDS: List[Tuple[str, str]] = [
+    ("t", "d"),
+    ("id", "q"),
+    ("lane", "B"),
+    ("direction", "b"),
+    ("phase", "B"),  # signal phase at t
+    ("s", "d"),
+    ("v", "d"),
+    ("a", "d"),
+    ("length", "d"),
+    ("v_des", "d"),
+]
+MAGIC = b"V2XK"
+INDEX = struct.Struct("<dQI")  # tick time, first record, record count
+SPAN = struct.Struct("<qII")  # vehicle id, first and last tick number
+_CODES = dict(_NUMPY_CODES, b="i1")
+
+
+def _paths(path: Path) -> Tuple[Path, Path, Path]:
+    return path, path.with_name(path.name + ".idx"), path.with_name(path.name + ".vid")
+
+
+class TrackWriter:
+    """Append-only file of fixed-width per-vehicle records with a time index.
+
+    `<path>` holds a self-describing header (as telemetry.BinarySink: field
+    names and struct codes, then dt and the recording interval) followed by
+    TRACK_FIELDS records; `<path>.idx` maps each recorded tick to its first
+    record and count; `<path>.vid` (written on close) gives every vehicle's
+    first and last tick, for lookups by id. Attach as `sim.recorder`, or pass
+    to telemetry.Recorder(tracks=...) next to other channels.
+    """
+
+    def __init__(self, path: Path, every: int = 1, buffer_size: int = 65536):
+        self.path, self.index_path, self.spans_path = _paths(Path(path))
+        self.every = max(1, every)
+        self.buffer_size = buffer_size
+        self.records = 0
+        self.ticks = 0
+        self._tick = 0
+        self._struct = struct.Struct("<" + "".join(c for _, c in TRACK_FIELDS))
+        self._buf: List[bytes] = []
+        self._index: List[bytes] = []
+        self._spans: Dict[int, List[int]] = {}
+        self._f = None
+        self._idx = None
+
+    def _open(self, dt: float) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._f = self.path.open("wb")
+        self._idx = self.index_path.open("wb")
+        header = [MAGIC, struct.pack("<H", len(TRACK_FIELDS))]
+        for name, code in TRACK_FIELDS:
+            raw = name.encode("ascii")
+            header.append(struct.pack("<B", len(raw)) + raw + code.encode("ascii"))
+        header.append(struct.pack("<dI", dt, self.every))
+        self._f.write(b"".join(header))
+
+    def on_step(self, sim) -> None:
+        self._tick += 1
+        if self._tick % self.every:
+            return
+        if self._f is None:
+            self._open(sim.dt)
+        t = round(sim.t, 9)
+        phase = sim.signal.phase
+        pack = self._struct.pack
+        tick = self.ticks
+        spans = self._spans
+        for v in sim.vehicles:
+            p = v.profile
+            self._buf.append(pack(t, v.id, v.lane_code, v.direction, phase, v.s, v.v, v.a, p.length, p.v_des))
+            span = spans.get(v.id)
+            if span is None:
+                spans[v.id] = [tick, tick]
+            else:
+                span[1] = tick
+        n = len(sim.vehicles)
+        self._index.append(INDEX.pack(t, self.records, n))
+        self.records += n
+        self.ticks += 1
+        if len(self._buf) >= self.buffer_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if self._f is None:
+            return
+        # Records before their index entries, so a reader never sees an entry without data
+        self._f.write(b"".join(self._buf))
+        self._f.flush()
+        self._idx.write(b"".join(self._index))
+        self._idx.flush()
+        self._buf.clear()
+        self._index.clear()
+
+    def close(self) -> None:
+        if self._f is None:
+            return
+        self.flush()
+        self._f.close()
+        self._idx.close()
+        self.spans_path.write_bytes(b"".join(SPAN.pack(vid, a, b) for vid, (a, b) in self._spans.items()))
+        self._f = None
+
+    def __enter__(self) -> "TrackWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class TrackFile:
+    """Read side of a TrackWriter file through numpy.memmap.
+
+    Records are mapped, not loaded: window() and at() return zero-copy views
+    of consecutive ticks, vehicle() reads only the ticks the vehicle was
+    present. The metric methods recompute the simulation's metrics from the
+    records, chunk by chunk over whole ticks, with new parameters if wanted.
+    A file still being written can be read up to its last indexed tick.
+    """
+
+    def __init__(self, path: Path, chunk_records: int = 1 << 20):
+        import numpy as np
+
+        self._np = np
+        self.path, index_path, spans_path = _paths(Path(path))
+        self.chunk_records = chunk_records
+        with self.path.open("rb") as f:
+            if f.read(4) != MAGIC:
+                raise ValueError(f"{path} is not a track file")
+            (n,) = struct.unpack("<H", f.read(2))
+            fields = []
+            for _ in range(n):
+                (ln,) = struct.unpack("<B", f.read(1))
+                name = f.read(ln).decode("ascii")
+                fields.append((name, f.read(1).decode("ascii")))
+            self.dt, self.every = struct.unpack("<dI", f.read(12))
+            offset = f.tell()
+        self.dtype = np.dtype([(name, _CODES[c]) for name, c in fields])
+        index = np.fromfile(index_path, dtype=np.dtype([("t", "<f8"), ("start", "<u8"), ("count", "<u4")]))
+        self.times = index["t"]
+        self.starts = index["start"].astype(np.int64)
+        self.counts = index["count"].astype(np.int64)
+        total = int(self.starts[-1] + self.counts[-1]) if len(index) else 0
+        self.records = np.memmap(self.path, dtype=self.dtype, mode="r", offset=offset, shape=(total,)) \
+            if total else np.zeros(0, dtype=self.dtype)
+        self._spans = None
+        self._spans_path = spans_path
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def _ticks(self, t0: float, t1: float) -> Tuple[int, int]:
+        np = self._np
+        return int(np.searchsorted(self.times, t0 - 1e-9, "left")), int(np.searchsorted(self.times, t1 + 1e-9, "right"))
+
+    def _slice(self, k0: int, k1: int):
+        if k0 >= k1:
+            return self.records[0:0]
+        return self.records[self.starts[k0]:self.starts[k1 - 1] + self.counts[k1 - 1]]
+
+    def window(self, t0: float, t1: float):
+        """Records of the ticks with t0 <= t <= t1 (a view into the file)."""
+        return self._slice(*self._ticks(t0, t1))
+
+    def at(self, t: float):
+        return self.window(t, t)
+
+    def vehicle(self, vid: int):
+        """All records of one vehicle, in time order (a copy)."""
+        np = self._np
+        if self._spans is None:
+            if self._spans_path.exists():
+                spans = np.fromfile(self._spans_path, dtype=np.dtype([("id", "<i8"), ("first", "<u4"), ("last", "<u4")]))
+                self._spans = {int(r["id"]): (int(r["first"]), int(r["last"]) + 1) for r in spans}
+            else:
+                self._spans = {}
+        # Without the span file (writer not closed) all ticks are scanned
+        k0, k1 = self._spans.get(vid, (0, 0) if self._spans else (0, len(self.times)))
+        recs = self._slice(k0, k1)
+        return np.asarray(recs[recs["id"] == vid])
+
+    def chunks(self, t0: float = float("-inf"), t1: float = float("inf")) -> Iterator[Tuple[int, object]]:
+        """(first tick number, records) over whole ticks, about chunk_records at a time."""
+        np = self._np
+        k0, k1 = self._ticks(t0, t1)
+        while k0 < k1:
+            limit = self.starts[k0] + self.chunk_records
+            k = max(k0 + 1, min(k1, int(np.searchsorted(self.starts, limit, "right")) - 1))
+            if k <= k0:
+                k = k0 + 1
+            yield k0, self._slice(k0, k)
+            k0 = k
+
+    def _tick_numbers(self, k0: int, recs):
+        # Tick of each record of a chunk starting at tick k0 (ticks are contiguous)
+        np = self._np
+        k1 = int(np.searchsorted(self.starts, self.starts[k0] + len(recs), "left"))
+        return np.repeat(np.arange(k0, k1), self.counts[k0:k1])
+
+    # --- Metrics -----------------------------------------------------------
+
+    def delay(self, t0: float = float("-inf"), t1: float = float("inf")) -> float:
+        """Sum of (v_des - v)+ * recording interval over all records.
+
+        Equals Simulation.metrics.total_delay (every=1) except for each
+        vehicle's exit tick, which is not recorded.
+        """
+        step = self.dt * self.every
+        total = 0.0
+        for _, recs in self.chunks(t0, t1):
+            total += float(self._np.maximum(0.0, recs["v_des"] - recs["v"]).sum())
+        return total * step
+
+    def collisions(self, margin: float = 0.5, t0: float = float("-inf"), t1: float = float("inf")) -> int:
+        """Vehicle-ticks closer to their leader than half both lengths plus `margin`."""
+        np = self._np
+        total = 0
+        for k0, recs in self.chunks(t0, t1):
+            if not len(recs):
+                continue
+            tick = self._tick_numbers(k0, recs)
+            d = recs["direction"].astype(np.int64)
+            pos = d * recs["s"]
+            order = np.arange(len(recs))  # spawn order within a tick
+            keep = d != 0
+            tick, lane, d, pos, order = tick[keep], recs["lane"][keep], d[keep], pos[keep], order[keep]
+            length = recs["length"][keep]
+            srt = np.lexsort((-order, pos, d, lane, tick))
+            tick, lane, d, pos, length = tick[srt], lane[srt], d[srt], pos[srt], length[srt]
+            n = len(srt)
+            if n < 2:
+                continue
+            same_group = (tick[1:] == tick[:-1]) & (lane[1:] == lane[:-1]) & (d[1:] == d[:-1])
+            # Runs of equal (group, position); the leader of a vehicle is the last
+            # of the next run in its group (earliest spawned among equal positions)
+            new_run = np.ones(n, dtype=bool)
+            new_run[1:] = ~(same_group & (pos[1:] == pos[:-1]))
+            run = np.cumsum(new_run) - 1
+            run_start = np.flatnonzero(new_run)
+            run_end = np.append(run_start[1:], n) - 1
+            nxt = run + 1
+            has = nxt < len(run_start)
+            idx = np.flatnonzero(has)
+            lead = run_end[nxt[idx]]
+            ok = (tick[lead] == tick[idx]) & (lane[lead] == lane[idx]) & (d[lead] == d[idx])
+            idx, lead = idx[ok], lead[ok]
+            gap = pos[lead] - pos[idx]
+            total += int(np.count_nonzero(gap < 0.5 * (length[idx] + length[lead]) + margin))
+        return total
+
+    def near_misses(self, threshold: float = 1.0, half_width: float = 6.0,
+                    t0: float = float("-inf"), t1: float = float("inf")) -> int:
+        """Vehicle-ticks in the conflict zone with a crossing vehicle arriving within `threshold` s.
+
+        Same definition as conflict.ConflictDetector, for any threshold and zone.
+        """
+        np = self._np
+        total = 0
+        for k0, recs in self.chunks(t0, t1):
+            if not len(recs):
+                continue
+            d = recs["direction"].astype(np.float64)
+            v = recs["v"]
+            dist = -d * recs["s"]
+            zone = (np.abs(recs["s"]) <= half_width) & (d != 0) & (v > 1e-6) & (dist >= 0)
+            idx = np.flatnonzero(zone)
+            if not len(idx):
+                continue
+            tick = self._tick_numbers(k0, recs)[idx]
+            lane = recs["lane"][idx].astype(np.int64)
+            t_arr = dist[idx] / v[idx]
+            srt = np.lexsort((t_arr, lane, tick))
+            key = (2 * tick + lane)[srt]
+            t_arr, rec = t_arr[srt], idx[srt]
+            ew = np.flatnonzero(key % 2 == 0)
+            lo = np.searchsorted(key, key[ew] + 1, "left")
+            hi = np.searchsorted(key, key[ew] + 1, "right")
+            cnt = hi - lo
+            if not cnt.sum():
+                continue
+            a = np.repeat(ew, cnt)
+            offs = np.arange(cnt.sum()) - np.repeat(np.cumsum(cnt) - cnt, cnt)
+            b = np.repeat(lo, cnt) + offs
+            hit = np.abs(t_arr[a] - t_arr[b]) < threshold
+            total += len(np.unique(np.concatenate((rec[a[hit]], rec[b[hit]]))))
+        return total
@@ -0,0 +1,321 @@
+from __future__ import annotations
+from dataclasses import dataclass, field, fields
+from typing import Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from .models.vehicle import Vehicle
+from .models.road import LANES, LANE_CODE, Road
+from .models.traffic_signal import RED_TABLE, YELLOW_TABLE, TrafficSignal
+from .simulation import Metrics, Simulation
+from .demand import Arrival, SpawnQueue
+
+_KEY_SPAN = 4096.0  # m; lead_indices sorts group * span + position when positions fit in half of it
+
+
+@dataclass
+class VehicleArrays:
+    # Structure-of-arrays view of the active vehicles, kept in spawn order
+    id: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=np.int64))
+    seq: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=np.int64))
+    lane: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=np.int8))
+    direction: np.ndarray = field(default_factory=lambda: np.zeros(0))
+    s: np.ndarray = field(default_factory=lambda: np.zeros(0))
+    v: np.ndarray = field(default_factory=lambda: np.zeros(0))
+    a: np.ndarray = field(default_factory=lambda: np.zeros(0))
+    length: np.ndarray = field(default_factory=lambda: np.zeros(0))
+    v_des: np.ndarray = field(default_factory=lambda: np.zeros(0))
+    a_max: np.ndarray = field(default_factory=lambda: np.zeros(0))
+    d_max: np.ndarray = field(default_factory=lambda: np.zeros(0))
+    t_headway: np.ndarray = field(default_factory=lambda: np.zeros(0))
+
+    def __len__(self) -> int:
+        return len(self.s)
+
+    def append(self, vehicles: List[Vehicle], first_seq: int) -> None:
+        new = {
+            "id": [v.id for v in vehicles],
+            "seq": list(range(first_seq, first_seq + len(vehicles))),
+            "lane": [v.lane_code for v in vehicles],
+            "direction": [v.direction for v in vehicles],
+        }
+        for f in fields(self):
+            cur = getattr(self, f.name)
+            vals = new[f.name] if f.name in new else [getattr(v, f.name) for v in vehicles]
+            setattr(self, f.name, np.concatenate([cur, np.asarray(vals, dtype=cur.dtype)]))
+
+    def keep(self, mask: np.ndarray) -> None:
+        for f in fields(self):
+            setattr(self, f.name, getattr(self, f.name)[mask])
+
+
+def lead_indices(
+    lane: np.ndarray,
+    direction: np.ndarray,
+    s: np.ndarray,
+    seq: np.ndarray,
+    block: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """Index of each vehicle's leader (-1 if none), matching Road.get_lead_vehicle.
+
+    Vehicles are sorted by (block, lane, direction, direction*s); the leader is
+    the earliest spawned vehicle of the next position run in the same approach.
+    `block` separates independent scenarios stacked into one array.
+    """
+    n = len(s)
+    lead = np.full(n, -1, dtype=np.int64)
+    if n < 2:
+        return lead
+    key = direction * s
+    group = lane.astype(np.int64) * 3 + (direction.astype(np.int64) + 1)
+    if block is not None:
+        group = group + block.astype(np.int64) * 6
+    if np.abs(key).max() < _KEY_SPAN / 2:
+        # One float sort of group * span + key (several times faster than lexsort);
+        # runs of equal sort keys, vehicles at the same position (or too close
+        # to tell apart after rounding), are then put in lexsort order
+        combined = group * _KEY_SPAN + key
+        order = np.argsort(combined)
+        c = combined[order]
+        same = c[1:] == c[:-1]
+        if same.any():
+            tie = np.zeros(n, dtype=bool)
+            tie[1:] = same
+            tie[:-1] |= same
+            sub = order[tie]
+            ct = c[tie]
+            run = np.cumsum(np.append(True, ct[1:] != ct[:-1]))
+            order[tie] = sub[np.lexsort((-seq[sub], key[sub], run))]
+    else:
+        order = np.lexsort((-seq, key, group))
+    g = group[order]
+    k = key[order]
+
+    new_run = np.ones(n, dtype=bool)
+    new_run[1:] = (g[1:] != g[:-1]) | (k[1:] != k[:-1])
+    starts = np.flatnonzero(new_run)
+    ends = np.append(starts[1:], n) - 1  # last slot of each run = earliest spawned
+    run = np.cumsum(new_run) - 1
+    nxt = np.minimum(run + 1, len(starts) - 1)
+    cand = ends[nxt]
+    ok = (run + 1 < len(starts)) & (g[cand] == g) & (direction[order] != 0)
+    lead[order[ok]] = order[cand[ok]]
+    return lead
+
+
+def signal_accel(
+    s: np.ndarray,
+    v: np.ndarray,
+    direction: np.ndarray,
+    d_max: np.ndarray,
+    red: np.ndarray,
+    yellow: np.ndarray,
+) -> np.ndarray:
+    # Vectorized v2i_signal_accel; red/yellow are per-vehicle signal flags
+    d = -direction * s
+    d_pos = np.maximum(0.0, d)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        brake = np.where(d_pos < 1e-6, -d_max, np.maximum(-d_max, -(v ** 2) / (2.0 * d_pos)))
+    acc = np.where(yellow & (d < 30.0), np.minimum(0.0, brake), 0.0)
+    return np.where(red, brake, acc)
+
+
+def rear_end_accel(
+    s: np.ndarray,
+    v: np.ndarray,
+    direction: np.ndarray,
+    length: np.ndarray,
+    t_headway: np.ndarray,
+    d_max: np.ndarray,
+    lead: np.ndarray,
+) -> np.ndarray:
+    # Vectorized v2v_rear_end_accel
+    has = lead >= 0
+    li = np.where(has, lead, 0)
+    half_len = 0.5 * (length + length[li])
+    desired_gap = np.maximum(2.0, v * t_headway + half_len)
+    gap = direction * (s[li] - s) - half_len
+    rel_v = v - v[li]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ttc = np.where(gap <= 0, 0.0, np.where(rel_v <= 0, np.inf, gap / rel_v))
+    acc = np.where(ttc < 2.0, -np.minimum(d_max * 0.7, 2.0 - ttc), 0.0)
+    acc = np.where(gap < desired_gap, -np.minimum(d_max, 0.8 * (desired_gap - gap)), acc)
+    return np.where(has, acc, 0.0)
+
+
+def near_miss_flags(
+    s: np.ndarray,
+    v: np.ndarray,
+    direction: np.ndarray,
+    lane: np.ndarray,
+    half_width: float,
+    block: Optional[np.ndarray] = None,
+    threshold: float = 1.0,
+) -> np.ndarray:
+    """Vehicles in the conflict zone with a crossing-lane zone vehicle (same
+    block) whose time to conflict differs by less than `threshold`, as counted
+    by ConflictDetector.
+
+    After sorting by (block, time to conflict), the closest crossing vehicle
+    is the nearest one of the other lane before or after each entry, so no
+    pairwise matrix is needed.
+    """
+    flags = np.zeros(len(s), dtype=bool)
+    zone = np.flatnonzero((np.abs(s) <= half_width) & (direction != 0))
+    if len(zone) < 2:
+        return flags
+    vz = v[zone]
+    d = -direction[zone] * s[zone]
+    moving = (vz > 1e-6) & (d >= 0)
+    zone = zone[moving]
+    if len(zone) < 2:
+        return flags
+    ttc = d[moving] / vz[moving]
+    b = np.zeros(len(zone), dtype=np.int64) if block is None else block[zone].astype(np.int64)
+    order = np.lexsort((ttc, b))
+    t = ttc[order]
+    bo = b[order]
+    ln = lane[zone][order]
+    pos = np.arange(len(order))
+    hit = np.zeros(len(order), dtype=bool)
+    for code in range(len(LANES)):
+        other = ln != code
+        # Nearest entry of another lane before / after each position
+        prev = np.maximum.accumulate(np.where(other, pos, -1))
+        nxt = np.minimum.accumulate(np.where(other, pos, len(pos))[::-1])[::-1]
+        me = ~other
+        for cand in (prev, nxt):
+            ok = me & (cand >= 0) & (cand < len(pos))
+            c = np.where(ok, cand, 0)
+            hit |= ok & (bo[c] == bo) & (np.abs(t[c] - t) < threshold)
+    flags[zone[order[hit]]] = True
+    return flags
+
+
+def collision_flags(s: np.ndarray, direction: np.ndarray, length: np.ndarray, lead: np.ndarray) -> np.ndarray:
+    # Rear-end overlap with the leader, as in Simulation.step
+    has = lead >= 0
+    li = np.where(has, lead, 0)
+    return has & (direction * (s[li] - s) < (length * 0.5 + length[li] * 0.5 + 0.5))
+
+
+class VectorizedSimulation:
+    """NumPy engine equivalent to Simulation for large vehicle counts.
+
+    Accepts the same schedule_vehicle()/signal inputs and accumulates the same
+    Metrics. Both engines check near-misses and collisions at the end of the
+    tick, on every vehicle's updated position (ConflictDetector.scan()), so
+    their counts agree; only the summation order of total_delay can differ
+    slightly.
+    """
+
+    def __init__(self, dt: float = 0.1, signal_params: Optional[dict] = None):
+        self.t: float = 0.0
+        self.dt: float = dt
+        self.road = Road()
+        if signal_params is None:
+            self.signal = TrafficSignal(min_green=8.0, max_green=25.0, yellow=3.0, all_red=1.0)
+        else:
+            self.signal = TrafficSignal(**signal_params)
+        self.metrics = Metrics()
+        self.state = VehicleArrays()
+        self._spawn_queue = SpawnQueue()
+        self._next_seq = 0
+
+    def schedule_vehicle(self, spawn_time: float, vehicle: Vehicle) -> None:
+        self._spawn_queue.push(spawn_time, vehicle)
+
+    def add_demand(self, source: Iterable[Arrival]) -> None:
+        self._spawn_queue.add_source(source)
+
+    def _spawn_due(self) -> None:
+        due = self._spawn_queue.pop_due(self.t)
+        if not due:
+            return
+        self.state.append(due, self._next_seq)
+        self._next_seq += len(due)
+
+    def _update_signal(self, dt: float) -> None:
+        st = self.state
+        sig = self.signal
+        lane_has_close = False
+        other_queue = 0
+        if sig.state in ("EW_GREEN", "NS_GREEN") and len(st):
+            green = LANE_CODE["EW" if sig.state == "EW_GREEN" else "NS"]
+            d = -st.direction * st.s
+            approaching = (d >= 0.0) & (d <= 120.0)
+            lane_has_close = bool(np.any(approaching & (st.lane == green) & (d < 40.0)))
+            other_queue = int(np.count_nonzero(approaching & (st.lane != green) & (d > 10.0)))
+        sig.update_demand(dt, lane_has_close, other_queue)
+
+    def step(self) -> None:
+        dt = self.dt
+        self._spawn_due()
+        st = self.state
+
+        self._update_signal(dt)
+
+        if len(st):
+            # Controls: base speed keeping + V2I + V2V, then saturation
+            a_cmd = np.clip(0.6 * (st.v_des - st.v), -st.d_max, st.a_max)
+            red = np.array(RED_TABLE[self.signal.phase])[st.lane]
+            yellow = np.array(YELLOW_TABLE[self.signal.phase])[st.lane]
+            a_cmd = a_cmd + signal_accel(st.s, st.v, st.direction, st.d_max, red, yellow)
+            lead = lead_indices(st.lane, st.direction, st.s, st.seq)
+            a_cmd = a_cmd + rear_end_accel(st.s, st.v, st.direction, st.length, st.t_headway, st.d_max, lead)
+            st.a = np.maximum(-st.d_max, np.minimum(st.a_max, a_cmd))
+
+            # Integrate dynamics and collect metrics
+            st.v = np.maximum(0.0, st.v + st.a * dt)
+            st.s = st.s + st.direction * st.v * dt
+            self.metrics.total_delay += float(np.sum(np.maximum(0.0, st.v_des - st.v) * dt))
+            flags = near_miss_flags(st.s, st.v, st.direction, st.lane, self.road.conflict_half_width)
+            self.metrics.near_misses += int(np.count_nonzero(flags))
+
+            exited = np.abs(st.s) > self.road.exit_distance
+            n_exit = int(np.count_nonzero(exited))
+            if n_exit:
+                st.keep(~exited)
+                self.metrics.total_vehicles_exited += n_exit
+
+            # Collision detection (rear-end in lane)
+            lead = lead_indices(st.lane, st.direction, st.s, st.seq)
+            self.metrics.collisions += int(np.count_nonzero(collision_flags(st.s, st.direction, st.length, lead)))
+
+        self.t += dt
+
+    def run(self, duration: float) -> Metrics:
+        steps = int(duration / self.dt)
+        for _ in range(steps):
+            self.step()
+        return self.metrics
+
+
+def compare_engines(
+    setup: Callable[[object], None],
+    duration: float,
+    dt: float = 0.1,
+    signal_params: Optional[dict] = None,
+    rtol: float = 0.02,
+) -> Dict[str, tuple]:
+    """Run the reference and vectorized engines on the same scenario.
+
+    `setup(sim)` schedules the scenario's vehicles and is called once per
+    engine. Returns {metric: (reference, vectorized)} for every metric that
+    differs by more than `rtol` (relative, with an absolute floor of 1).
+    """
+    # The vectorized engine only reads the scheduled vehicles, so run it first
+    # in case setup() hands both engines the same Vehicle objects.
+    vec = VectorizedSimulation(dt=dt, signal_params=signal_params)
+    setup(vec)
+    m_vec = vec.run(duration)
+    ref = Simulation(dt=dt, signal_params=signal_params)
+    setup(ref)
+    m_ref = ref.run(duration)
+    diffs = {}
+    for f in fields(Metrics):
+        a = getattr(m_ref, f.name)
+        b = getattr(m_vec, f.name)
+        if abs(a - b) > max(1.0, rtol * abs(a)):
+            diffs[f.name] = (a, b)
+    return diffs
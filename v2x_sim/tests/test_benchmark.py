@@ -0,0 +1,35 @@
+import unittest
+
+from scripts.benchmark import cases, compare, run_case
+
+
+class TestBenchmark(unittest.TestCase):
+    def test_cases_report_latency_and_throughput(self):
+        names = [c["name"] for c in cases(quick=True, engines=("object",))]
+        self.assertEqual(len(names), len(set(names)))
+        res = run_case({"name": "step/object/n=40", "kind": "step", "n": 40})
+        self.assertGreater(res["samples"], 0)
+        self.assertLessEqual(res["p50_us"], res["p90_us"])
+        self.assertLessEqual(res["p90_us"], res["p99_us"])
+        self.assertGreater(res["throughput"], 0.0)
+        res = run_case({"name": "signal_update/n=40", "kind": "signal_update", "n": 40})
+        self.assertEqual(res["unit"], "calls/s")
+
+    def test_compare_flags_regressions_only(self):
+        def doc(p50, thr, rss):
+            return {"cases": {"a": {"p50_us": p50, "throughput": thr, "peak_rss_mb": rss}}}
+
+        base = doc(100.0, 1000.0, 50.0)
+        _, reg = compare(base, doc(110.0, 920.0, 55.0), threshold=0.15)
+        self.assertEqual(reg, [])
+        _, reg = compare(base, doc(130.0, 1000.0, 50.0), threshold=0.15)
+        self.assertEqual([(r[0], r[1]) for r in reg], [("a", "p50_us")])
+        _, reg = compare(base, doc(60.0, 2000.0, 80.0), threshold=0.15, rss_threshold=0.25)
+        self.assertEqual([r[1] for r in reg], ["peak_rss_mb"])
+        rows, reg = compare(base, {"cases": {"b": base["cases"]["a"]}})
+        self.assertEqual(reg, [])
+        self.assertEqual(len(rows), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
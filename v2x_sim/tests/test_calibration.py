@@ -0,0 +1,64 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from main import build_demand
+from src.v2x_sim.calibration import ScheduleRecorder, calibrate, evaluate_batch, interval_counts, load_counts
+from src.v2x_sim.ensemble import EnsembleSimulation
+
+
+def arrivals(seed, duration=600.0):
+    rec = ScheduleRecorder()
+    build_demand(rec, duration, rate_ew=0.15, rate_ns=0.15, seed=seed)
+    return rec.arrivals
+
+
+class TestCalibration(unittest.TestCase):
+    def test_counts_from_cumulative_series(self):
+        self.assertEqual(interval_counts([0.1, 0.2, 30.0, 60.0, 61.0, 119.9, 120.0], [0, 1, 2, 4, 5, 5, 9], 60.0),
+                         [4, 5])
+        with tempfile.TemporaryDirectory() as d:
+            path = Path(d) / "vehicles_exited_over_time.csv"
+            path.write_text("t,vehicles_exited\n" + "".join(f"{k / 10:.1f},{k // 100}\n" for k in range(1, 1801)))
+            self.assertEqual(load_counts(path, 60.0), [6, 6, 6])
+
+    def test_dropping_replicas_keeps_the_others_unchanged(self):
+        sched = arrivals(3)
+        params = [{"min_green": 6.0}, {"min_green": 10.0, "max_green": 40.0}, {"all_red": 2.0}]
+        vehicles = [{"v_des": 12.0}, {"t_headway": 2.0}, {"a_max": 1.5, "d_max": 5.0}]
+        full = EnsembleSimulation(3, signal_params=params)
+        part = EnsembleSimulation(3, signal_params=params)
+        for ens in (full, part):
+            for k in range(3):
+                for t, v in sched:
+                    ens.schedule_vehicle(k, t, v)
+            ens.set_vehicle_params(vehicles)
+        for _ in range(1500):
+            full.step()
+            part.step()
+        part.keep([0, 2])
+        for _ in range(3000):
+            full.step()
+            part.step()
+        self.assertEqual(part.k, 2)
+        self.assertEqual(part.exited.tolist(), full.exited[[0, 2]].tolist())
+        self.assertEqual(part.total_delay.tolist(), full.total_delay[[0, 2]].tolist())
+        self.assertNotEqual(full.exited[0], full.exited[1])  # the parameters matter
+
+    def test_recovers_parameters_of_synthetic_counts(self):
+        sched = [arrivals(5)]
+        truth = {"v_des": 10.0, "min_green": 14.0}
+        base = {"candidates": [truth], "schedules": sched, "observed": [0] * 10, "interval": 60.0, "dt": 0.1,
+                "prune": 1e9}
+        observed = [round(x) for x in evaluate_batch(base)[0]["counts"]]
+
+        res = calibrate(observed, sched, fit=("v_des", "min_green"), batch=10, generations=3, check_every=300.0,
+                        seed=1, progress=False)
+        self.assertLess(res["error"], res["default_error"])
+        self.assertLessEqual(res["error"], 1.0)
+        self.assertEqual(res["evaluations"], 30)
+        self.assertGreater(res["pruned"], 0)  # clearly bad candidates stopped at 300 s
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import random
+import unittest
+
+from src.v2x_sim.comm import MessageBus, position
+from src.v2x_sim.models.vehicle import Vehicle
+from src.v2x_sim.models.traffic_signal import TrafficSignal
+from src.v2x_sim.simulation import Simulation
+
+
+def build(comm):
+    sim = Simulation(dt=0.1, signal_params={"max_green": 120.0})
+    for i in range(30):
+        d = 1 if i % 4 < 2 else -1
+        sim.schedule_vehicle(i * 1.7, Vehicle(id=i, lane="EW" if i % 2 else "NS", direction=d, s=-d * 200.0, v=12.0))
+    sim.comm = comm
+    return sim
+
+
+class TestMessageBus(unittest.TestCase):
+    def test_perfect_channel_matches_ground_truth(self):
+        ref = build(None)
+        ref.run(120.0)
+        sim = build(MessageBus(rate=1000.0, latency=0.0, max_age=0.0, spat_rate=1000.0))
+        sim.run(120.0)
+        self.assertEqual(sim.metrics, ref.metrics)
+        self.assertEqual([(v.id, v.s, v.v) for v in sim.vehicles], [(v.id, v.s, v.v) for v in ref.vehicles])
+
+    def test_grid_delivers_exactly_within_range(self):
+        rng = random.Random(4)
+        vehicles = [Vehicle(id=i, lane=rng.choice(("EW", "NS")), direction=1, s=rng.uniform(-900.0, 900.0), v=10.0,
+                            comm_range=rng.choice((80.0, 200.0))) for i in range(300)]
+        bus = MessageBus(cell=50.0, rsu_range=0.0)
+        bus.step(0.0, vehicles, TrafficSignal())
+        bus.step(0.1, vehicles, TrafficSignal())
+        for rx in vehicles:
+            x, y = position(rx.lane_code, rx.s)
+            expected = {
+                tx.id for tx in vehicles if tx is not rx
+                and (position(tx.lane_code, tx.s)[0] - x) ** 2 + (position(tx.lane_code, tx.s)[1] - y) ** 2
+                <= tx.comm_range ** 2
+            }
+            self.assertEqual(set(bus.neighbours(rx)), expected)
+        self.assertLess(bus.range_checks, len(vehicles) ** 2)
+
+    def test_latency_loss_and_stale_leads(self):
+        ego = Vehicle(id=1, lane="EW", direction=1, s=-100.0, v=10.0)
+        lead = Vehicle(id=2, lane="EW", direction=1, s=-60.0, v=8.0)
+        sig = TrafficSignal()
+        bus = MessageBus(rate=1.0, latency=0.3, max_age=1.0)
+        bus.step(0.0, [ego, lead], sig)
+        self.assertIsNone(bus.lead(ego))  # still in flight
+        self.assertIsNone(bus.spat(ego))
+        lead.s = -59.2
+        bus.step(0.3, [ego, lead], sig)
+        seen = bus.lead(ego)
+        self.assertEqual((seen.id, seen.t), (2, 0.0))
+        self.assertAlmostEqual(seen.s, -60.0 + 8.0 * 0.3)  # dead-reckoned from the sent state
+        self.assertEqual(bus.spat(ego).phase, sig.phase)
+        bus.step(1.5, [ego, lead], sig)  # next BSM not yet delivered: the old one is too stale
+        self.assertIsNone(bus.lead(ego))
+
+        lossy = MessageBus(latency=0.0, loss=1.0)
+        lossy.step(0.0, [ego, lead], sig)
+        self.assertEqual((lossy.delivered, lossy.lost), (0, 4))  # two BSMs, one SPaT to two
+
+        sim = build(MessageBus(latency=0.3, loss=0.3, seed=2))
+        sim.run(60.0)
+        self.assertGreater(sim.comm.lost, 0)
+        self.assertGreater(sim.metrics.total_vehicles_exited, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
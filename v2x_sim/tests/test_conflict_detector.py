@@ -0,0 +1,49 @@
+import unittest
+
+from src.v2x_sim.conflict import ConflictDetector
+from src.v2x_sim.models.road import Road
+from src.v2x_sim.models.vehicle import Vehicle
+
+
+class TestConflictDetector(unittest.TestCase):
+    def test_reports_crossing_pairs_only(self):
+        road = Road()
+        vehicles = [
+            Vehicle(id=1, lane="EW", direction=+1, s=-5.0, v=10.0),   # arrives in 0.5 s
+            Vehicle(id=2, lane="EW", direction=+1, s=-4.0, v=10.0),   # same lane, 0.4 s
+            Vehicle(id=3, lane="NS", direction=+1, s=-3.0, v=4.0),    # 0.75 s
+            Vehicle(id=4, lane="NS", direction=+1, s=-60.0, v=10.0),  # outside the zone
+        ]
+        for v in vehicles:
+            road.track(v)
+        det = ConflictDetector(record=True)
+        self.assertEqual(det.scan(road, t=1.0), 3)
+        pairs = sorted((e.a, e.b) for e in det.events)
+        self.assertEqual(pairs, [(1, 3), (2, 3)])
+        worst = det.worst()
+        self.assertEqual((worst.a, worst.b), (1, 3))
+        self.assertAlmostEqual(worst.severity, 0.75)
+
+    def test_matches_brute_force(self):
+        road = Road()
+        vehicles = []
+        for i in range(400):
+            lane = "EW" if i % 2 else "NS"
+            v = Vehicle(id=i, lane=lane, direction=+1, s=-6.0 + (i * 0.37) % 12.0, v=0.5 + (i * 1.3) % 12.0)
+            vehicles.append(v)
+            road.track(v)
+        det = ConflictDetector()
+        count = det.scan(road, t=0.0)
+        expected = 0
+        for v in vehicles:
+            if road.in_conflict_zone(v) and any(
+                u.lane != v.lane and road.in_conflict_zone(u) and abs(v.t_to_conflict() - u.t_to_conflict()) < 1.0
+                for u in vehicles
+            ):
+                expected += 1
+        self.assertEqual(count, expected)
+        self.assertLess(det.comparisons, 200 * 200 / 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import asyncio
+import threading
+import unittest
+
+from src.v2x_sim.cosim import CoSimClient, serve
+from src.v2x_sim.models.traffic_signal import Phase
+from src.v2x_sim.models.vehicle import TRUCK, Vehicle
+from src.v2x_sim.simulation import Simulation
+
+SIGNAL = {"min_green": 8.0, "max_green": 120.0, "yellow": 3.0, "all_red": 1.0}
+SPAWNS = [(i, i % 2, 1, -200.0 - 15.0 * i, 12.0, i % 3 == 0) for i in range(12)]
+
+
+class TestCoSimServer(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        ready = threading.Event()
+
+        async def main():
+            cls.stop = asyncio.Event()
+            server = await serve(port=0)
+            cls.port = server.sockets[0].getsockname()[1]
+            cls.loop = asyncio.get_running_loop()
+            ready.set()
+            async with server:
+                await cls.stop.wait()
+
+        cls.thread = threading.Thread(target=asyncio.run, args=(main(),), daemon=True)
+        cls.thread.start()
+        ready.wait()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.loop.call_soon_threadsafe(cls.stop.set)
+        cls.thread.join(5)
+
+    def test_batched_steps_match_local_simulation(self):
+        sim = Simulation(signal_params=SIGNAL)
+        for vid, lane, d, s, v, truck in SPAWNS:
+            sim.schedule_vehicle(0.0, Vehicle(id=vid, lane=lane, direction=d, s=s, v=v, profile=TRUCK if truck else None))
+        sim.run_steps(250)
+
+        with CoSimClient(port=self.port) as client:
+            client.reset(signal_params=SIGNAL)
+            client.spawn([rec[:5] + (int(rec[5]),) for rec in SPAWNS])
+            first = client.step(100, vehicles=False)
+            self.assertEqual(first.vehicles, [])
+            # Pipelined: all requests sent before any reply is read
+            ids = [client.send_step(50) for _ in range(3)]
+            states = [client.reply(rid) for rid in ids]
+            state = client.state()
+        self.assertEqual(len(states), 3)
+        self.assertAlmostEqual(state.t, sim.t)
+        self.assertEqual((state.collisions, state.near_misses, state.exited),
+                         (sim.metrics.collisions, sim.metrics.near_misses, sim.metrics.total_vehicles_exited))
+        self.assertEqual(state.vehicles, [(v.id, v.lane_code, v.direction, v.s, v.v, v.a) for v in sim.vehicles])
+
+    def test_phase_hold_frames_and_errors(self):
+        a, b = CoSimClient(port=self.port), CoSimClient(port=self.port)
+        try:
+            held = a.set_phase(Phase.EW_YELLOW, hold=True)
+            self.assertEqual(held.phase, Phase.EW_YELLOW)
+            a.subscribe(1.0, vehicles=False)
+            ids = [a.send_step(100), b.send_step(30)]  # two sessions, interleaved
+            b.reply(ids[1])
+            a.reply(ids[0])
+            self.assertAlmostEqual(b.state().t, 3.0)
+            self.assertEqual(a.state().phase, Phase.EW_YELLOW)  # a 3 s yellow would have ended long ago
+            self.assertEqual(len(a.frames), 10)
+            self.assertAlmostEqual(a.frames[-1].t, 10.0)
+            self.assertEqual(a.set_phase(None, hold=False).phase, Phase.EW_YELLOW)
+            self.assertNotEqual(a.step(50).phase, Phase.EW_YELLOW)
+            with self.assertRaises(RuntimeError):
+                a.set_phase(9)
+            self.assertAlmostEqual(a.state().t, 15.0)  # session still usable
+        finally:
+            a.close()
+            b.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+import itertools
+import unittest
+
+from src.v2x_sim.simulation import Simulation
+from src.v2x_sim.models.vehicle import Vehicle
+from src.v2x_sim.demand import SpawnQueue, poisson_arrivals, rate_profile_arrivals, platoon_arrivals
+
+
+class TestDemand(unittest.TestCase):
+    def test_sources_are_pulled_lazily(self):
+        sim = Simulation(dt=0.5)
+        ids = itertools.count(1)
+        day = 24 * 3600.0
+        sim.add_demand(poisson_arrivals("EW", 0.6, day, seed=1, ids=ids, min_headway=1.0))
+        sim.add_demand(platoon_arrivals("NS", 5, 2.0, platoons=None, cycle=90.0, ids=ids))
+        # One pending arrival per source, however long the horizon is
+        self.assertEqual(len(sim._spawn_queue), 2)
+        sim.run(120.0)
+        self.assertEqual(len(sim._spawn_queue), 2)
+        self.assertGreater(sim.metrics.total_vehicles_exited + len(sim.vehicles), 50)
+        with self.assertRaises(ValueError):  # 10 vehicles 2 s apart do not fit a 15 s cycle
+            platoon_arrivals("NS", 10, 2.0, platoons=2, cycle=15.0)
+        times = [t for t, _ in platoon_arrivals("NS", 10, 2.0, platoons=2, cycle=18.0)]
+        self.assertEqual(times, sorted(times))
+
+    def test_streams_are_seeded_per_approach(self):
+        ew = [t for t, _ in poisson_arrivals("EW", 0.3, 600.0, seed=5)]
+        ns = [t for t, _ in poisson_arrivals("NS", 0.3, 600.0, seed=5)]
+        self.assertEqual(ew, [t for t, _ in poisson_arrivals("EW", 0.3, 600.0, seed=5)])
+        self.assertNotEqual(ew, ns)
+        profile = [t for t, _ in rate_profile_arrivals("EW", [(0.0, 0.5), (100.0, 0.0), (200.0, 0.5)], 300.0)]
+        self.assertFalse(any(100.0 <= t < 200.0 for t in profile))
+        self.assertEqual(profile, sorted(profile))
+
+    def test_equal_spawn_times_keep_schedule_order(self):
+        q = SpawnQueue()
+        vs = [Vehicle(id=i, lane="EW", direction=+1, s=-100.0, v=10.0) for i in range(5)]
+        q.push(1.0, vs[3])
+        for v in vs[:3]:
+            q.push(0.0, v)
+        q.push(1.0, vs[4])
+        self.assertEqual([v.id for v in q.pop_due(0.5)], [0, 1, 2])
+        self.assertEqual([v.id for v in q.pop_due(1.0)], [3, 4])
+
+
+if __name__ == '__main__':
+    unittest.main()
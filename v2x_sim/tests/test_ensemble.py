@@ -0,0 +1,35 @@
+import unittest
+
+from main import build_scenario
+from src.v2x_sim.ensemble import EnsembleSimulation
+from src.v2x_sim.vectorized import VectorizedSimulation
+
+
+class TestEnsemble(unittest.TestCase):
+    def test_replicas_match_single_runs(self):
+        params = [
+            {"min_green": 5.0, "max_green": 15.0, "yellow": 3.0, "all_red": 1.0},
+            {"min_green": 8.0, "max_green": 25.0, "yellow": 3.0, "all_red": 2.0},
+            {"min_green": 12.0, "max_green": 20.0, "yellow": 4.0, "all_red": 1.0},
+        ]
+        counts = [(10, 8), (20, 20), (6, 14)]
+        ens = EnsembleSimulation(len(params), dt=0.1, signal_params=params, record=True)
+        for k, (ew, ns) in enumerate(counts):
+            build_scenario(ens.replica(k), ew_count=ew, ns_count=ns, spawn_gap_ew=1.6)
+        results = ens.run(80.0)
+
+        for k, (ew, ns) in enumerate(counts):
+            sim = VectorizedSimulation(dt=0.1, signal_params=params[k])
+            build_scenario(sim, ew_count=ew, ns_count=ns, spawn_gap_ew=1.6)
+            m = sim.run(80.0)
+            self.assertEqual(results[k].collisions, m.collisions)
+            self.assertEqual(results[k].near_misses, m.near_misses)
+            self.assertEqual(results[k].total_vehicles_exited, m.total_vehicles_exited)
+            self.assertAlmostEqual(results[k].total_delay, m.total_delay, places=6)
+            timeline, exited = ens.timelines()[k]
+            self.assertEqual(timeline[-1]["signal_state"], sim.signal.state)
+            self.assertEqual(exited[-1]["vehicles_exited"], m.total_vehicles_exited)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,34 @@
+import unittest
+
+from src.v2x_sim.simulation import Simulation
+from main import build_demand, build_scenario
+
+
+class TestFastForward(unittest.TestCase):
+    def _compare(self, setup, duration):
+        fixed = Simulation(dt=0.1)
+        setup(fixed)
+        fixed.run(duration)
+        ff = Simulation(dt=0.1)
+        setup(ff)
+        ff.run(duration, fast_forward=True)
+        a, b = fixed.metrics, ff.metrics
+        self.assertEqual((a.collisions, a.near_misses, a.total_vehicles_exited),
+                         (b.collisions, b.near_misses, b.total_vehicles_exited))
+        self.assertAlmostEqual(a.total_delay, b.total_delay, delta=1e-9 * max(1.0, a.total_delay))
+        self.assertEqual(fixed.t, ff.t)
+        self.assertEqual((fixed.signal.state, len(fixed.vehicles)), (ff.signal.state, len(ff.vehicles)))
+        self.assertAlmostEqual(fixed.signal.t_in_state, ff.signal.t_in_state)
+        return ff
+
+    def test_matches_fixed_step_scenario(self):
+        ff = self._compare(build_scenario, 300.0)
+        self.assertGreater(ff.fast_forward.ticks_skipped, 1500)
+
+    def test_matches_fixed_step_sparse_demand(self):
+        ff = self._compare(lambda sim: build_demand(sim, 900.0, rate_ew=0.01, rate_ns=0.01, seed=3), 900.0)
+        self.assertGreater(ff.fast_forward.ticks_skipped, 4500)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+import contextlib
+import io
+import json
+import math
+import random
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from src.v2x_sim.demand import Ids, poisson_arrivals
+from src.v2x_sim.kpi import LogHistogram, TrafficKPIs, merged
+from src.v2x_sim.simulation import Simulation
+import main
+
+
+def run(seed: int) -> Simulation:
+    sim = Simulation(signal_params={"max_green": 40.0})
+    ids = Ids(1)
+    for lane in ("EW", "NS"):
+        sim.add_demand(poisson_arrivals(lane, 0.15, 600.0, seed=seed, ids=ids, s0=-200.0, v0=12.0))
+    sim.kpi = TrafficKPIs(interval=60.0, keep=5)
+    sim.run(600.0)
+    return sim
+
+
+class TestKPIs(unittest.TestCase):
+    def test_histogram_quantiles_and_merge(self):
+        rng = random.Random(7)
+        xs = [rng.lognormvariate(3.0, 1.0) for _ in range(20000)] + [0.0] * 50
+        a, b = LogHistogram(), LogHistogram()
+        for i, x in enumerate(xs):
+            (a if i % 2 else b).add(x)
+        h = a.merge(b)
+        xs.sort()
+        self.assertEqual((h.count, h.min, h.max), (len(xs), 0.0, xs[-1]))
+        for q in (0.5, 0.95, 0.99):
+            exact = xs[int(q * (len(xs) - 1))]
+            self.assertLess(abs(h.quantile(q) - exact) / exact, 0.011)
+        self.assertEqual(h.quantile(0.001), 0.0)
+        with self.assertRaises(ValueError):
+            h.merge(LogHistogram(rel_error=0.05))
+
+    def test_simulation_stats_and_replica_merge(self):
+        a, b = run(1), run(2)
+        k = a.kpi
+        self.assertEqual(sum(k.exits), a.metrics.total_vehicles_exited)
+        self.assertEqual(k.travel_time.count, a.metrics.total_vehicles_exited)
+        self.assertGreater(k.travel_time.quantile(0.5), 30.0)  # 200 m to the line + 250 m beyond at <= 14 m/s
+        self.assertAlmostEqual(k.time, a.t)
+        self.assertAlmostEqual(sum(k.summary()["phase_share"].values()), 1.0)
+        rows = k.interval_rows()
+        self.assertEqual([r["t0"] for r in rows], [300.0, 360.0, 420.0, 480.0, 540.0])  # last 5 intervals kept
+        for r in rows:
+            self.assertAlmostEqual(sum(v for key, v in r.items() if key.startswith("share_")), 1.0)
+
+        both = merged([a.kpi, b.kpi])
+        self.assertEqual(both.travel_time.count, a.kpi.travel_time.count + b.kpi.travel_time.count)
+        self.assertEqual(both.exits, [x + y for x, y in zip(a.kpi.exits, b.kpi.exits)])
+        self.assertEqual([r["t0"] for r in both.interval_rows()], [r["t0"] for r in rows])
+        self.assertEqual(both.interval_rows()[0]["exits_NS"], rows[0]["exits_NS"] + b.kpi.interval_rows()[0]["exits_NS"])
+        self.assertEqual(a.kpi.travel_time.count, a.metrics.total_vehicles_exited)  # inputs untouched
+        self.assertFalse(math.isnan(both.summary()["green_utilization"]))
+
+    def test_resume_of_kpi_checkpoint(self):
+        def cli(*argv):
+            out = io.StringIO()
+            with mock.patch("sys.argv", ["main.py", *argv]), contextlib.redirect_stdout(out):
+                main.main()
+            return out.getvalue()
+
+        with tempfile.TemporaryDirectory() as d:
+            ck, kpi = Path(d) / "ck.v2xs", Path(d) / "kpi.json"
+            cli("--duration", "20", "--kpi", str(kpi), "--checkpoint", str(ck))
+            kpi.unlink()
+            # Resumed without --kpi: the restored KPIs are summarised but not written
+            self.assertIn("Travel time", cli("--duration", "40", "--resume", str(ck)))
+            self.assertFalse(kpi.exists())
+            cli("--duration", "60", "--resume", str(ck), "--kpi", str(kpi))
+            self.assertGreater(json.loads(kpi.read_text())["summary"]["travel_time"]["count"], 0)
+            kpi.unlink()
+            with contextlib.redirect_stderr(io.StringIO()), self.assertRaises(SystemExit):
+                cli("--engine", "vectorized", "--kpi", str(kpi))
+            self.assertFalse(kpi.exists())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import unittest
+
+from main import build_demand
+from src.v2x_sim import snapshot
+from src.v2x_sim.lod import LevelOfDetail, compare_lod
+from src.v2x_sim.simulation import Simulation
+
+
+def long_road(sim):
+    # Free-flowing NS traffic on 1 km approaches
+    sim.road.exit_distance = 1000.0
+    build_demand(sim, 600.0, rate_ew=0.0, rate_ns=0.1, ew_start_s=-950.0, ns_start_s=-950.0, seed=3)
+
+
+class TestLevelOfDetail(unittest.TestCase):
+    def test_single_rate_matches_full_rate(self):
+        sims = [Simulation(dt=0.1) for _ in range(2)]
+        for sim in sims:
+            build_demand(sim, 300.0, rate_ew=0.15, rate_ns=0.15, seed=4)
+        sims[1].lod = LevelOfDetail(every=1, signal_every=1)
+        for sim in sims:
+            sim.run(300.0)
+        full, lod = sims
+        self.assertEqual([(v.id, v.s, v.v) for v in lod.vehicles], [(v.id, v.s, v.v) for v in full.vehicles])
+        self.assertEqual(lod.metrics.collisions, full.metrics.collisions)
+        self.assertEqual(lod.metrics.total_vehicles_exited, full.metrics.total_vehicles_exited)
+        self.assertAlmostEqual(lod.metrics.total_delay, full.metrics.total_delay, places=6)
+
+    def test_coarse_vehicles_stay_clear_and_errors_are_bounded(self):
+        sim = Simulation(dt=0.1)
+        long_road(sim)
+        sim.lod = LevelOfDetail()
+        for _ in range(3000):
+            sim.step()
+            for v in sim.lod.coarse:
+                d = v.distance_to_stop_line()
+                self.assertTrue(d > 120.0 or d < -sim.road.conflict_half_width, d)
+        self.assertGreater(sim.lod.coarse_updates, 0)
+
+        report = compare_lod(long_road, 600.0)
+        self.assertGreater(report["updates_saved"], 0.3)
+        err = report["exit_time_error"]
+        self.assertGreater(err["compared"], 20)
+        self.assertEqual(err["unmatched"], 0)
+        self.assertLess(err["max"], 5.0)
+        full, lod = report["metrics"]["total_delay"]
+        self.assertLess(abs(lod - full), 0.05 * full)
+
+    def test_snapshot_keeps_rate_classes(self):
+        sim = Simulation(dt=0.1)
+        long_road(sim)
+        sim.lod = LevelOfDetail()
+        sim.run(123.4)
+        self.assertTrue(sim.lod.coarse)
+        restored = snapshot.loads(snapshot.dumps(sim))
+        self.assertEqual([v.id for v in restored.lod.coarse], [v.id for v in sim.lod.coarse])
+        sim.run(100.0)
+        restored.run(100.0)
+        self.assertEqual([(v.id, v.s, v.v) for v in restored.vehicles], [(v.id, v.s, v.v) for v in sim.vehicles])
+        self.assertEqual(restored.metrics.total_delay, sim.metrics.total_delay)
+
+
+if __name__ == '__main__':
+    unittest.main()
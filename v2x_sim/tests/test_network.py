@@ -0,0 +1,50 @@
+import functools
+import unittest
+
+from src.v2x_sim.models.vehicle import Vehicle
+from src.v2x_sim.network import corridor, grid_scenario, partition, run_partitioned
+
+
+class TestNetwork(unittest.TestCase):
+    def test_handoff_keeps_distance_along_link(self):
+        # Long greens: with no crossing demand every signal stays EW_GREEN
+        net = corridor(3, spacing=300.0, signal_params=dict(min_green=8.0, max_green=120.0, yellow=3.0, all_red=1.0))
+        route = net.add_route(["r0c2", "r0c1", "r0c0"])  # westbound
+        net.add_demand(route, [(0.0, Vehicle(id=1, lane="EW", direction=-1, s=140.0, v=12.0, v_des=12.0))])
+        seen = []
+        for _ in range(800):
+            net.step()
+            seen.append([len(node.sim.vehicles) for node in net.nodes])
+            if net.exited:
+                break
+        self.assertEqual(net.exited, 1)
+        self.assertEqual(net.handoffs, 2)
+        self.assertIn([0, 1, 0], seen)
+
+        # Past exit_distance of r0c0 the vehicle continues on r0c1 with the same distance travelled
+        net = corridor(2, spacing=300.0)
+        route = net.add_route(["r0c0", "r0c1"])
+        net.add_demand(route, [(0.0, Vehicle(id=1, lane="EW", direction=+1, s=149.0, v=12.0, v_des=12.0))])
+        net.step()
+        net.step()
+        v = net.nodes[1].sim.vehicles[0]
+        self.assertAlmostEqual(v.s, 149.0 + 1.2 + 1.2 - 300.0)
+
+    def test_partition_covers_all_nodes(self):
+        net = grid_scenario(3, 4, duration=1.0)
+        parts = partition(net, 4)
+        self.assertEqual(len(parts), 4)
+        self.assertEqual(sorted(i for p in parts for i in p), list(range(12)))
+
+    def test_partitioned_run_matches_single_process(self):
+        factory = functools.partial(grid_scenario, 2, 3, rate=0.2, duration=40.0)
+        net = factory()
+        expected = net.run(40.0)
+        self.assertGreater(net.handoffs, 0)
+        total, per_node = run_partitioned(factory, 40.0, regions=3)
+        self.assertEqual(total, expected)
+        self.assertEqual(per_node, net.node_metrics())
+
+
+if __name__ == '__main__':
+    unittest.main()
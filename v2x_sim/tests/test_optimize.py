@@ -0,0 +1,42 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from scripts.optimize import BOUNDS, DEFAULT_PLAN, SCENARIO_FIELDS, EvalCache, sample_plans, successive_halving
+
+
+class TestOptimize(unittest.TestCase):
+    def test_sampled_plans_are_distinct_and_bounded(self):
+        plans = sample_plans(20, BOUNDS, seed=3)
+        self.assertEqual(plans[0], DEFAULT_PLAN)
+        self.assertEqual(len({tuple(sorted(p.items())) for p in plans}), 20)
+        for p in plans[1:]:
+            for k, (lo, hi) in BOUNDS.items():
+                self.assertTrue(lo - 0.5 <= p[k] <= max(hi, p["min_green"] + 0.5), (k, p[k]))
+            self.assertGreater(p["max_green"], p["min_green"])
+
+    def test_halving_promotes_and_caches(self):
+        scenario = dict(SCENARIO_FIELDS, rate_ew=0.3, rate_ns=0.3)
+        plans = sample_plans(8, BOUNDS, seed=1)
+        with tempfile.TemporaryDirectory() as d:
+            path = Path(d) / "cache.jsonl"
+            res = successive_halving(scenario, plans, 60.0, [11, 12], eta=2, min_duration=15.0,
+                                     cache=EvalCache(path), progress=False)
+            self.assertEqual([r["plans"] for r in res["rungs"]], [8, 4, 2])
+            self.assertEqual([r["duration"] for r in res["rungs"]], [15.0, 30.0, 60.0])
+            self.assertEqual(res["rungs"][-1]["seeds"], 2)
+            self.assertEqual(res["best"], res["rungs"][-1]["ranking"][0])
+            self.assertTrue(res["best"]["feasible"])
+            self.assertGreater(res["evaluations"]["runs"], 0)
+
+            again = successive_halving(scenario, plans, 60.0, [11, 12], eta=2, min_duration=15.0,
+                                       cache=EvalCache(path), progress=False)
+            self.assertEqual(again["evaluations"]["runs"], 0)
+            self.assertEqual(again["best"], res["best"])
+
+        with self.assertRaises(ValueError):  # identical platoon replicas
+            successive_halving(dict(scenario, arrivals="platoon"), plans, 60.0, [11, 12], progress=False)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,39 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from src.v2x_sim.profiling import PHASES, Profiler
+from src.v2x_sim.simulation import Simulation
+from main import build_scenario
+
+
+class TestProfiling(unittest.TestCase):
+    def test_profiled_run_is_unchanged_and_traced(self):
+        plain = Simulation(dt=0.1)
+        build_scenario(plain)
+        plain.run(30.0)
+
+        sim = Simulation(dt=0.1)
+        build_scenario(sim)
+        sim.profiler = Profiler(trace=True)
+        sim.run(30.0)
+        self.assertEqual(sim.metrics, plain.metrics)
+
+        prof = sim.profiler
+        self.assertEqual(prof.ticks, 300)
+        self.assertEqual(prof.counters["controller_calls"], 2 * prof.active_total)
+        rows = {r["name"]: r for r in prof.summary()}
+        self.assertAlmostEqual(sum(rows[p]["share"] for p in PHASES), 1.0)
+        self.assertIn("collision", prof.format_table())
+
+        with tempfile.TemporaryDirectory() as d:
+            prof.write_trace(Path(d) / "trace.json")
+            events = json.loads((Path(d) / "trace.json").read_text(encoding="utf-8"))["traceEvents"]
+        phases = [e for e in events if e["ph"] == "X" and e["tid"] == 0]
+        self.assertEqual(len(phases), 300 * len(PHASES))
+        self.assertEqual(sum(1 for e in events if e["ph"] == "C"), 300)
+
+
+if __name__ == '__main__':
+    unittest.main()
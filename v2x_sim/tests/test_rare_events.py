@@ -0,0 +1,63 @@
+import functools
+import math
+import unittest
+
+from src.v2x_sim.demand import poisson_arrivals
+from src.v2x_sim.models.vehicle import Vehicle
+from src.v2x_sim.rare import monte_carlo, rear_end_score, splitting
+from src.v2x_sim.simulation import Simulation
+from scripts.rare_events import poisson_scenario
+
+SIGNAL = {"min_green": 8.0, "max_green": 25.0, "yellow": 3.0, "all_red": 1.0}
+
+
+def tailgate(seed: int) -> Simulation:
+    # A stopped car with a fast follower 7 m behind: always a rear-end collision
+    sim = Simulation()
+    sim.schedule_vehicle(0.0, Vehicle(id=1, lane="EW", direction=1, s=-30.0, v=0.0))
+    sim.schedule_vehicle(0.0, Vehicle(id=2, lane="EW", direction=1, s=-37.0, v=15.0))
+    return sim
+
+
+def empty(seed: int) -> Simulation:
+    return Simulation()
+
+
+class TestRareEvents(unittest.TestCase):
+    def test_certain_and_impossible_events(self):
+        sure = splitting(tailgate, 10.0, levels=(0.5,), n=20)
+        self.assertEqual(sure["p"], 1.0)
+        self.assertEqual(sure["ci"], (1.0, 1.0))
+        self.assertEqual(rear_end_score(tailgate(0)), 0.0)  # nothing spawned yet
+        never = splitting(empty, 10.0, levels=(0.5,), n=30)
+        self.assertEqual(never["p"], 0.0)
+        self.assertAlmostEqual(never["ci"][1], 3.0 / 30)  # rule of three on the first stage
+
+    def test_exposure_counts_poisson_mean(self):
+        src = poisson_arrivals("EW", 0.5, 100.0, seed=3)
+        for _ in range(10):
+            next(src)
+        self.assertEqual(src.points, 10)
+        self.assertAlmostEqual(src.exposure(), 0.5 * src.t)
+        list(src)
+        self.assertAlmostEqual(src.exposure(), 50.0)
+
+    def test_splitting_and_tilt_agree_with_monte_carlo(self):
+        factory = functools.partial(poisson_scenario, rate_ew=0.08, rate_ns=0.08, signal_params=SIGNAL)
+        mc = monte_carlo(factory, 40.0, 400, seed=1)
+        for tilt in (1.0, 1.5):
+            est = splitting(factory, 40.0, levels=(0.5,), n=100, tilt=tilt, seed=2)
+            lo, hi = est["ci"]
+            self.assertTrue(lo < mc["ci"][1] and mc["ci"][0] < hi, (est, mc))
+            self.assertLess(est["ticks"], mc["ticks"])
+            self.assertTrue(math.isfinite(est["brute_force_ticks"]))
+
+    def test_process_pool_matches_serial(self):
+        factory = functools.partial(poisson_scenario, rate_ew=0.08, rate_ns=0.08, signal_params=SIGNAL)
+        serial = splitting(factory, 30.0, levels=(0.5,), n=12, tilt=2.0, seed=4)
+        pooled = splitting(factory, 30.0, levels=(0.5,), n=12, tilt=2.0, seed=4, workers=2)
+        self.assertEqual((serial["p"], serial["stages"]), (pooled["p"], pooled["stages"]))
+
+
+if __name__ == '__main__':
+    unittest.main()
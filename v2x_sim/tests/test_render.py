@@ -0,0 +1,135 @@
+import struct
+import tempfile
+import unittest
+import zlib
+from pathlib import Path
+
+import numpy as np
+
+from src.v2x_sim.models.vehicle import Vehicle
+from src.v2x_sim.render import (
+    FrameRecorder, Renderer, TRANSPARENT, encode_png, lzw_encode, write_gif, write_png_sequence,
+)
+from src.v2x_sim.simulation import Simulation
+from src.v2x_sim.tracks import TrackFile, TrackWriter
+
+
+def build():
+    sim = Simulation(dt=0.1)
+    for i in range(12):
+        d = 1 if i % 3 else -1
+        sim.schedule_vehicle(i * 1.5, Vehicle(id=i, lane="EW" if i % 2 else "NS", direction=d, s=-d * 200.0, v=12.0))
+    return sim
+
+
+def lzw_decode(data: bytes, min_code_size: int) -> bytes:
+    # Reference GIF decoder (code widths as giflib reads them)
+    clear, eoi = 1 << min_code_size, (1 << min_code_size) + 1
+    out = bytearray()
+    pos = 0
+    size, running, table, prev = min_code_size + 1, eoi + 1, None, None
+    while True:
+        code = int.from_bytes(data[pos // 8:pos // 8 + 3].ljust(3, b"\0"), "little") >> (pos % 8) & ((1 << size) - 1)
+        pos += size
+        if code == eoi:
+            return bytes(out)
+        if code == clear:
+            size, running, table, prev = min_code_size + 1, eoi + 1, [bytes((i,)) for i in range(clear)] + [b"", b""], None
+            continue
+        if code < len(table):
+            entry = table[code]
+            if prev is not None:
+                table.append(prev + entry[:1])
+        else:
+            entry = prev + prev[:1]
+            table.append(entry)
+        out += entry
+        prev = entry
+        if running < 4097:
+            running += 1
+            if running > (1 << size) and size < 12:
+                size += 1
+
+
+def gif_frames(blob: bytes):
+    # (left, top, width, height, indices) of every image block
+    pos = 13 + 3 * 16
+    frames = []
+    while blob[pos] != 0x3B:
+        if blob[pos] == 0x21:
+            pos += 2
+            while blob[pos]:
+                pos += blob[pos] + 1
+            pos += 1
+            continue
+        left, top, w, h, _ = struct.unpack("<HHHHB", blob[pos + 1:pos + 10])
+        pos += 10
+        m = blob[pos]
+        pos += 1
+        data = bytearray()
+        while blob[pos]:
+            data += blob[pos + 1:pos + 1 + blob[pos]]
+            pos += blob[pos] + 1
+        pos += 1
+        frames.append((left, top, w, h, np.frombuffer(lzw_decode(bytes(data), m), dtype=np.uint8).reshape(h, w)))
+    return frames
+
+
+class TestRender(unittest.TestCase):
+    def test_lzw_round_trip(self):
+        rng = np.random.default_rng(0)
+        for data in (bytes(1), bytes(5000), rng.integers(0, 16, 20000, dtype=np.uint8).tobytes(),
+                     np.repeat(rng.integers(0, 16, 3000, dtype=np.uint8), 7).tobytes()):
+            self.assertEqual(lzw_decode(lzw_encode(data, 4), 4), data)
+
+    def test_live_and_recorded_frames_match(self):
+        with tempfile.TemporaryDirectory() as d:
+            path = Path(d) / "run.trk"
+            sim = build()
+            renderer = Renderer(size=200)
+            frames = FrameRecorder(renderer, fps=2.0)
+            writer = TrackWriter(path)
+
+            class Both:
+                def on_step(self, s):
+                    writer.on_step(s)
+                    frames.on_step(s)
+
+            sim.recorder = Both()
+            sim.run(30.0)
+            writer.close()
+            self.assertEqual(len(frames.frames), 60)
+            replay = list(renderer.from_tracks(TrackFile(path), fps=2.0))
+            self.assertEqual(len(replay), 60)
+            for a, b in zip(frames.frames, replay):
+                np.testing.assert_array_equal(a, b)
+            busy = frames.frames[20]
+            self.assertGreater(np.count_nonzero(busy != renderer.background), 20)  # vehicles and lights drawn
+
+    def test_png_and_gif_decode_to_the_frames(self):
+        sim = build()
+        rec = FrameRecorder(Renderer(size=120), fps=1.0)
+        sim.recorder = rec
+        sim.run(20.0)
+        with tempfile.TemporaryDirectory() as d:
+            self.assertEqual(write_png_sequence(rec.frames, Path(d) / "png", workers=2), 20)
+            blob = (Path(d) / "png" / "frame_000007.png").read_bytes()
+            self.assertEqual(blob, encode_png(rec.frames[7]))
+            idat = blob[blob.index(b"IDAT") + 4:blob.index(b"IEND") - 8]
+            raw = np.frombuffer(zlib.decompress(idat), dtype=np.uint8).reshape(120, 121)
+            np.testing.assert_array_equal(raw[:, 1:], rec.frames[7])
+
+            gif = Path(d) / "run.gif"
+            self.assertEqual(write_gif(rec.frames, gif, fps=1.0, workers=2), 20)
+            canvas = None
+            for (left, top, w, h, img), want in zip(gif_frames(gif.read_bytes()), rec.frames):
+                if canvas is None:
+                    canvas = img.copy()
+                else:
+                    region = canvas[top:top + h, left:left + w]
+                    np.copyto(region, img, where=img != TRANSPARENT)
+                np.testing.assert_array_equal(canvas, want)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,31 @@
+import random
+import unittest
+
+from src.v2x_sim.simulation import Simulation
+from src.v2x_sim.models.vehicle import Vehicle
+
+
+class TestRoadIndex(unittest.TestCase):
+    def test_indexed_queries_match_scans(self):
+        sim = Simulation(dt=0.1)
+        rng = random.Random(7)
+        for i in range(80):
+            lane = "EW" if i % 2 else "NS"
+            direction = rng.choice((+1, -1))
+            s = -direction * rng.uniform(20.0, 240.0)
+            v = Vehicle(id=i, lane=lane, direction=direction, s=s, v=rng.uniform(5.0, 15.0))
+            sim.schedule_vehicle(rng.uniform(0.0, 10.0), v)
+
+        for _ in range(200):
+            sim.step()
+            road = sim.road
+            for v in sim.vehicles:
+                self.assertIs(road.get_indexed_lead(v), road.get_lead_vehicle(sim.vehicles, v))
+            self.assertEqual(
+                road.get_indexed_approaching(120.0),
+                road.get_approaching_by_lane(sim.vehicles, 120.0),
+            )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+import unittest
+
+from src.v2x_sim import snapshot
+from src.v2x_sim.controllers.signal_mpc import PredictiveSignal
+from src.v2x_sim.demand import Ids, poisson_arrivals
+from src.v2x_sim.models.traffic_signal import Phase
+from src.v2x_sim.models.vehicle import Vehicle
+from src.v2x_sim.simulation import Simulation
+
+
+def demand_run(duration: float, **options) -> Simulation:
+    sim = Simulation()
+    sim.signal = PredictiveSignal(road=sim.road, **options)
+    ids = Ids(1)
+    for lane in ("EW", "NS"):
+        sim.add_demand(poisson_arrivals(lane, 0.12, duration, seed=5, ids=ids, s0=-200.0, v0=12.0))
+    return sim
+
+
+class TestPredictiveSignal(unittest.TestCase):
+    def test_switches_for_the_waiting_approach_and_alternates(self):
+        sim = Simulation()
+        sim.signal = PredictiveSignal(road=sim.road)
+        for i in range(4):  # queue on the red NS approach, nothing on EW
+            sim.schedule_vehicle(0.0, Vehicle(id=i + 1, lane="NS", direction=1, s=-20.0 - 8.0 * i, v=0.0))
+        sim.run_steps(81)
+        self.assertEqual(sim.signal.phase, Phase.EW_YELLOW)  # at min_green, not max_green
+        sim.run_steps(45)
+        self.assertEqual(sim.signal.phase, Phase.NS_GREEN)
+        sim.run_steps(150)
+        self.assertEqual(sim.signal.phase, Phase.NS_GREEN)  # nothing waits on EW: keep green (until max_green)
+        sim.schedule_vehicle(sim.t, Vehicle(id=9, lane="EW", direction=1, s=-15.0, v=0.0))
+        sim.run_steps(100)
+        self.assertIn(sim.signal.phase, (Phase.EW_GREEN, Phase.NS_YELLOW, Phase.ALL_RED))
+
+    def test_demand_summary_fallback_alternates(self):
+        sig = PredictiveSignal()
+        seen = []
+        for _ in range(1000):  # 100 s with a queue always waiting on the red approach
+            sig.update_demand(0.1, False, 3)
+            if not seen or seen[-1] != sig.phase:
+                seen.append(sig.phase)
+        self.assertEqual(seen[:9], [Phase.EW_GREEN, Phase.EW_YELLOW, Phase.ALL_RED, Phase.NS_GREEN,
+                                    Phase.NS_YELLOW, Phase.ALL_RED, Phase.EW_GREEN, Phase.EW_YELLOW, Phase.ALL_RED])
+
+    def test_keeps_green_for_a_platoon(self):
+        sim = Simulation()
+        sim.signal = PredictiveSignal(road=sim.road)
+        sim.schedule_vehicle(0.0, Vehicle(id=1, lane="NS", direction=1, s=-10.0, v=0.0))
+        for i in range(8):
+            sim.schedule_vehicle(6.0 + 1.5 * i, Vehicle(id=10 + i, lane="EW", direction=1, s=-120.0, v=13.0))
+        sim.run_steps(150)
+        self.assertEqual(sim.signal.phase, Phase.EW_GREEN)  # one waiting car does not cut the platoon
+
+    def test_batched_rollout_matches_single_candidates(self):
+        sim = demand_run(120.0)
+        sim.run(60.0)
+        sig = sim.signal
+        vehicles, lead = sig._vehicles({})
+        self.assertTrue(vehicles)
+        cands = [0.0, 4.0, 8.0, float("inf")]
+        cost, s_next, v_next = sig.rollout(vehicles, lead, 0, cands)
+        for k, c in enumerate(cands):
+            one, s1, v1 = sig.rollout(vehicles, lead, 0, [c])
+            self.assertAlmostEqual(one[0], cost[k])
+            self.assertEqual(s1[0].tolist(), s_next[k].tolist())
+
+    def test_plan_reuse_and_snapshot(self):
+        sim = demand_run(300.0)
+        sim.run(150.0)
+        sig = sim.signal
+        self.assertGreater(sig.rollouts, 0)
+        self.assertGreater(sig.reused, 0)
+        fresh = demand_run(300.0, tolerance=-1.0)  # never reuse
+        fresh.run(150.0)
+        self.assertEqual(fresh.signal.reused, 0)
+        self.assertGreater(fresh.signal.rollouts, sig.rollouts)
+
+        copy = snapshot.loads(snapshot.dumps(sim))
+        self.assertIsInstance(copy.signal, PredictiveSignal)
+        self.assertIs(copy.signal.road, copy.road)
+        self.assertEqual(copy.signal, sim.signal)
+        sim.run(60.0)
+        copy.run(60.0, fast_forward=True)  # fast-forward stands down for this signal
+        self.assertEqual(copy.metrics, sim.metrics)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import contextlib
+import io
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from src.v2x_sim import snapshot
+from src.v2x_sim.simulation import Simulation
+from main import build_demand, main
+from scripts.sweep import expand_jobs, run_job, run_warmup
+
+
+def _state(sim):
+    m = sim.metrics
+    return (sim.t, sim.signal.state, sim.signal.t_in_state, m.collisions, m.near_misses,
+            m.total_vehicles_exited, m.total_delay, [(v.id, v.s, v.v, v.a) for v in sim.vehicles])
+
+
+class TestSnapshot(unittest.TestCase):
+    def test_restore_continues_exactly(self):
+        sim = Simulation(dt=0.1)
+        build_demand(sim, 400.0, rate_ew=0.15, rate_ns=0.12, seed=4)
+        sim.run(150.0)
+        data = snapshot.dumps(sim)
+        self.assertEqual(data[:4], snapshot.MAGIC)
+
+        restored = snapshot.loads(data)
+        self.assertEqual(_state(restored), _state(sim))
+        sim.run(150.0)
+        restored.run(150.0)
+        self.assertEqual(_state(restored), _state(sim))
+
+    def test_fork_changes_timings_only(self):
+        sim = Simulation(dt=0.1)
+        build_demand(sim, 200.0, seed=2)
+        sim.run(60.0)
+        data = snapshot.dumps(sim)
+        short, long_ = snapshot.fork(data, [{"max_green": 12.0}, {"max_green": 40.0}])
+        for child in (short, long_):
+            self.assertEqual(_state(child), _state(sim))
+        self.assertEqual((short.signal.max_green, long_.signal.max_green), (12.0, 40.0))
+        with self.assertRaises(ValueError):
+            snapshot.loads(data, {"cycle": 90.0})
+
+        with tempfile.TemporaryDirectory() as d:
+            path = Path(d) / "ck.v2xs"
+            snapshot.save(sim, path)
+            self.assertEqual(_state(snapshot.load(path)), _state(sim))
+            path.write_bytes(b"nope" + bytes(8))
+            with self.assertRaises(ValueError):
+                snapshot.load(path)
+
+    def test_sweep_warmup_forks_shared_state(self):
+        configs = [{"duration": 30.0, "ew_count": 40, "ns_count": 40, "min_green": g} for g in (6.0, 10.0)]
+        jobs = expand_jobs(configs, repeats=1, master_seed=7, warmup=60.0)
+        self.assertEqual(jobs[0]["seed"], jobs[1]["seed"])
+        self.assertNotEqual(jobs[0]["key"], jobs[1]["key"])
+        warm = run_warmup(jobs[0])
+        rows = [run_job(dict(j, warm=warm)) for j in jobs]
+
+        sim = snapshot.loads(warm, {"min_green": 10.0})
+        start = sim.metrics.total_vehicles_exited
+        sim.run(30.0)
+        self.assertEqual(rows[1]["vehicles_exited"], sim.metrics.total_vehicles_exited - start)
+
+    def test_cli_rejects_snapshots_with_vectorized_engine(self):
+        with tempfile.TemporaryDirectory() as d:
+            path = Path(d) / "ck.v2xs"
+            for flag in ("--checkpoint", "--resume"):
+                argv = ["main.py", "--engine", "vectorized", flag, str(path)]
+                with mock.patch("sys.argv", argv), contextlib.redirect_stderr(io.StringIO()):
+                    with self.assertRaises(SystemExit):
+                        main()
+            self.assertFalse(path.exists())
+
+
+if __name__ == '__main__':
+    unittest.main()
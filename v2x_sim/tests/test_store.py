@@ -0,0 +1,65 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from src.v2x_sim.simulation import Simulation
+from src.v2x_sim.store import ResultStore, config_hash
+from src.v2x_sim.telemetry import MemorySink, Recorder
+from main import build_scenario
+from scripts.results import compare_groups
+
+
+def _run(store, config, trajectories=False):
+    sim = Simulation(dt=0.1, signal_params={"min_green": config["min_green"]})
+    build_scenario(sim, seed=config["seed"])
+    run_id = store.begin_run(config)
+    mem = MemorySink()
+    traj = [store.sink(run_id, "trajectories")] if trajectories else []
+    with Recorder([store.sink(run_id, "steps"), mem], traj, buffer_size=100) as rec:
+        sim.recorder = rec
+        sim.run(config["duration"])
+    store.finish_run(run_id, sim.t, sim.metrics)
+    return run_id, sim, mem
+
+
+class TestResultStore(unittest.TestCase):
+    def test_runs_timelines_and_aggregates(self):
+        with tempfile.TemporaryDirectory() as d, ResultStore(Path(d) / "results.sqlite") as store:
+            config = {"duration": 30.0, "min_green": 8.0, "seed": 1}
+            self.assertIsNone(store.find_run(config))
+            run_id, sim, mem = _run(store, config, trajectories=True)
+            self.assertEqual(store.find_run({"seed": 1, "min_green": 8, "duration": 30}), run_id)
+            self.assertEqual(config_hash({"a": 1}), config_hash({"a": 1.0}))
+
+            names, rows = store.timeline(run_id)
+            rows = list(rows)
+            self.assertEqual(len(rows), 300)
+            self.assertEqual([r[names.index("vehicles_exited")] for r in rows],
+                             [r["vehicles_exited"] for r in mem.rows])
+            self.assertEqual(store.channels(run_id), ["steps", "trajectories"])
+
+            for g in (6.0, 10.0):
+                for seed in (1, 2):
+                    _run(store, {"duration": 30.0, "min_green": g, "seed": seed})
+            groups = store.aggregate(["min_green"])
+            self.assertEqual([(g["min_green"], g["runs"]) for g in groups], [(6.0, 2), (8.0, 1), (10.0, 2)])
+            self.assertEqual(groups[1]["total_delay"]["mean"], sim.metrics.total_delay)
+            rows = compare_groups(groups, "min_green", baseline=8.0)
+            self.assertEqual(rows[1]["total_delay_change"], 0.0)
+            self.assertEqual(len(list(store.runs({"seed": 2}))), 2)
+
+    def test_unfinished_run_is_replaced(self):
+        with tempfile.TemporaryDirectory() as d, ResultStore(Path(d) / "results.sqlite") as store:
+            config = {"duration": 10.0, "min_green": 8.0, "seed": 3}
+            store.begin_run(config)  # interrupted: never finished
+            self.assertIsNone(store.find_run(config))
+            self.assertEqual(store.aggregate([])[0]["runs"], 0)
+            run_id, _, _ = _run(store, config)
+            self.assertEqual(store.find_run(config), run_id)
+            self.assertEqual(store.aggregate([])[0]["runs"], 1)
+            with self.assertRaises(ValueError):
+                store.aggregate(["seed; DROP TABLE runs"])
+
+
+if __name__ == '__main__':
+    unittest.main()
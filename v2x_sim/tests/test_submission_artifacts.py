@@ -0,0 +1,35 @@
+import contextlib
+import io
+import runpy
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from scripts.generate_submission_artifacts import run_and_collect, run_ensemble_and_collect
+
+
+class TestSubmissionArtifacts(unittest.TestCase):
+    def test_ensemble_replicas_draw_their_own_demand(self):
+        seeds = [42, 43, 44]
+        metrics, _ = run_ensemble_and_collect(seeds, arrivals="poisson", rate_ew=0.2, rate_ns=0.2)
+        self.assertEqual(len({m.total_delay for m in metrics}), 3)
+        sim, _, _ = run_and_collect(seed=43, arrivals="poisson", rate_ew=0.2, rate_ns=0.2)
+        self.assertEqual(metrics[1].total_vehicles_exited, sim.metrics.total_vehicles_exited)
+        with self.assertRaises(ValueError):
+            run_ensemble_and_collect(seeds)  # platoons would repeat one run
+
+    def test_store_rejects_folder_only_options(self):
+        script = str(Path(__file__).resolve().parents[1] / "scripts" / "generate_submission_artifacts.py")
+        with tempfile.TemporaryDirectory() as d:
+            store = str(Path(d) / "results.sqlite")
+            for extra in (["--profile"], ["--tracks"], ["--format", "npy"]):
+                with mock.patch("sys.argv", [script, "--store", store, *extra]), \
+                        contextlib.redirect_stderr(io.StringIO()), self.assertRaises(SystemExit) as cm:
+                    runpy.run_path(script, run_name="__main__")
+                self.assertEqual(cm.exception.code, 2)
+            self.assertFalse(Path(store).exists())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from scripts.sweep import expand_jobs, run_job, run_sweep
+
+
+class TestSweep(unittest.TestCase):
+    def test_results_independent_of_workers_and_resume(self):
+        configs = [{"duration": 20.0, "arrivals": "poisson", "min_green": g, "max_green": 18.0} for g in (5.0, 8.0)]
+        jobs = expand_jobs(configs, repeats=2, master_seed=7)
+        self.assertEqual([j["seed"] for j in jobs], [j["seed"] for j in expand_jobs(configs, 2, 7)])
+
+        with tempfile.TemporaryDirectory() as tmp:
+            serial = Path(tmp) / "serial.csv"
+            parallel = Path(tmp) / "parallel.csv"
+            run_sweep(jobs, serial, workers=1, progress=False)
+            # Start from a partial table to exercise resume
+            lines = serial.read_text(encoding="utf-8").splitlines(keepends=True)
+            parallel.write_text("".join(lines[:3]), encoding="utf-8")
+            run_sweep(jobs, parallel, workers=2, progress=False)
+            self.assertEqual(serial.read_text(encoding="utf-8"), parallel.read_text(encoding="utf-8"))
+
+    def test_engines_keyed_apart_and_empty_table(self):
+        configs = [{"duration": 10.0, "arrivals": "poisson"}]
+        obj, vec = expand_jobs(configs, 1, 7), expand_jobs(configs, 1, 7, engine="vectorized")
+        self.assertNotEqual(obj[0]["key"], vec[0]["key"])
+        self.assertEqual(obj[0]["seed"], vec[0]["seed"])  # same demand
+        with tempfile.TemporaryDirectory() as tmp:
+            out = Path(tmp) / "sweep.csv"
+            out.touch()  # e.g. killed before the header was flushed
+            run_sweep(obj, out, progress=False)
+            rows = run_sweep(vec, out, progress=False)  # not resumed from the object row
+            self.assertEqual(rows[0]["key"], vec[0]["key"])
+            self.assertEqual(len(out.read_text(encoding="utf-8").splitlines()), 3)
+
+    def test_repeats_use_their_seeds(self):
+        jobs = expand_jobs([{"duration": 120.0, "arrivals": "poisson", "rate_ew": 0.3, "rate_ns": 0.3}], 3, 7)
+        self.assertEqual(len({run_job(j)["total_delay"] for j in jobs}), 3)
+        with self.assertRaises(ValueError):
+            expand_jobs([{}], 3, 7)  # platoon arrivals ignore the seed
+
+    def test_kpis_merged_per_config(self):
+        configs = [{"duration": 60.0, "arrivals": "poisson", "min_green": g} for g in (5.0, 8.0)]
+        jobs = expand_jobs(configs, repeats=2, master_seed=3)
+        with tempfile.TemporaryDirectory() as tmp:
+            kpi_path = Path(tmp) / "kpi.json"
+            rows = run_sweep(jobs, Path(tmp) / "sweep.csv", workers=2, progress=False, kpi_path=kpi_path, kpi_interval=30.0)
+            entries = json.loads(kpi_path.read_text(encoding="utf-8"))
+            self.assertEqual([e["config"]["min_green"] for e in entries], [5.0, 8.0])
+            for entry, g in zip(entries, (5.0, 8.0)):
+                self.assertEqual(entry["runs"], 2)
+                exited = sum(int(r["vehicles_exited"]) for r in rows if float(r["min_green"]) == g)
+                self.assertEqual(entry["summary"]["travel_time"]["count"], exited)
+            with self.assertRaises(ValueError):
+                run_sweep(expand_jobs(configs, 2, 3, engine="vectorized"), Path(tmp) / "vec.csv", progress=False,
+                          kpi_path=kpi_path)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from src.v2x_sim.simulation import Simulation
+from src.v2x_sim.telemetry import BinarySink, CsvSink, MemorySink, Recorder, read_binary
+from main import build_scenario
+
+
+def _sim():
+    sim = Simulation(dt=0.1)
+    build_scenario(sim, ew_count=4, ns_count=4, spawn_gap_ew=2.5, spawn_gap_ns=2.2, v_ew=12.0, v_ns=11.0, seed=1)
+    return sim
+
+
+class TestTelemetry(unittest.TestCase):
+    def test_step_rows_match_direct_scan(self):
+        sim = _sim()
+        mem = MemorySink()
+        sim.recorder = Recorder([mem], buffer_size=7)
+        expected = []
+        for _ in range(200):
+            sim.step()
+            lanes = sim.road.get_approaching_by_lane(sim.vehicles, radius=120.0)
+            expected.append((sim.signal.state, len(lanes["EW"]), len(lanes["NS"])))
+        sim.recorder.close()
+        got = [(r["signal_state"], r["EW_approaching"], r["NS_approaching"]) for r in mem.rows]
+        self.assertEqual(got, expected)
+        self.assertAlmostEqual(mem.rows[-1]["t"], 20.0)
+
+    def test_binary_and_csv_sinks_round_trip(self):
+        with tempfile.TemporaryDirectory() as d:
+            sim = _sim()
+            mem = MemorySink()
+            binary = BinarySink(Path(d) / "steps.bin")
+            csv_sink = CsvSink(Path(d) / "timeline.csv", columns=["t", "signal_state"])
+            traj = BinarySink(Path(d) / "traj.bin")
+            with Recorder([mem, binary, csv_sink], [traj], every=5, buffer_size=16) as rec:
+                sim.recorder = rec
+                sim.run(30.0)
+            self.assertEqual(len(mem.rows), 60)
+
+            names, rows = read_binary(Path(d) / "steps.bin")
+            rows = list(rows)
+            self.assertEqual(names[:3], ["t", "signal_state", "EW_approaching"])
+            self.assertEqual([r[0] for r in rows], [r["t"] for r in mem.rows])
+            self.assertEqual([r[4] for r in rows], [r["vehicles_exited"] for r in mem.rows])
+
+            lines = (Path(d) / "timeline.csv").read_text(encoding="utf-8").splitlines()
+            self.assertEqual(lines[0], "t,signal_state")
+            self.assertEqual(lines[1], f"0.5,{mem.rows[0]['signal_state']}")
+            self.assertEqual(len(lines), 61)
+
+            _, traj_rows = read_binary(Path(d) / "traj.bin")
+            self.assertEqual(len(list(traj_rows)), sum(r["active"] for r in mem.rows))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from src.v2x_sim.conflict import ConflictDetector
+from src.v2x_sim.models.vehicle import TRUCK, Vehicle
+from src.v2x_sim.simulation import Simulation
+from src.v2x_sim.telemetry import MemorySink, Recorder
+from src.v2x_sim.tracks import TrackFile, TrackWriter
+
+
+def build(threshold=1.0):
+    sim = Simulation(dt=0.1, signal_params={"max_green": 120.0})
+    sim.conflicts = ConflictDetector(threshold=threshold)
+    for i in range(30):
+        d = 1 if i % 4 < 2 else -1
+        sim.schedule_vehicle(i * 1.7, Vehicle(id=i, lane="EW" if i % 2 else "NS", direction=d, s=-d * 200.0, v=12.0,
+                                              profile=TRUCK if i % 5 == 0 else None))
+    return sim
+
+
+class TestTracks(unittest.TestCase):
+    def test_rescoring_matches_simulation_metrics(self):
+        with tempfile.TemporaryDirectory() as d:
+            path = Path(d) / "run.trk"
+            sim = build()
+            with TrackWriter(path) as writer:
+                sim.recorder = writer
+                sim.run(120.0)
+            wide = build(threshold=2.5)
+            wide.run(120.0)
+
+            tf = TrackFile(path, chunk_records=97)  # chunks split the run at tick boundaries
+            self.assertEqual(len(tf.times), 1200)
+            self.assertEqual(tf.collisions(), sim.metrics.collisions)
+            self.assertEqual(tf.near_misses(), sim.metrics.near_misses)
+            self.assertEqual(tf.near_misses(threshold=2.5), wide.metrics.near_misses)
+            self.assertAlmostEqual(tf.delay(), sim.metrics.total_delay, delta=0.01 * sim.metrics.total_delay)
+            self.assertGreaterEqual(tf.collisions(margin=3.0), tf.collisions())
+            self.assertEqual(tf.collisions(t0=50.0, t1=60.0) + tf.collisions(t0=60.05, t1=1e9) + tf.collisions(t1=49.95),
+                             tf.collisions())
+            del tf
+
+    def test_random_access_by_time_and_vehicle(self):
+        with tempfile.TemporaryDirectory() as d:
+            path = Path(d) / "run.trk"
+            sim = build()
+            steps = MemorySink()
+            with Recorder([steps], every=5, tracks=TrackWriter(path, every=5)) as rec:
+                sim.recorder = rec
+                sim.run(60.0)
+            tf = TrackFile(path)
+            self.assertEqual((tf.dt, tf.every), (0.1, 5))
+            self.assertEqual(list(tf.times), [row["t"] for row in steps.rows])
+            at = tf.at(30.0)
+            self.assertEqual(len(at), next(row["active"] for row in steps.rows if row["t"] == 30.0))
+            self.assertTrue((at["t"] == 30.0).all())
+            window = tf.window(10.0, 20.0)
+            self.assertEqual(set(window["t"]), {t for t in tf.times if 10.0 <= t <= 20.0})
+            track = tf.vehicle(5)
+            self.assertTrue((track["id"] == 5).all() and (track["t"][1:] > track["t"][:-1]).all())
+            self.assertEqual(float(track["length"][0]), TRUCK.length)
+            self.assertEqual(len(tf.vehicle(999)), 0)
+            del tf, at, window
+
+
+if __name__ == '__main__':
+    unittest.main()
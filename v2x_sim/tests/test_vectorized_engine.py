@@ -0,0 +1,17 @@
+import unittest
+
+from main import build_scenario
+from src.v2x_sim.vectorized import compare_engines
+
+
+class TestVectorizedEngine(unittest.TestCase):
+    def test_matches_reference_engine(self):
+        def setup(sim):
+            build_scenario(sim, ew_count=30, ns_count=30, spawn_gap_ew=1.5, spawn_gap_ns=1.6)
+
+        diffs = compare_engines(setup, duration=90.0, dt=0.1)
+        self.assertEqual(diffs, {}, f"Engines disagree: {diffs}")
+
+
+if __name__ == '__main__':
+    unittest.main()